@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:02
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicates(apps, schema_editor):
+    # Earlier imports could store the same measurement more than once; keep the newest row
+    LulinDataProduct = apps.get_model('dataproducts', 'LulinDataProduct')
+    key = ('file_name', 'name', 'mjd', 'filter')
+    duplicates = (LulinDataProduct.objects.values(*key)
+                  .annotate(keep=Max('id'), copies=Count('id')).filter(copies__gt=1))
+    for duplicate in duplicates.iterator():
+        (LulinDataProduct.objects.filter(**{field: duplicate[field] for field in key})
+         .exclude(id=duplicate['keep']).delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataproducts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lulindataproduct',
+            constraint=models.UniqueConstraint(fields=('file_name', 'name', 'mjd', 'filter'), name='lulin_data_product_natural_key'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataproducts', '0003_lulindataproduct_natural_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotometryFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('mtime', models.FloatField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('sha256', models.CharField(max_length=64)),
+                ('rows', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'PhotometryFile',
+            },
+        ),
+    ]
@@ -25,6 +25,11 @@ class DataProducts(models.Model):
         return f"dataproducts/{uuid_str}"
 
 
+# One measurement per source, image, epoch and filter, so re-imports update rows in place.
+# Keyed on the catalog object name rather than the target, which is nullable and paired later.
+LULIN_NATURAL_KEY = ['file_name', 'name', 'mjd', 'filter']
+
+
 class LulinDataProduct(models.Model):
 
     name = models.CharField(max_length=100, null=False, blank=True)
@@ -52,6 +57,12 @@ class LulinDataProduct(models.Model):
     class Meta:
         ordering = ['-created_at']
         db_table = 'LulinDataProduct'
+        constraints = [
+            models.UniqueConstraint(
+                fields=LULIN_NATURAL_KEY,
+                name='lulin_data_product_natural_key'
+            )
+        ]
 
 
 class ETLLogs(models.Model):
@@ -66,3 +77,18 @@ class ETLLogs(models.Model):
 
     class Meta:
         db_table = 'ETLLogs'
+
+
+class PhotometryFile(models.Model):
+    """Manifest entry for a photometry CSV, recording how much of it has been imported."""
+    path = models.CharField(max_length=500, unique=True)
+    size = models.BigIntegerField()
+    mtime = models.FloatField()
+    # Bytes imported so far (whole lines), the SHA-256 of those bytes and the data rows they hold
+    offset = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64)
+    rows = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'PhotometryFile'
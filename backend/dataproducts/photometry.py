@@ -0,0 +1,155 @@
+import hashlib
+import io
+import os
+from dataclasses import dataclass, replace
+
+import pandas as pd
+
+from observations.lulin_models import Filters, Instruments
+from targets.crossmatch import NO_MATCH
+
+from .models import LULIN_NATURAL_KEY, LulinDataProduct, PhotometryFile
+
+# PSF photometry CSV column -> LulinDataProduct field
+PSF_COLUMNS = {
+    'object': 'name',
+    'complete_info_filename': 'file_name',
+    'obs_midMJD': 'mjd',
+    'mag': 'mag',
+    'RA_fit': 'source_ra',
+    'Dec_fit': 'source_dec',
+    'intexptime': 'exposure_time',
+    'optimized_zeropoint_mag': 'zp',
+    'estimated_FWHM': 'FWHM',
+    'filter': 'filter',
+    'telescope': 'instrument',
+}
+NUMERIC_FIELDS = ('mjd', 'mag', 'source_ra', 'source_dec', 'exposure_time', 'zp', 'FWHM')
+UPDATE_FIELDS = [field for field in PSF_COLUMNS.values() if field not in LULIN_NATURAL_KEY] + ['target']
+BATCH_SIZE = 2000
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def prepare_rows(df: pd.DataFrame, catalog) -> tuple[pd.DataFrame, list[str]]:
+    """Validate a PSF photometry table and pair it with targets, without touching the database.
+
+    Returns one row per natural key (the last occurrence wins), with model field
+    names as columns plus ``target_id``, and a warning for every skipped row.
+    """
+    missing = [column for column in PSF_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    rows = df[list(PSF_COLUMNS)].rename(columns=PSF_COLUMNS)
+    rows['name'] = rows['name'].astype(str)
+    rows['file_name'] = rows['file_name'].astype(str)
+    for field in NUMERIC_FIELDS:
+        rows[field] = pd.to_numeric(rows[field], errors='coerce')
+    filter_names, instrument_names = rows['filter'], rows['instrument']
+    rows['filter'] = filter_names.map({choice.name: choice.value for choice in Filters})
+    rows['instrument'] = instrument_names.map({choice.name: choice.value for choice in Instruments})
+
+    warnings = []
+    bad_filter = rows['filter'].isna()
+    bad_instrument = rows['instrument'].isna() & ~bad_filter
+    invalid = rows[list(NUMERIC_FIELDS)].isna().any(axis=1)
+    invalid |= ~rows['source_ra'].between(0, 360) | ~rows['source_dec'].between(-90, 90)
+    invalid &= ~(bad_filter | bad_instrument)
+    warnings += [f"Invalid filter '{value}' for target '{name}'. Skipping row."
+                 for value, name in zip(filter_names[bad_filter], rows['name'][bad_filter])]
+    warnings += [f"Invalid instrument '{value}' for target '{name}'. Skipping row."
+                 for value, name in zip(instrument_names[bad_instrument], rows['name'][bad_instrument])]
+    warnings += [f"Validation error for target '{name}': invalid number or coordinates. Skipping row."
+                 for name in rows['name'][invalid]]
+
+    rows = rows[~(bad_filter | bad_instrument | invalid)].astype({'filter': int, 'instrument': int})
+    rows = rows.drop_duplicates(subset=LULIN_NATURAL_KEY, keep='last')
+    rows['target_id'] = catalog.match(rows['name'], rows['source_ra'], rows['source_dec'])
+    return rows.reset_index(drop=True), warnings
+
+
+def upsert_rows(rows: pd.DataFrame) -> int:
+    """Insert ``rows`` from :func:`prepare_rows`, updating measurements already stored."""
+    products = [
+        LulinDataProduct(target_id=None if target_id == NO_MATCH else int(target_id), **record)
+        for record, target_id in zip(rows.drop(columns='target_id').to_dict('records'), rows['target_id'])
+    ]
+    LulinDataProduct.objects.bulk_create(
+        products, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=LULIN_NATURAL_KEY, update_fields=UPDATE_FIELDS)
+    return len(products)
+
+
+@dataclass
+class FileIncrement:
+    """Rows of a photometry CSV not imported yet, and the manifest values once they are."""
+    df: pd.DataFrame | None
+    size: int
+    mtime: float
+    offset: int
+    sha256: str
+    rows: int
+
+    def checkpoint(self, path: str) -> None:
+        PhotometryFile.objects.update_or_create(path=path, defaults={
+            'size': self.size, 'mtime': self.mtime, 'offset': self.offset,
+            'sha256': self.sha256, 'rows': self.rows,
+        })
+
+
+def read_increment(path: str, manifest: PhotometryFile = None) -> FileIncrement | None:
+    """Read what was appended to ``path`` since ``manifest``; ``None`` if the file is unchanged.
+
+    A file that only grew is read from the manifest offset, after checking that
+    the bytes before it still hash to the manifest digest. Any other change
+    re-reads the whole file, which the natural-key upsert makes safe. Only whole
+    lines are read, so a line still being written waits for the next run.
+    """
+    stat = os.stat(path)
+    if manifest and (manifest.size, manifest.mtime) == (stat.st_size, stat.st_mtime):
+        return None
+
+    with open(path, 'rb') as file:
+        header = file.readline()
+        digest, start, rows = hashlib.sha256(), 0, 0
+        if manifest and manifest.offset <= stat.st_size:
+            file.seek(0)
+            remaining = manifest.offset
+            while remaining and (block := file.read(min(HASH_BLOCK_SIZE, remaining))):
+                digest.update(block)
+                remaining -= len(block)
+            if digest.hexdigest() == manifest.sha256:
+                start, rows = manifest.offset, manifest.rows
+            else:
+                digest = hashlib.sha256()
+        file.seek(start)
+        data = file.read()
+
+    complete = data[:data.rfind(b'\n') + 1]
+    digest.update(complete)
+    new_rows = complete.count(b'\n') - (1 if start == 0 and complete else 0)
+    # A trailing line without its newline may still be being written; it is read next time
+    body = complete if start == 0 else header + complete
+    df = pd.read_csv(io.BytesIO(body)) if new_rows > 0 else pd.DataFrame(columns=list(PSF_COLUMNS))
+    return FileIncrement(df=df, size=stat.st_size, mtime=stat.st_mtime, offset=start + len(complete),
+                         sha256=digest.hexdigest(), rows=rows + new_rows)
+
+
+@dataclass
+class ParsedFile:
+    """A file increment validated and paired with targets, ready for :func:`upsert_rows`."""
+    rows: pd.DataFrame
+    warnings: list[str]
+    read: int
+    increment: FileIncrement
+
+
+def parse_file(path: str, manifest: PhotometryFile = None, catalog=None) -> ParsedFile | None:
+    """Read and prepare the new rows of ``path``, without database access; ``None`` if unchanged."""
+    increment = read_increment(path, manifest)
+    if increment is None:
+        return None
+    rows, warnings = prepare_rows(increment.df, catalog)
+    # Only the prepared rows travel back from a worker process, not the raw table
+    return ParsedFile(rows=rows, warnings=warnings, read=len(increment.df), increment=replace(increment, df=None))
+
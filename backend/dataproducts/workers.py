@@ -0,0 +1,26 @@
+"""Entry points for photometry ETL worker processes.
+
+Kept free of model imports: a spawned worker imports this module before
+Django is set up, and only then loads the app modules.
+"""
+import pickle
+
+import django
+
+_catalog = None
+
+
+def init_worker(catalog: bytes) -> None:
+    """Process pool initializer: set up Django and keep this worker's copy of the target catalog.
+
+    The catalog arrives pickled, as unpickling it needs the app registry.
+    """
+    global _catalog
+    django.setup()
+    _catalog = pickle.loads(catalog)
+
+
+def parse_file(path: str, manifest=None):
+    from .photometry import parse_file
+
+    return parse_file(path, manifest, _catalog)
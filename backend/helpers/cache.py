@@ -0,0 +1,53 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+# Bump when the shape or content of cached responses changes
+RESPONSE_CACHE_VERSION = 1
+
+
+def make_cache_key(namespace: str, payload) -> str:
+    """Canonical hash of JSON-serializable request inputs."""
+    canonical = json.dumps(
+        {'version': RESPONSE_CACHE_VERSION, 'payload': payload},
+        sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def wants_refresh(request) -> bool:
+    """``?refresh=true`` asks for cached data to be recomputed."""
+    return request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
+
+
+def cached_json_response(request, key: str, compute, timeout: int = None) -> HttpResponse:
+    """Serve the JSON body for ``key`` from the cache with ETag/If-None-Match support.
+
+    ``key`` must identify the response completely, so a matching ETag is answered
+    with 304 without recomputing. On a miss ``compute()`` is called and its rendered
+    bytes are stored for ``timeout`` seconds.
+    """
+    if timeout is None:
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+    etag = f'"{key.rsplit(":", 1)[-1]}"'
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        response = HttpResponseNotModified()
+    else:
+        content = cache.get(key)
+        if content is None:
+            content = JSONRenderer().render(compute())
+            cache.set(key, content, timeout)
+        response = HttpResponse(content, content_type='application/json')
+
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=timeout)
+    patch_vary_headers(response, ('Accept',))
+    return response
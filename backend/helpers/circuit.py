@@ -0,0 +1,118 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from helpers.models import CircuitProbe
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = max(int(retry_after), 1)
+        super().__init__(f"{name} is temporarily unavailable; retry in {self.retry_after}s")
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker whose state lives in the Django cache.
+
+    The cache is shared by every gunicorn worker and the job worker (the default
+    file cache sits on a volume mounted in both containers), so one outage is
+    detected once instead of once per process. Outcomes of the calls made in the last
+    ``CIRCUIT_BREAKER_WINDOW`` seconds are kept; once at least
+    ``CIRCUIT_BREAKER_MIN_CALLS`` of them exist and the failure rate reaches
+    ``CIRCUIT_BREAKER_FAILURE_RATE`` the circuit opens and calls fail fast with
+    :class:`CircuitOpenError`. After ``CIRCUIT_BREAKER_COOLDOWN`` seconds a single
+    caller is let through as a half-open probe: success closes the circuit,
+    failure opens it for another cooldown.
+
+    Updates are read-modify-write without a lock, which is accurate enough for
+    counting failures. The probe slot is a :class:`CircuitProbe` row claimed with a
+    conditional update, as cache ``add`` is not atomic on the file or local-memory backends.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.key = f'circuit:{name}'
+
+    def _load(self) -> dict:
+        return cache.get(self.key) or {'opened_at': None, 'outcomes': []}
+
+    def _save(self, state: dict):
+        cache.set(self.key, state, timeout=None)
+
+    @property
+    def is_open(self) -> bool:
+        return self._load()['opened_at'] is not None
+
+    def call(self, func):
+        state = self._load()
+        probing = False
+        if state['opened_at'] is not None:
+            remaining = state['opened_at'] + settings.CIRCUIT_BREAKER_COOLDOWN - time.time()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            # Half-open: exactly one caller probes, the others keep failing fast
+            if not self._claim_probe():
+                raise CircuitOpenError(self.name, settings.CIRCUIT_BREAKER_COOLDOWN)
+            probing = True
+
+        try:
+            result = func()
+        except Exception:
+            self._record(succeeded=False, probing=probing)
+            raise
+        self._record(succeeded=True, probing=probing)
+        return result
+
+    def _claim_probe(self) -> bool:
+        """Claim the half-open probe for ``CIRCUIT_BREAKER_COOLDOWN`` seconds; True for exactly one caller."""
+        now = timezone.now()
+        until = now + timedelta(seconds=settings.CIRCUIT_BREAKER_COOLDOWN)
+        if CircuitProbe.objects.filter(name=self.name, claimed_until__lte=now).update(claimed_until=until):
+            return True
+        try:
+            with transaction.atomic():
+                CircuitProbe.objects.create(name=self.name, claimed_until=until)
+        except IntegrityError:
+            return False
+        return True
+
+    def _release_probe(self):
+        CircuitProbe.objects.filter(name=self.name).update(claimed_until=timezone.now())
+
+    def _record(self, succeeded: bool, probing: bool):
+        now = time.time()
+        state = self._load()
+        if probing:
+            self._release_probe()
+            if succeeded:
+                logger.info(f"Circuit {self.name} closed after a successful probe")
+                state = {'opened_at': None, 'outcomes': []}
+            else:
+                state['opened_at'] = now
+            self._save(state)
+            return
+
+        window = now - settings.CIRCUIT_BREAKER_WINDOW
+        outcomes = [outcome for outcome in state['outcomes'] if outcome[0] >= window]
+        outcomes.append((now, succeeded))
+        state['outcomes'] = outcomes[-100:]
+        failures = sum(1 for _, ok in state['outcomes'] if not ok)
+        if (state['opened_at'] is None and len(state['outcomes']) >= settings.CIRCUIT_BREAKER_MIN_CALLS
+                and failures / len(state['outcomes']) >= settings.CIRCUIT_BREAKER_FAILURE_RATE):
+            logger.warning(f"Circuit {self.name} opened: {failures}/{len(state['outcomes'])} recent calls failed")
+            state['opened_at'] = now
+        self._save(state)
+
+    def reset(self):
+        cache.delete(self.key)
+        CircuitProbe.objects.filter(name=self.name).delete()
@@ -0,0 +1,141 @@
+import csv
+import io
+from dataclasses import dataclass
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+# Written for a missing value in a VOTable integer column, declared in its <VALUES null=...>
+VOTABLE_LONG_NULL = -9223372036854775808
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    name: str
+    datatype: str  # VOTable datatype: 'long', 'double' or 'char'
+    unit: str = None
+    description: str = None
+
+
+def batched(rows, size: int):
+    """Split an iterator into lists of at most ``size`` items."""
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_csv(columns: list[ExportColumn], batches, title: str):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    for batch in batches:
+        writer.writerows([[_cell(value) for value in row] for row in batch])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_votable(columns: list[ExportColumn], batches, title: str):
+    """VOTable 1.4 with TABLEDATA, written row by row so the table is never held in memory."""
+    fields = []
+    for column in columns:
+        attributes = f'name={quoteattr(column.name)} datatype="{column.datatype}"'
+        if column.datatype == 'char':
+            attributes += ' arraysize="*"'
+        if column.unit:
+            attributes += f' unit={quoteattr(column.unit)}'
+        body = ''
+        if column.description:
+            body += f'<DESCRIPTION>{escape(column.description)}</DESCRIPTION>'
+        if column.datatype == 'long':
+            body += f'<VALUES null="{VOTABLE_LONG_NULL}"/>'
+        fields.append(f'<FIELD {attributes}>{body}</FIELD>' if body else f'<FIELD {attributes}/>')
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<VOTABLE version="1.4" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">\n'
+        f'<RESOURCE type="results">\n<TABLE name={quoteattr(title)}>\n'
+        + '\n'.join(fields) + '\n<DATA>\n<TABLEDATA>\n'
+    ).encode('utf-8')
+
+    longs = [column.datatype == 'long' for column in columns]
+    for batch in batches:
+        lines = []
+        for row in batch:
+            cells = (str(VOTABLE_LONG_NULL) if value is None and is_long else escape(_cell(value))
+                     for value, is_long in zip(row, longs))
+            lines.append('<TR>' + ''.join(f'<TD>{cell}</TD>' for cell in cells) + '</TR>\n')
+        yield ''.join(lines).encode('utf-8')
+    yield b'</TABLEDATA>\n</DATA>\n</TABLE>\n</RESOURCE>\n</VOTABLE>\n'
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose contents are handed out as they are produced."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def write_parquet(columns: list[ExportColumn], batches, title: str):
+    """Parquet with one row group per batch; each group is sent as soon as it is written."""
+    types = {'long': pa.int64(), 'double': pa.float64(), 'char': pa.string()}
+    schema = pa.schema([pa.field(column.name, types[column.datatype]) for column in columns])
+    to_text = [column.datatype == 'char' for column in columns]
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            values = list(zip(*batch))
+            arrays = [[_cell(v) if v is not None else None for v in column] if text else list(column)
+                      for column, text in zip(values, to_text)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': (write_csv, 'text/csv', 'csv'),
+    'votable': (write_votable, 'application/x-votable+xml', 'vot'),
+    'parquet': (write_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def streaming_export(columns: list[ExportColumn], rows, export_format: str, filename: str) -> StreamingHttpResponse:
+    """Stream ``rows`` (an iterator of tuples matching ``columns``) as a file download.
+
+    Rows are consumed ``EXPORT_CHUNK_SIZE`` at a time, so with a queryset
+    ``.iterator()`` as the source memory use does not depend on the row count.
+    """
+    writer, content_type, extension = EXPORT_FORMATS[export_format]
+    batches = batched(rows, settings.EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(writer(columns, batches, filename), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
@@ -0,0 +1,153 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from helpers.cache import make_cache_key
+from helpers.models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS: dict = {}
+# Seconds between heartbeats of a running job; keep well below the worker's stale timeout
+HEARTBEAT_INTERVAL = 60.0
+
+
+class JobError(Exception):
+    """Raised by a handler to fail its job with a user-facing message."""
+
+
+def register_job(kind: str):
+    """Register ``func(job, **params)`` as the handler for ``kind``; its return value becomes the result."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def wants_async(request) -> bool:
+    return request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def enqueue(kind: str, user, **params) -> Job:
+    """Queue a job, or return the caller's identical job that is still queued or running."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"No job handler registered for {kind!r}")
+    key = make_cache_key('job', {'kind': kind, 'params': params}).rsplit(':', 1)[-1]
+    active = Job.objects.filter(user=user, key=key, status__in=(Job.Status.QUEUED, Job.Status.RUNNING)).first()
+    if active is not None:
+        return active
+    return Job.objects.create(user=user, kind=kind, params=params, key=key)
+
+
+def set_progress(job: Job, progress: float):
+    job.progress = min(max(progress, 0.0), 1.0)
+    Job.objects.filter(pk=job.pk).update(progress=job.progress, heartbeat_at=timezone.now())
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_next(worker: str) -> Job | None:
+    """Atomically move the oldest queued job to RUNNING; safe with several workers."""
+    for pk in Job.objects.filter(status=Job.Status.QUEUED).order_by('created_at').values_list('pk', flat=True)[:10]:
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, worker=worker, started_at=now, heartbeat_at=now)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job: Job) -> Job:
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise JobError(f"No job handler registered for {job.kind!r}")
+        job.result = handler(job, **job.params)
+        job.status = Job.Status.SUCCEEDED
+        job.progress = 1.0
+    except JobError as e:
+        job.status, job.error = Job.Status.FAILED, str(e)
+    except Exception as e:
+        logger.error(f"Job {job.pk} ({job.kind}) failed: {e}\n{traceback.format_exc()}")
+        job.status, job.error = Job.Status.FAILED, f'{type(e).__name__}: {e}'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'status', 'progress', 'error', 'finished_at'])
+    return job
+
+
+class Heartbeat(threading.Thread):
+    """Background thread that bumps ``heartbeat_at`` of a running job until stopped.
+
+    A long job keeps beating however rarely it reports progress, so only jobs
+    whose worker has died go stale.
+    """
+
+    def __init__(self, job: Job, interval: float = HEARTBEAT_INTERVAL):
+        super().__init__(name=f'heartbeat-{job.pk}', daemon=True)
+        self.job = job
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                self.beat()
+        finally:
+            connection.close()
+
+    def beat(self):
+        Job.objects.filter(pk=self.job.pk, worker=self.job.worker, status=Job.Status.RUNNING).update(
+            heartbeat_at=timezone.now())
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def requeue_stale(timeout: timedelta) -> int:
+    """Put RUNNING jobs whose worker has been silent for ``timeout`` back in the queue."""
+    return Job.objects.filter(status=Job.Status.RUNNING, heartbeat_at__lt=timezone.now() - timeout).update(
+        status=Job.Status.QUEUED, worker='', started_at=None, heartbeat_at=None)
+
+
+def run_worker(worker: str = None, interval: float = 1.0, once: bool = False, max_jobs: int = None,
+               stale_after: timedelta = None, heartbeat_interval: float = HEARTBEAT_INTERVAL) -> int:
+    """Process jobs until stopped; with ``once`` return as soon as the queue is empty."""
+    worker = worker or worker_name()
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        close_old_connections()
+        if stale_after is not None:
+            requeue_stale(stale_after)
+        job = claim_next(worker)
+        if job is None:
+            if once:
+                break
+            time.sleep(interval)
+            continue
+        heartbeat = Heartbeat(job, heartbeat_interval)
+        heartbeat.start()
+        try:
+            run_job(job)
+        finally:
+            heartbeat.stop()
+        processed += 1
+    return processed
+
+
+def wait_for(job: Job, timeout: float, interval: float = 0.5) -> Job:
+    """Long-poll helper: reload ``job`` until it finishes or ``timeout`` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not job.is_finished and time.monotonic() < deadline:
+        time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+        job.refresh_from_db()
+    return job
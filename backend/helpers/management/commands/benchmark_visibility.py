@@ -0,0 +1,61 @@
+import time
+from types import SimpleNamespace
+
+import astropy.units as u
+import numpy as np
+from astropy.time import Time
+from django.core.management.base import BaseCommand
+
+from observations.observatory_config import get_default_observatory
+from targets.visibility import Visibility
+
+
+class Command(BaseCommand):
+    help = 'Benchmark batched vs per-target alt/az computation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000],
+                            help='Number of targets for each run')
+        parser.add_argument('--hours', type=float, default=12,
+                            help='Length of the time window in hours')
+        parser.add_argument('--seed', type=int, default=0)
+
+    @staticmethod
+    def make_targets(size, rng):
+        ra = rng.uniform(0, 360, size)
+        dec = np.degrees(np.arcsin(rng.uniform(-1, 1, size)))
+        return [SimpleNamespace(name=f'T{i}', ra=float(r), dec=float(d))
+                for i, (r, d) in enumerate(zip(ra, dec))]
+
+    @staticmethod
+    def timed(func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        obs = get_default_observatory()
+        service = Visibility.from_observatory(obs)
+        rng = np.random.default_rng(options['seed'])
+        start_time = Time.now()
+        end_time = start_time + options['hours'] * u.hour
+
+        # Warm up IERS tables and ephemerides so the first run is not penalised
+        service.get_targets_altaz(self.make_targets(1, rng), start_time, end_time)
+
+        self.stdout.write(f"{'targets':>8} {'loop (s)':>10} {'batched (s)':>12} {'speedup':>8}")
+        for size in options['sizes']:
+            targets = self.make_targets(size, rng)
+            looped, loop_time = self.timed(
+                service.get_targets_altaz, targets, start_time, end_time, batched=False)
+            batched, batch_time = self.timed(
+                service.get_targets_altaz, targets, start_time, end_time, batched=True)
+
+            max_diff = max(
+                (np.max(np.abs(np.subtract(a.altaz.alt, b.altaz.alt))) for a, b in zip(looped, batched)),
+                default=0.0)
+            self.stdout.write(
+                f"{size:>8} {loop_time:>10.3f} {batch_time:>12.3f} {loop_time / batch_time:>7.1f}x")
+            if max_diff > 1e-6:
+                self.stdout.write(self.style.WARNING(
+                    f"Max altitude difference for {size} targets: {max_diff:.2e} deg"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from observations.observatory_config import OBSERVATORY_CONFIGS
+from observations.sidereal import build_sidereal_table, save_sidereal_table, sidereal_table_path
+
+
+class Command(BaseCommand):
+    help = 'Precompute the yearly sidereal/twilight tables used by the observability endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('years', type=int, nargs='+', help='Years to build, e.g. 2025 2026')
+        parser.add_argument('--force', action='store_true', help='Rebuild tables that already exist')
+
+    def handle(self, *args, **options):
+        for observatory in OBSERVATORY_CONFIGS.values():
+            for year in options['years']:
+                path = sidereal_table_path(observatory, year)
+                if path.exists() and not options['force']:
+                    self.stdout.write(f'{path} exists, skipping')
+                    continue
+                save_sidereal_table(build_sidereal_table(observatory, year), path)
+                self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
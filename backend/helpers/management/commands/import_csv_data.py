@@ -1,18 +1,18 @@
+import multiprocessing
 import os
+import pickle
 import uuid
-from math import radians
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 
-import pandas as pd
-from dataproducts.models import ETLLogs, LulinDataProduct
-from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from django.db.models import F
-from django.db.models.functions import ACos, Cos, Radians, Sin
-from observations.lulin_models import Filters, Instruments
+
+from dataproducts import workers as etl_workers
+from dataproducts.models import ETLLogs, PhotometryFile
+from dataproducts.photometry import parse_file, upsert_rows
 from observations.models import Observatories
-from system.models import User
-from targets.models import Target
+from targets.crossmatch import TargetCatalog
 
 FILE_PATH = os.getenv(
     "PHOTOMETRY_PATH", "/app/data")
@@ -21,48 +21,13 @@ FILE_PATH = os.getenv(
 class Command(BaseCommand):
     help = 'Import Lulin data from CSV file'
 
-    @staticmethod
-    def find_targets_within_radius(ra, dec, radius_degrees):
-        # Convert to radians for calculation
-        ra1_rad = radians(ra)
-        dec1_rad = radians(dec)
-
-        targets = Target.objects.annotate(
-            # Convert target coordinates to radians
-            ra2_rad=Radians(F('ra')),
-            dec2_rad=Radians(F('dec')),
-
-            # Calculate the separation using spherical law of cosines
-            separation_cos=(
-                Sin(dec1_rad) * Sin('dec2_rad') +
-                Cos(dec1_rad) * Cos('dec2_rad') *
-                Cos(ra1_rad - F('ra2_rad'))
-            ),
-
-            # Convert to degrees
-            separation=ACos('separation_cos') * 180.0 / 3.141592653589793
-        ).filter(
-            separation__lte=radius_degrees
-        ).order_by('separation')
-
-        return targets
-
-    def find_closest_target(self, ra, dec, max_radius_degrees=1/3600):
-        targets = self.find_targets_within_radius(ra, dec, max_radius_degrees)
-        return targets.first()
-
-    @staticmethod
-    def find_target_by_name(name):
-        try:
-            return Target.objects.get(name=name)
-        except Target.DoesNotExist:
-            return None
-
-    def find_target(self, name, ra, dec):
-        target = self.find_target_by_name(name)
-        if not target:
-            target = self.find_closest_target(ra, dec)
-        return target
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Re-import every file instead of only what changed since the last run')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes that parse and cross-match files in parallel; rows are written by this one')
 
     def handle(self, *args, **options):
         etl_log = ETLLogs.objects.create(
@@ -77,101 +42,107 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(error_message))
             return
 
+        # Every row of every file is matched against this one snapshot of the live targets
+        catalog = TargetCatalog()
+
+        paths = [os.path.join(FILE_PATH, f) for f in csv_files if 'fail' not in f]
+        manifests = {} if options['full'] else {
+            manifest.path: manifest for manifest in PhotometryFile.objects.filter(path__in=paths)}
+        workers = options['workers']
+
         files_c = 0
         rows_c = 0
+        skipped_c = 0
         error_messages = []
-        for file in csv_files:
-            files_c += 1
-            csv_file_path = os.path.join(FILE_PATH, file)
-            if 'fail' in file:
-                continue
-
-            try:
-                df = pd.read_csv(csv_file_path)
-            except Exception as e:
-                error_message = f'Error reading CSV file: {str(e)}'
-                self.stdout.write(self.style.ERROR(error_message))
-                error_messages.append(error_message)
-                etl_log.save()
+        for csv_file_path, parsed, error in self.parse_files(paths, manifests, catalog, workers):
+            file = os.path.basename(csv_file_path)
+            if parsed is None and error is None:
+                skipped_c += 1
                 continue
+            files_c += 1
 
             try:
+                if error:
+                    raise error
+                error_messages = parsed.warnings
+                for warning in error_messages:
+                    self.stdout.write(self.style.WARNING(warning))
+                # This process is the only writer; the rows and the manifest checkpoint are committed together
                 with transaction.atomic():
-                    error_messages = []  # Collect all warnings and errors
-
-                    for idx, row in df.iterrows():
-                        rows_c += 1
-                        self.stdout.write(f"Processing row: {idx}")
-                        try:
-                            target = self.find_target(
-                                row['object'], row['RA_fit'], row['Dec_fit'])
-                        except Target.DoesNotExist:
-                            warning = f"Target '{row['object']}' not found. Creating new target."
-                            self.stdout.write(self.style.WARNING(warning))
-                            error_messages.append(warning)
-                            target = Target.objects.create(
-                                name=row['object'],
-                                ra=row['RA_fit'],
-                                dec=row['Dec_fit'],
-                                user=User.objects.get(username='admin')
-                            )
-
-                        try:
-                            filter_choice = Filters[row['filter']].value
-                        except KeyError:
-                            warning = f"Invalid filter '{row['filter']}' for target '{row['object']}'. Skipping row."
-                            self.stdout.write(self.style.WARNING(warning))
-                            error_messages.append(warning)
-                            continue
-
-                        try:
-                            instrument_choice = Instruments[row['telescope']].value
-                        except KeyError:
-                            warning = f"Invalid instrument '{row['telescope']}' for target '{row['object']}'. Skipping row."
-                            self.stdout.write(self.style.WARNING(warning))
-                            error_messages.append(warning)
-                            continue
-
-                        try:
-                            LulinDataProduct.objects.get_or_create(
-                                name=row['object'],
-                                file_name=row['complete_info_filename'],
-                                target=target,
-                                mjd=float(row['obs_midMJD']),
-                                mag=float(row['mag']),
-                                source_ra=float(row['RA_fit']),
-                                source_dec=float(row['Dec_fit']),
-                                exposure_time=float(row['intexptime']),
-                                zp=float(row['optimized_zeropoint_mag']),
-                                filter=filter_choice,
-                                instrument=instrument_choice,
-                                FWHM=float(row['estimated_FWHM']),
-                            )
-                            self.stdout.write(self.style.SUCCESS(
-                                f"Successfully imported data for target '{row['object']}'"))
-                        except ValidationError as e:
-                            warning = f"Validation error for target '{row['object']}': {str(e)}. Skipping row: {row}"
-                            self.stdout.write(self.style.WARNING(warning))
-                            error_messages.append(warning)
-                            continue
-
-                        rows_c += 1
-
-                    success_message = f'Lulin data imported successfully from {file}'
-                    self.stdout.write(self.style.SUCCESS(success_message))
-
-                    etl_log.success = True
-                    if error_messages:
-                        etl_log.error_message = "\n".join(error_messages)
-                    etl_log.file_processed = files_c
-                    etl_log.row_processed = rows_c
-                    etl_log.save()
+                    imported = upsert_rows(parsed.rows)
+                    parsed.increment.checkpoint(csv_file_path)
+                rows_c += parsed.read
+
+                self.stdout.write(self.style.SUCCESS(
+                    f'Lulin data imported successfully from {file}: {imported} rows'))
+                self.log_file(file, success=True, rows=parsed.read, messages=error_messages)
+
+                etl_log.success = True
+                if error_messages:
+                    etl_log.error_message = "\n".join(error_messages)
+                etl_log.file_processed = files_c
+                etl_log.row_processed = rows_c
+                etl_log.save()
 
             except Exception as e:
                 error_message = f"Error processing file {file}: {str(e)}"
                 self.stdout.write(self.style.ERROR(error_message))
+                error_messages = [error_message]
+                self.log_file(file, success=False, rows=0, messages=error_messages)
                 etl_log.error_message = error_message
                 etl_log.file_processed = files_c
                 etl_log.row_processed = rows_c
                 etl_log.save()
                 continue
+
+        if not files_c:
+            etl_log.success = True
+            etl_log.save()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {rows_c} rows from {files_c} files; {skipped_c} unchanged files skipped'))
+
+    @staticmethod
+    def parse_files(paths, manifests, catalog, workers):
+        """Yield ``(path, parsed, error)`` for each file, parsed here or by ``workers`` processes.
+
+        Worker processes are spawned rather than forked, so they never share this
+        process's database connection, and each receives its own copy of the catalog.
+        At most two files per worker are in flight, which bounds the parsed rows held
+        while the writer catches up.
+        """
+        if workers <= 1:
+            for path in paths:
+                try:
+                    yield path, parse_file(path, manifests.get(path), catalog), None
+                except Exception as e:
+                    yield path, None, e
+            return
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=etl_workers.init_worker,
+                                 initargs=(pickle.dumps(catalog),)) as executor:
+            queue = iter(paths)
+            pending = {}
+            while True:
+                for path in islice(queue, 2 * workers - len(pending)):
+                    pending[executor.submit(etl_workers.parse_file, path, manifests.get(path))] = path
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        yield path, future.result(), None
+                    except Exception as e:
+                        yield path, None, e
+
+    @staticmethod
+    def log_file(file, success, rows, messages):
+        ETLLogs.objects.create(
+            name=file[:255],
+            observatory=Observatories.LULIN,
+            success=success,
+            file_processed=1,
+            row_processed=rows,
+            error_message="\n".join(messages) or None,
+        )
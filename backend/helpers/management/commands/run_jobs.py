@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from helpers.jobs import run_worker, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (alt/az, SED and SIMBAD lookups)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of waiting for new jobs')
+        parser.add_argument('--max-jobs', type=int, default=None)
+        parser.add_argument('--stale-after', type=int, default=60 * 30,
+                            help='Requeue RUNNING jobs whose worker has not sent a heartbeat for this many seconds')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(f'Worker {worker} started')
+        processed = run_worker(
+            worker=worker,
+            interval=options['interval'],
+            once=options['once'],
+            max_jobs=options['max_jobs'],
+            stale_after=timedelta(seconds=options['stale_after']),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:23
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_heartbeat(apps, schema_editor):
+    # Jobs already running have only their start time to go by
+    Job = apps.get_model('helpers', 'Job')
+    Job.objects.filter(heartbeat_at__isnull=True, started_at__isnull=False).update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('helpers', '0004_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_heartbeat, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('helpers', '0005_job_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CircuitProbe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('claimed_until', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'CircuitProbe',
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.db.models import UniqueConstraint
 
@@ -45,3 +46,60 @@ class Announcement(SoftDeleteModel):
     created_at = models.DateTimeField(auto_now_add=True)
     type = models.IntegerField(
         choices=types.choices, null=False, blank=False, default=types.INFO)
+
+
+class Job(models.Model):
+    """A unit of astronomy work run out of band by the ``run_jobs`` worker."""
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'Job'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created'),
+            models.Index(fields=['user', 'key'], name='job_user_key'),
+        ]
+
+    class Status(models.IntegerChoices):
+        QUEUED = 1
+        RUNNING = 2
+        SUCCEEDED = 3
+        FAILED = 4
+
+    user = models.ForeignKey('system.User', on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    key = models.CharField(max_length=64)
+    status = models.IntegerField(choices=Status.choices, default=Status.QUEUED)
+    progress = models.FloatField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Last sign of life from the worker running the job; stale jobs are requeued from this
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.get_status_display()})'
+
+
+class CircuitProbe(models.Model):
+    """Half-open probe slot of a circuit breaker, claimed with a conditional update.
+
+    The breaker's counters live in the cache, but no shipped cache backend has an
+    atomic ``add``; a row claimed in the database lets exactly one process probe.
+    """
+
+    class Meta:
+        db_table = 'CircuitProbe'
+
+    name = models.CharField(max_length=100, unique=True)
+    claimed_until = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.name} probe until {self.claimed_until}'
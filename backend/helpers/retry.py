@@ -0,0 +1,29 @@
+import logging
+import random
+import time
+
+from helpers.circuit import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+def retry_with_backoff(func, attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                       retry_on: tuple = (Exception,)):
+    """Call ``func()`` until it succeeds, sleeping exponentially longer between attempts.
+
+    The n-th retry waits ``base_delay * 2**n`` seconds (capped at ``max_delay``) with
+    jitter, so concurrent callers do not hammer a struggling service in lockstep.
+    The last exception is re-raised once ``attempts`` calls have failed. An open
+    circuit is re-raised at once: waiting out the backoff would not close it.
+    """
+    for attempt in range(attempts):
+        try:
+            return func()
+        except CircuitOpenError:
+            raise
+        except retry_on as e:
+            if attempt == attempts - 1:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.warning(f"Attempt {attempt + 1}/{attempts} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
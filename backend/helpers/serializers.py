@@ -9,7 +9,8 @@ from system.serializers import (  # noqa: F401
     UserSerializer,
 )
 
-from .models import Announcement, Comments, Tags
+from .export import EXPORT_FORMATS
+from .models import Announcement, Comments, Job, Tags
 
 
 class StandardErrorSerializer:
@@ -66,6 +67,11 @@ class ErrorResponseMixin:
         error_data = StandardErrorSerializer.format_not_found_error(resource)
         return Response(error_data, status=404)
 
+    def service_unavailable_response(self, error):
+        """Return 503 for a CircuitOpenError, telling the client when to retry"""
+        error_data = {"detail": str(error)}
+        return Response(error_data, status=503, headers={"Retry-After": str(error.retry_after)})
+
 
 class TagsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -144,3 +150,20 @@ class CommentsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comments
         fields = '__all__'
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source='get_status_display')
+
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'progress', 'result', 'error', 'created_at', 'started_at', 'finished_at')
+
+
+class JobSummarySerializer(JobSerializer):
+    class Meta(JobSerializer.Meta):
+        fields = tuple(f for f in JobSerializer.Meta.fields if f != 'result')
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='csv')
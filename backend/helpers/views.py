@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -6,12 +7,15 @@ from rest_framework.viewsets import ModelViewSet
 
 from system.permissions import IsActivated, IsAdminOrFaculty
 
-from .models import Announcement, Comments, Tags
+from .jobs import wait_for
+from .models import Announcement, Comments, Job, Tags
 from .serializers import (
     AnnouncementsPostSerializer,
     AnnouncementsSerializer,
     CommentsSerializer,
     ErrorResponseMixin,
+    JobSerializer,
+    JobSummarySerializer,
     TagsGetSerializer,
     TagsSerializer,
 )
@@ -110,3 +114,27 @@ class CommentViewSet(ModelViewSet, ErrorResponseMixin):
         comment_instance = get_object_or_404(Comments, pk=kwargs['pk'])
         comment_instance.delete()
         return Response(status=204)
+
+
+class JobViewSet(ModelViewSet, ErrorResponseMixin):
+    permission_classes = [IsAuthenticated, IsActivated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        jobs = self.get_queryset().defer('result')[:50]
+        serializer = JobSummarySerializer(jobs, many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        job = get_object_or_404(self.get_queryset(), pk=kwargs['pk'])
+        wait = request.query_params.get('wait')
+        if wait is not None:
+            try:
+                wait = min(max(float(wait), 0), settings.JOB_LONG_POLL_MAX)
+            except ValueError:
+                return self.error_response('wait must be a number of seconds')
+            job = wait_for(job, wait)
+        return Response(JobSerializer(job).data)
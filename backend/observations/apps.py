@@ -6,6 +6,7 @@ class ObservationsConfig(AppConfig):
     name = 'observations'
 
     def ready(self) -> None:
+        import observations.jobs  # noqa: F401
         import observations.signals  # noqa: F401
         import observations.lulin_code_generator  # noqa: F401
 
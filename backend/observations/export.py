@@ -0,0 +1,42 @@
+from itertools import groupby
+
+from django.conf import settings
+
+from helpers.export import ExportColumn
+
+from .models import ObservationStatuses, Observatories, Priorities
+
+OBSERVATION_EXPORT_COLUMNS = [
+    ExportColumn('observation_id', 'long'),
+    ExportColumn('observation', 'char'),
+    ExportColumn('observatory', 'char'),
+    ExportColumn('priority', 'char'),
+    ExportColumn('status', 'char'),
+    ExportColumn('start_date', 'char'),
+    ExportColumn('end_date', 'char'),
+    ExportColumn('user', 'char'),
+    ExportColumn('target_id', 'long'),
+    ExportColumn('target', 'char'),
+    ExportColumn('ra', 'double', 'deg', 'Right ascension (ICRS)'),
+    ExportColumn('dec', 'double', 'deg', 'Declination (ICRS)'),
+]
+
+_LABELS = (dict(Observatories.choices), dict(Priorities.choices), dict(ObservationStatuses.choices))
+
+
+def observation_rows(queryset):
+    """One row per observation and target, read through a server-side cursor.
+
+    Observations without (live) targets are exported as a single row with empty target columns.
+    """
+    rows = queryset.order_by('id', 'targets__id').values_list(
+        'id', 'name', 'observatory', 'priority', 'status', 'start_date', 'end_date', 'user__username',
+        'targets__id', 'targets__name', 'targets__ra', 'targets__dec', 'targets__deleted_at')
+    for _, group in groupby(rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), key=lambda row: row[0]):
+        group = list(group)
+        pk, name, observatory, priority, status = group[0][:5]
+        observation = (pk, name, *(str(labels.get(value, value)) for labels, value in
+                                   zip(_LABELS, (observatory, priority, status))), *group[0][5:8])
+        live = [row[8:12] for row in group if row[8] is not None and row[12] is None]
+        for target in live or [(None, None, None, None)]:
+            yield (*observation, *target)
@@ -0,0 +1,14 @@
+from helpers.jobs import register_job
+from targets.views import get_targets_altaz
+
+from .models import Observation
+from .observatory_config import get_run_model
+
+
+@register_job('observations.altaz')
+def altaz_job(job, observation_id, columnar=False, max_points=None):
+    observation = Observation.objects.get(id=observation_id)
+    runs = get_run_model(observation.observatory).objects.filter(
+        observation__id=observation_id).select_related('target')
+    return get_targets_altaz([run.target for run in runs], observation.start_date, observation.end_date,
+                             observatory_id=observation.observatory, columnar=columnar, max_points=max_points)
@@ -1,3 +1,4 @@
+import math
 from dataclasses import dataclass, field
 from typing import Optional
 
@@ -25,6 +26,16 @@ class ObservatoryConfig:
     def tz(self):
         return pytz.timezone(self.timezone)
 
+    @property
+    def min_altitude(self) -> float:
+        """Lowest usable altitude (deg), the stricter of alt_threshold and airmass_threshold."""
+        return max(self.alt_threshold, math.degrees(math.asin(1 / self.airmass_threshold)))
+
+    def sidereal_table(self, first_night, last_night):
+        """Precomputed sidereal/twilight rows for local nights ``first_night`` to ``last_night``."""
+        from observations.sidereal import get_sidereal_nights
+        return get_sidereal_nights(self, first_night, last_night)
+
 
 # --- Observatory config registry ---
 
@@ -0,0 +1,208 @@
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+from django.conf import settings
+
+# Rate of the Earth rotation angle, radians per UT1 day
+SIDEREAL_RATE = 2 * np.pi * 1.00273781191135448
+SIDEREAL_DAY = 2 * np.pi / SIDEREAL_RATE
+
+# Sun altitude (deg) that ends each twilight
+TWILIGHTS = {'civil': -6.0, 'nautical': -12.0, 'astronomical': -18.0}
+
+TABLE_FORMAT_VERSION = 1
+
+
+def wrap_angle(angle):
+    """Wrap radians into [-pi, pi)."""
+    return np.mod(angle + np.pi, 2 * np.pi) - np.pi
+
+
+def hour_angle_at(altitude, sin_phi, cos_phi, dec):
+    """Hour angle at which ``dec`` reaches ``altitude``, with always-above/never-above masks."""
+    cos_h = (np.sin(altitude) - sin_phi * np.sin(dec)) / (cos_phi * np.cos(dec))
+    return np.arccos(np.clip(cos_h, -1, 1)), cos_h <= -1, cos_h >= 1
+
+
+def twilight_offsets(location, midnights, astrom, sun_altitude: float):
+    """Dusk and dawn for ``sun_altitude`` (deg) as day offsets from each local midnight.
+
+    The sun is taken six hours either side of midnight so that its motion during
+    the night does not bias the evening or morning crossing. Nights that never get
+    that dark are NaN; nights that never get brighter span the full +/- half day.
+    """
+    import astropy.units as u
+    from astropy.coordinates import CIRS, get_body
+
+    limit = np.radians(sun_altitude)
+    bounds = []
+    for sign in (-1, 1):
+        times = midnights + sign * 6 * u.hour
+        sun = get_body('sun', times, location=location).transform_to(CIRS(obstime=times, location=location))
+        hour_angle, always_above, never_above = hour_angle_at(limit, astrom['sphi'], astrom['cphi'], sun.dec.rad)
+        # The sun's hour angle at midnight is close to pi; dusk is before it, dawn after
+        target = hour_angle if sign < 0 else -hour_angle
+        offset = wrap_angle(target - (astrom['eral'] - sun.ra.rad)) / SIDEREAL_RATE
+        offset = np.where(never_above, sign * 0.5, offset)
+        offset = np.where(always_above, np.nan, offset)
+        bounds.append(np.clip(offset, -0.5, 0.5))
+    return bounds
+
+
+@dataclass
+class SiderealTable:
+    """Per-night sidereal and twilight quantities for one observatory.
+
+    Row ``i`` describes the local night that starts on ``nights[i]``: the UTC JD of
+    the following local midnight, the local Earth rotation angle and the ICRS to
+    CIRS rotation at that instant, and dusk/dawn offsets (days) for each twilight.
+    """
+    nights: list[date]
+    midnight_jd: np.ndarray
+    era: np.ndarray
+    bpn: np.ndarray
+    sin_phi: float
+    cos_phi: float
+    dusk: np.ndarray
+    dawn: np.ndarray
+
+    def __len__(self):
+        return len(self.nights)
+
+    def slice(self, first_night: date, last_night: date) -> 'SiderealTable':
+        start = (first_night - self.nights[0]).days
+        stop = (last_night - self.nights[0]).days + 1
+        if start < 0 or stop > len(self):
+            raise ValueError("Requested nights are outside this table")
+        return SiderealTable(self.nights[start:stop], self.midnight_jd[start:stop], self.era[start:stop],
+                             self.bpn[start:stop], self.sin_phi, self.cos_phi,
+                             self.dusk[start:stop], self.dawn[start:stop])
+
+    @classmethod
+    def concatenate(cls, tables: list['SiderealTable']) -> 'SiderealTable':
+        first = tables[0]
+        return cls(
+            nights=[night for table in tables for night in table.nights],
+            midnight_jd=np.concatenate([t.midnight_jd for t in tables]),
+            era=np.concatenate([t.era for t in tables]),
+            bpn=np.concatenate([t.bpn for t in tables]),
+            sin_phi=first.sin_phi,
+            cos_phi=first.cos_phi,
+            dusk=np.concatenate([t.dusk for t in tables]),
+            dawn=np.concatenate([t.dawn for t in tables]),
+        )
+
+    def observable_hours(self, ra, dec, altitude_limit: float, twilight: str = 'nautical') -> np.ndarray:
+        """Hours per night each target spends above ``altitude_limit`` (deg) while dark, shape ``(targets, nights)``."""
+        column = list(TWILIGHTS).index(twilight)
+        dusk, dawn = self.dusk[:, column], self.dawn[:, column]
+
+        ra = np.radians(np.asarray(ra, dtype=float))
+        dec = np.radians(np.asarray(dec, dtype=float))
+        icrs = np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1)
+        cirs = np.einsum('mij,nj->nmi', self.bpn, icrs)
+        ra_c = np.arctan2(cirs[..., 1], cirs[..., 0])
+        dec_c = np.arcsin(np.clip(cirs[..., 2], -1, 1))
+
+        transit = -wrap_angle(self.era - ra_c) / SIDEREAL_RATE
+        half_arc, always_up, never_up = hour_angle_at(np.radians(altitude_limit), self.sin_phi, self.cos_phi, dec_c)
+        half_arc = half_arc / SIDEREAL_RATE
+
+        hours = np.zeros(ra_c.shape)
+        for cycle in (-1, 0, 1):
+            centre = transit + cycle * SIDEREAL_DAY
+            overlap = np.minimum(centre + half_arc, dawn) - np.maximum(centre - half_arc, dusk)
+            hours += np.clip(np.nan_to_num(overlap), 0, None)
+        hours = np.where(always_up, np.nan_to_num(dawn - dusk), hours)
+        hours[never_up] = 0
+        return hours * 24
+
+
+def build_sidereal_table(observatory, year: int) -> SiderealTable:
+    """Compute the table for every local night starting in ``year``."""
+    import astropy.units as u
+    from astropy.coordinates import AltAz, EarthLocation
+    from astropy.coordinates.erfa_astrom import erfa_astrom
+    from astropy.time import Time
+
+    location = EarthLocation(lat=observatory.latitude * u.deg, lon=observatory.longitude * u.deg,
+                             height=observatory.height * u.m)
+    first = date(year, 1, 1)
+    nights = [first + timedelta(days=i) for i in range((date(year + 1, 1, 1) - first).days)]
+    midnights = Time([(night + timedelta(days=1)).isoformat() for night in nights], scale='utc')
+    midnights = midnights - observatory.utc_offset_hours * u.hour
+    astrom = erfa_astrom.get().apco(AltAz(obstime=midnights, location=location))
+
+    dusk, dawn = zip(*(twilight_offsets(location, midnights, astrom, altitude) for altitude in TWILIGHTS.values()))
+    return SiderealTable(
+        nights=nights,
+        midnight_jd=midnights.jd,
+        era=astrom['eral'].copy(),
+        bpn=astrom['bpn'].copy(),
+        sin_phi=float(astrom['sphi'][0]),
+        cos_phi=float(astrom['cphi'][0]),
+        dusk=np.stack(dusk, axis=-1).astype(np.float32),
+        dawn=np.stack(dawn, axis=-1).astype(np.float32),
+    )
+
+
+def sidereal_table_path(observatory, year: int) -> Path:
+    return Path(settings.SIDEREAL_TABLE_DIR) / f"{observatory.code}-{year}-v{TABLE_FORMAT_VERSION}.npz"
+
+
+def save_sidereal_table(table: SiderealTable, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so concurrent workers never read a partial file
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(tmp, first_night=np.datetime64(table.nights[0], 'D').astype(np.int64),
+             midnight_jd=table.midnight_jd, era=table.era, bpn=table.bpn,
+             phi=np.array([table.sin_phi, table.cos_phi]), dusk=table.dusk, dawn=table.dawn)
+    os.replace(tmp, path)
+
+
+def load_sidereal_table(path: Path) -> SiderealTable:
+    with np.load(path) as data:
+        first = date(1970, 1, 1) + timedelta(days=int(data['first_night']))
+        midnight_jd = data['midnight_jd']
+        return SiderealTable(
+            nights=[first + timedelta(days=i) for i in range(len(midnight_jd))],
+            midnight_jd=midnight_jd,
+            era=data['era'],
+            bpn=data['bpn'],
+            sin_phi=float(data['phi'][0]),
+            cos_phi=float(data['phi'][1]),
+            dusk=data['dusk'],
+            dawn=data['dawn'],
+        )
+
+
+_loaded_tables: dict = {}
+_lock = Lock()
+
+
+def get_sidereal_table(observatory, year: int) -> SiderealTable:
+    """Load the table for ``year`` from disk, building and saving it on first use."""
+    key = (observatory.code, observatory.latitude, observatory.longitude, observatory.height, year)
+    with _lock:
+        if key in _loaded_tables:
+            return _loaded_tables[key]
+
+    path = sidereal_table_path(observatory, year)
+    if path.exists():
+        table = load_sidereal_table(path)
+    else:
+        table = build_sidereal_table(observatory, year)
+        save_sidereal_table(table, path)
+
+    with _lock:
+        _loaded_tables[key] = table
+    return table
+
+
+def get_sidereal_nights(observatory, first_night: date, last_night: date) -> SiderealTable:
+    tables = [get_sidereal_table(observatory, year) for year in range(first_night.year, last_night.year + 1)]
+    return SiderealTable.concatenate(tables).slice(first_night, last_night)
@@ -1,5 +1,3 @@
-from typing import List
-
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
@@ -9,17 +7,21 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from helpers.cache import cached_json_response
+from helpers.export import streaming_export
+from helpers.jobs import enqueue, wants_async
 from helpers.models import Comments
 from helpers.paginator import Pagination
-from helpers.serializers import ErrorResponseMixin, StandardErrorSerializer
+from helpers.serializers import ErrorResponseMixin, ExportQuerySerializer, JobSerializer, StandardErrorSerializer
 from observations.code_generators import get_code_generator
 from observations.filters import ObservationFilter
 from observations.observatory_config import get_run_model
 from system.models import User
 from system.permissions import IsActivated
-from targets.views import get_targets_altaz
-from targets.visibility import TargetAltAz
+from targets.adaptive import MAX_POINTS, MIN_POINTS
+from targets.views import get_targets_altaz, visibility_cache_key, wants_columnar
 
+from .export import OBSERVATION_EXPORT_COLUMNS, observation_rows
 from .models import LulinRun, Observation, Observatories
 from .serializers import (
     DeleteObservationSerializer,
@@ -106,6 +108,16 @@ class ObservationViewSet(ModelViewSet, ErrorResponseMixin):
         except Exception as e:
             return Response({'error': f'Error deleting observations: {str(e)}'}, status=500)
 
+    @extend_schema(request=None, parameters=[ExportQuerySerializer])
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        query = ExportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return self.validation_error_response(query)
+        observations = self.filter_queryset(self.get_queryset()).distinct()
+        return streaming_export(OBSERVATION_EXPORT_COLUMNS, observation_rows(observations),
+                                query.validated_data['type'], 'observations')
+
     @action(detail=True, methods=['post'], url_path='duplicate')
     def duplicate(self, request, pk=None):
         if request.user.role not in (User.Roles.ADMIN, User.Roles.FACULTY):
@@ -166,7 +178,7 @@ class ObservationViewSet(ModelViewSet, ErrorResponseMixin):
         serializer = ObservationGetSerializer(observation)
         return Response(serializer.data, status=200)
 
-    @action(detail=True, methods=['post'], url_path='altaz')
+    @action(detail=True, methods=['get', 'post'], url_path='altaz')
     def altaz(self, request, pk=None):
         if request.user.role not in (User.Roles.ADMIN, User.Roles.FACULTY):
             observation = Observation.objects.get(id=pk, user=request.user)
@@ -183,11 +195,24 @@ class ObservationViewSet(ModelViewSet, ErrorResponseMixin):
                 observation__id=pk
             ).select_related('observation', 'observation__user')
 
+        max_points = request.query_params.get('max_points')
+        if max_points is not None:
+            if not max_points.isdigit() or not MIN_POINTS <= int(max_points) <= MAX_POINTS:
+                return self.error_response(f'max_points must be an integer between {MIN_POINTS} and {MAX_POINTS}')
+            max_points = int(max_points)
+
+        columnar = wants_columnar(request)
+        if wants_async(request):
+            job = enqueue('observations.altaz', request.user, observation_id=observation.id,
+                          columnar=columnar, max_points=max_points)
+            return Response(JobSerializer(job).data, status=202)
+
         targets = [x.target for x in runs]
-        data: List[TargetAltAz] = get_targets_altaz(
+        key = visibility_cache_key('targets', observation.observatory, observation.start_date,
+                                   observation.end_date, targets, columnar=columnar, max_points=max_points)
+        return cached_json_response(request, key, lambda: get_targets_altaz(
             targets, observation.start_date, observation.end_date,
-            observatory_id=observation.observatory)
-        return JsonResponse(data, safe=False)
+            observatory_id=observation.observatory, columnar=columnar, max_points=max_points))
 
 
 class LulinRunViewSet(ModelViewSet, ErrorResponseMixin):
@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+from astropy.time import Time
+
+from observations.sidereal import SIDEREAL_RATE
+from targets.ephemeris import ObservatoryEphemeris
+
+# Finest spacing refinement is allowed to reach, in days (one minute)
+MIN_STEP = 1 / 1440
+MAX_LEVELS = 6
+MIN_POINTS = 4
+MAX_POINTS = 2000
+
+
+def plan_lattice(span: float, max_points: int) -> tuple[int, int]:
+    """Split a point budget into a coarse sample count and a number of bisection levels.
+
+    Half of the budget goes to a uniform coarse grid; the other half is spent on
+    bisecting coarse intervals, down to ``MIN_STEP`` or ``MAX_LEVELS`` levels.
+    """
+    if not MIN_POINTS <= max_points <= MAX_POINTS:
+        raise ValueError(f"max_points must be between {MIN_POINTS} and {MAX_POINTS}")
+    n_coarse = max(2, max_points // 2)
+    coarse_step = span / (n_coarse - 1)
+    levels = math.ceil(math.log2(max(coarse_step / MIN_STEP, 1)))
+    return n_coarse, min(levels, MAX_LEVELS)
+
+
+class LatticeEphemeris:
+    """Alt/az on a fine time lattice whose astrometry is only computed on the coarse grid.
+
+    The lattice subdivides each step of ``coarse`` into ``stride`` samples. A lattice
+    sample is observed with the ERFA context of the nearest coarse sample, its Earth
+    rotation angle advanced to the sample's own time (as in ``WindowCalculator``); over
+    half a coarse step the other terms drift by well under an arcsecond. Only the
+    samples actually requested cost anything.
+    """
+
+    def __init__(self, coarse: ObservatoryEphemeris, stride: int):
+        self.coarse = coarse
+        self.stride = stride
+        self.step = coarse.step / stride
+
+    def __len__(self):
+        return (len(self.coarse) - 1) * self.stride + 1
+
+    def altaz_at(self, ra, dec, index):
+        """Alt, az (deg) and secz at lattice samples ``index``; all three arguments broadcast together."""
+        index = np.asarray(index)
+        anchor = np.rint(index / self.stride).astype(int)
+        astrom = self.coarse.astrom[anchor].copy()
+        astrom['eral'] += SIDEREAL_RATE * (index - anchor * self.stride) * self.step
+        return ObservatoryEphemeris._observe(np.asarray(ra, dtype=float), np.asarray(dec, dtype=float), astrom)
+
+    def isot(self, index) -> list[str]:
+        index = np.asarray(index)
+        if not index.size:
+            return []
+        return Time(self.coarse.start_jd + self.step * index, format='jd', scale='utc').isot.tolist()
+
+
+def _intervals_to_split(index: np.ndarray, alt: np.ndarray, thresholds) -> np.ndarray:
+    """Positions ``i`` whose interval ``[index[i], index[i + 1]]`` brackets an event, crossings first."""
+    splittable = np.diff(index) > 1
+    lower, upper = alt[:-1], alt[1:]
+
+    crossing = np.zeros(len(lower), dtype=bool)
+    for threshold in thresholds:
+        crossing |= np.sign(lower - threshold) != np.sign(upper - threshold)
+
+    # A slope sign change at a sample marks a transit (or anti-transit) on either side of it
+    slope = np.sign(np.diff(alt))
+    turns = np.flatnonzero(slope[:-1] != slope[1:])
+    extremum = np.zeros(len(lower), dtype=bool)
+    extremum[turns] = True
+    extremum[turns + 1] = True
+
+    return np.concatenate([
+        np.flatnonzero(crossing & splittable),
+        np.flatnonzero(extremum & ~crossing & splittable),
+    ])
+
+
+def sample_adaptively(ephemeris: LatticeEphemeris, ra, dec, stride: int, max_points: int, thresholds):
+    """Sample alt/az for many targets on a shared lattice, refining only near events.
+
+    ``ephemeris`` is the fine lattice; every ``stride``-th sample forms the coarse grid
+    that all targets share. Intervals bracketing a threshold crossing or a transit are
+    bisected round by round until each target has used ``max_points`` samples or the
+    lattice cannot be split further. Returns per-target lists of lattice indices, alt
+    and az arrays.
+    """
+    ra = np.asarray(ra, dtype=float)
+    dec = np.asarray(dec, dtype=float)
+    n = len(ephemeris)
+    coarse = np.arange(0, n, stride)
+    if coarse[-1] != n - 1:
+        coarse = np.append(coarse, n - 1)
+
+    alt, az, _ = ephemeris.altaz_at(ra[:, np.newaxis], dec[:, np.newaxis], coarse[np.newaxis, :])
+    indices = [coarse] * len(ra)
+    alts, azs = list(alt), list(az)
+    budget = np.full(len(ra), max_points - len(coarse))
+
+    while True:
+        refined, midpoints = [], []
+        for i in np.flatnonzero(budget > 0):
+            positions = _intervals_to_split(indices[i], alts[i], thresholds)[:budget[i]]
+            if not len(positions):
+                continue
+            refined.append(i)
+            midpoints.append((indices[i][positions] + indices[i][positions + 1]) // 2)
+            budget[i] -= len(positions)
+        if not refined:
+            break
+
+        # One ERFA call for every new (target, time) pair of this round
+        owners = np.repeat(refined, [len(m) for m in midpoints])
+        new_alt, new_az, _ = ephemeris.altaz_at(ra[owners], dec[owners], np.concatenate(midpoints))
+        splits = np.cumsum([len(m) for m in midpoints])[:-1]
+        for i, mids, a, z in zip(refined, midpoints, np.split(new_alt, splits), np.split(new_az, splits)):
+            merged = np.concatenate([indices[i], mids])
+            order = np.argsort(merged, kind='stable')
+            indices[i] = merged[order]
+            alts[i] = np.concatenate([alts[i], a])[order]
+            azs[i] = np.concatenate([azs[i], z])[order]
+
+    return indices, alts, azs
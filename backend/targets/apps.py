@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class TargetsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'targets'
+
+    def ready(self) -> None:
+        import targets.jobs  # noqa: F401
@@ -0,0 +1,326 @@
+import os
+import uuid
+from dataclasses import dataclass, field
+
+import astropy.units as u
+import numpy as np
+import pandas as pd
+from astropy.coordinates import SkyCoord
+from astropy.table import Table
+from django.conf import settings
+from django.db import transaction
+
+from helpers.models import Tags
+
+from .models import Target
+
+REQUIRED_COLUMNS = ('name', 'ra', 'dec')
+TARGET_COLUMNS = REQUIRED_COLUMNS + ('redshift', 'tags')
+# Catalog column names (lowercase) understood without a column_map in the request
+DEFAULT_COLUMN_MAP = {
+    'main_id': 'name', 'object': 'name', 'objname': 'name', 'target': 'name', 'id': 'name',
+    'raj2000': 'ra', '_raj2000': 'ra', 'ra_icrs': 'ra', 'ra_deg': 'ra', 'radeg': 'ra',
+    'dej2000': 'dec', '_dej2000': 'dec', 'de_icrs': 'dec', 'dec_deg': 'dec', 'dedeg': 'dec', 'decl': 'dec',
+    'z': 'redshift', 'z_value': 'redshift',
+}
+NAME_MAX_LENGTH = Target._meta.get_field('name').max_length
+TAG_SEPARATOR = ';'
+BATCH_SIZE = 1000
+# Names per conflict query; one query for all but the largest files, and within
+# the bound-parameter limits of every supported database
+CONFLICT_QUERY_CHUNK = 10000
+# Invalid rows listed in the result of a streamed import; the counts stay exact
+MAX_REPORTED_ERRORS = 1000
+READ_CSV_OPTIONS = {'dtype': str, 'keep_default_na': False, 'skipinitialspace': True}
+
+
+class ImportFileError(ValueError):
+    """The upload as a whole cannot be imported (unreadable, or required columns missing)."""
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    rows: list = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.rows) - self.created
+
+    def to_dict(self) -> dict:
+        return {'created': self.created, 'failed': self.failed, 'rows': self.rows}
+
+
+UPLOAD_FORMATS: dict = {}
+
+
+def register_format(*extensions: str):
+    """Register ``reader(file) -> DataFrame`` for uploads with the given file extensions."""
+    def decorator(reader):
+        for extension in extensions:
+            UPLOAD_FORMATS[extension] = reader
+        return reader
+    return decorator
+
+
+def _table_frame(table: Table) -> pd.DataFrame:
+    """DataFrame of the scalar columns of an astropy table, with masked cells blank."""
+    table.convert_bytestring_to_unicode()
+    columns = {}
+    for name in table.colnames:
+        column = table[name]
+        if column.ndim > 1:
+            continue
+        if column.dtype.kind in 'US':
+            columns[name] = np.ma.filled(np.ma.asarray(column), '')
+        else:
+            columns[name] = np.ma.filled(np.ma.asarray(column, dtype=float), np.nan)
+    return pd.DataFrame(columns)
+
+
+@register_format('csv')
+def read_csv(file) -> pd.DataFrame:
+    return pd.read_csv(file, **READ_CSV_OPTIONS)
+
+
+@register_format('vot', 'votable', 'xml')
+def read_votable(file) -> pd.DataFrame:
+    return _table_frame(Table.read(file, format='votable'))
+
+
+@register_format('fits', 'fit', 'fts')
+def read_fits(file) -> pd.DataFrame:
+    return _table_frame(Table.read(file, format='fits'))
+
+
+@register_format('parquet', 'pq')
+def read_parquet(file) -> pd.DataFrame:
+    return pd.read_parquet(file)
+
+
+def upload_format(file) -> str:
+    extension = file.name.rsplit('.', 1)[-1].lower()
+    if extension not in UPLOAD_FORMATS:
+        raise ImportFileError(f"Invalid file type; upload one of: {', '.join(sorted(UPLOAD_FORMATS))}")
+    return extension
+
+
+def _normalize_columns(df: pd.DataFrame, column_map: dict = None) -> pd.DataFrame:
+    """Lowercase the header and rename catalog columns, e.g. ``RAJ2000`` to ``ra``."""
+    df.columns = [str(column).strip().lower() for column in df.columns]
+    mapping = {**DEFAULT_COLUMN_MAP, **{key.strip().lower(): value for key, value in (column_map or {}).items()}}
+    renames = {}
+    for column in df.columns:
+        target = mapping.get(column)
+        if target and target not in df.columns and target not in renames.values():
+            renames[column] = target
+    df = df.rename(columns=renames)
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ImportFileError(f"Missing required column(s): {', '.join(missing)}")
+    return df
+
+
+def read_target_table(file, column_map: dict = None) -> pd.DataFrame:
+    reader = UPLOAD_FORMATS[upload_format(file)]
+    try:
+        df = reader(file)
+    except ImportFileError:
+        raise
+    except (ValueError, OSError, UnicodeDecodeError) as e:
+        raise ImportFileError(f"Could not read file: {e}")
+    return _normalize_columns(df, column_map)
+
+
+def _add_error(errors: np.ndarray, mask, column: str, message: str):
+    for i in np.flatnonzero(mask):
+        errors[i].setdefault(column, []).append(message)
+
+
+def _parse_numbers(series: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Float values and blank mask of a column; text that is not a number becomes NaN."""
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy(dtype=float)
+        return values, np.isnan(values)
+    raw = series.astype(str).str.strip()
+    return pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float), (raw == '').to_numpy()
+
+
+def _sexagesimal(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Degrees for the rows whose ra and dec are both sexagesimal text, NaN elsewhere.
+
+    All such rows are converted by one ``SkyCoord`` call with RA in hours and Dec
+    in degrees (``10:42:44.3 +41:16:09``, ``10h42m44.3s 41d16m9s``). Only when that
+    fails are the rows parsed one by one, to leave the unparseable ones NaN.
+    """
+    ra, dec = np.full(len(df), np.nan), np.full(len(df), np.nan)
+    ra_values, ra_blank = _parse_numbers(df['ra'])
+    dec_values, dec_blank = _parse_numbers(df['dec'])
+    rows = np.flatnonzero(np.isnan(ra_values) & ~ra_blank & np.isnan(dec_values) & ~dec_blank)
+    if rows.size == 0:
+        return ra, dec
+    ra_text = df['ra'].astype(str).str.strip().to_numpy()[rows]
+    dec_text = df['dec'].astype(str).str.strip().to_numpy()[rows]
+    try:
+        coords = SkyCoord(ra_text, dec_text, unit=(u.hourangle, u.deg))
+        ra[rows], dec[rows] = coords.ra.deg, coords.dec.deg
+    except ValueError:
+        for row, ra_value, dec_value in zip(rows, ra_text, dec_text):
+            try:
+                coord = SkyCoord(ra_value, dec_value, unit=(u.hourangle, u.deg))
+            except ValueError:
+                continue
+            ra[row], dec[row] = coord.ra.deg, coord.dec.deg
+    return ra, dec
+
+
+def _numeric(df: pd.DataFrame, column: str, errors: np.ndarray, required: bool, lower=None, upper=None,
+             parsed: np.ndarray = None, invalid: str = "A valid number is required.") -> np.ndarray:
+    """Parse ``column`` as floats, recording DRF-style messages for bad entries.
+
+    ``parsed`` holds values another parser found for entries that are not plain numbers.
+    """
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    values, blank = _parse_numbers(df[column])
+    if parsed is not None:
+        values = np.where(np.isnan(values), parsed, values)
+    if required:
+        _add_error(errors, blank, column, "This field is required.")
+    _add_error(errors, ~blank & ~np.isfinite(values), column, invalid)
+    if lower is not None:
+        _add_error(errors, values < lower, column, f"Ensure this value is greater than or equal to {lower}.")
+    if upper is not None:
+        _add_error(errors, values > upper, column, f"Ensure this value is less than or equal to {upper}.")
+    return values
+
+
+def _existing_names(user, names: list) -> set:
+    existing = set()
+    for start in range(0, len(names), CONFLICT_QUERY_CHUNK):
+        existing.update(Target.objects.filter(user=user, name__in=names[start:start + CONFLICT_QUERY_CHUNK])
+                        .values_list('name', flat=True))
+    return existing
+
+
+def _tag_targets(user, targets: list, tag_lists: list):
+    """Attach tags by name, creating the user's missing tags, with one bulk insert per table."""
+    wanted = {name for names in tag_lists for name in names}
+    if not wanted:
+        return
+    tags = {tag.name: tag for tag in Tags.objects.filter(user=user, name__in=wanted)}
+    new_tags = Tags.objects.bulk_create([Tags(user=user, name=name) for name in sorted(wanted - tags.keys())])
+    tags.update({tag.name: tag for tag in new_tags})
+    Through = Target.tags.through
+    Through.objects.bulk_create(
+        [Through(target_id=target.pk, tags_id=tags[name].pk) for target, names in zip(targets, tag_lists)
+         for name in names],
+        batch_size=BATCH_SIZE)
+
+
+def import_targets(df: pd.DataFrame, user, first_row: int = 2) -> tuple[ImportReport, list]:
+    """Validate every row of ``df`` and insert the valid ones for ``user``.
+
+    Columns are validated as whole arrays: ``ra``/``dec`` ranges, given in degrees
+    or as sexagesimal text, an optional
+    ``redshift``, name length, names repeated within the file, and names the user
+    already has (checked with ``IN`` queries). Valid rows are inserted with
+    ``bulk_create``; ``tags`` holds ``;``-separated tag names. Returns the per-row
+    report and the created targets. Rows are numbered from ``first_row``, which
+    by default counts the header as line 1.
+    """
+    errors = np.array([{} for _ in range(len(df))], dtype=object)
+    names = df['name'].astype(str).str.strip()
+    blank = (names == '').to_numpy()
+    _add_error(errors, blank, 'name', "This field is required.")
+    _add_error(errors, (names.str.len() > NAME_MAX_LENGTH).to_numpy(),
+               'name', f"Ensure this field has no more than {NAME_MAX_LENGTH} characters.")
+    _add_error(errors, ~blank & names.duplicated().to_numpy(), 'name', "Duplicate name in this file.")
+    sexagesimal_ra, sexagesimal_dec = _sexagesimal(df)
+    invalid = "A valid number or sexagesimal coordinate is required."
+    ra = _numeric(df, 'ra', errors, required=True, lower=0, upper=360, parsed=sexagesimal_ra, invalid=invalid)
+    dec = _numeric(df, 'dec', errors, required=True, lower=-90, upper=90, parsed=sexagesimal_dec, invalid=invalid)
+    redshift = _numeric(df, 'redshift', errors, required=False)
+
+    candidates = np.flatnonzero([not e for e in errors])
+    existing = _existing_names(user, names.iloc[candidates].tolist())
+    _add_error(errors, names.isin(existing).to_numpy(), 'name',
+               "A target with this name already exists for this user.")
+
+    valid = np.flatnonzero([not e for e in errors])
+    tag_column = df['tags'].astype(str) if 'tags' in df.columns else pd.Series('', index=df.index)
+    tag_lists = [list(dict.fromkeys(t.strip() for t in value.split(TAG_SEPARATOR) if t.strip()))
+                 for value in tag_column.iloc[valid]]
+    targets = [
+        Target(user=user, name=name, ra=r, dec=d, redshift=None if np.isnan(z) else z)
+        for name, r, d, z in zip(names.iloc[valid], ra[valid].tolist(), dec[valid].tolist(), redshift[valid].tolist())
+    ]
+    with transaction.atomic():
+        created = Target.objects.bulk_create(targets, batch_size=BATCH_SIZE)
+        _tag_targets(user, created, tag_lists)
+
+    ids = dict(zip(valid.tolist(), (target.pk for target in created)))
+    report = ImportReport(created=len(created))
+    for i, (name, row_errors) in enumerate(zip(names.tolist(), errors)):
+        if row_errors:
+            report.rows.append({'row': first_row + i, 'name': name, 'status': 'error', 'errors': row_errors})
+        else:
+            report.rows.append({'row': first_row + i, 'name': name, 'status': 'created', 'id': ids[i]})
+    return report, created
+
+
+def first_row_number(extension: str) -> int:
+    """Report number of the first data row: CSV rows are file lines, so the header is line 1."""
+    return 2 if extension == 'csv' else 1
+
+
+def save_upload(file) -> str:
+    """Copy an upload to ``IMPORT_UPLOAD_DIR``, where the job worker can read it."""
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.IMPORT_UPLOAD_DIR, f'{uuid.uuid4().hex}.{upload_format(file)}')
+    with open(path, 'wb') as out:
+        for block in file.chunks():
+            out.write(block)
+    return path
+
+
+def _read_chunks(handle, extension: str, chunksize: int):
+    """Yield ``(chunk, fraction read)``; CSV is streamed, columnar formats are read whole and sliced."""
+    if extension == 'csv':
+        size = os.fstat(handle.fileno()).st_size or 1
+        for chunk in pd.read_csv(handle, chunksize=chunksize, **READ_CSV_OPTIONS):
+            yield chunk, handle.tell() / size
+        return
+    df = UPLOAD_FORMATS[extension](handle)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize].reset_index(drop=True), min(start + chunksize, len(df)) / len(df)
+
+
+def import_target_file(path: str, user, column_map: dict = None, chunksize: int = None, on_chunk=None) -> dict:
+    """Import an uploaded file from disk ``chunksize`` rows at a time, one transaction per chunk.
+
+    CSV is read incrementally, so memory use does not grow with the file.
+    ``on_chunk(created, fraction)`` is called after every chunk with the targets it
+    created and the share of the file processed so far. Every row is counted, but
+    only the first ``MAX_REPORTED_ERRORS`` invalid rows are listed.
+    """
+    extension = path.rsplit('.', 1)[-1]
+    created_total, failed_total, errors = 0, 0, []
+    first_row = first_row_number(extension)
+    with open(path, 'rb') as handle:
+        try:
+            for chunk, fraction in _read_chunks(handle, extension, chunksize or settings.IMPORT_CHUNK_SIZE):
+                report, created = import_targets(_normalize_columns(chunk, column_map), user, first_row=first_row)
+                first_row += len(chunk)
+                created_total += report.created
+                failed_total += report.failed
+                room = MAX_REPORTED_ERRORS - len(errors)
+                errors.extend([row for row in report.rows if row['status'] == 'error'][:room])
+                if on_chunk is not None:
+                    on_chunk(created, fraction)
+        except ImportFileError:
+            raise
+        except (ValueError, OSError, UnicodeDecodeError) as e:
+            raise ImportFileError(f"Could not read file: {e}")
+    return {'created': created_total, 'failed': failed_total, 'rows': errors,
+            'truncated': failed_total > len(errors)}
@@ -0,0 +1,99 @@
+import numpy as np
+
+from .models import Target
+from .spatial import ARCSEC, chord_length, unit_vector
+
+NO_MATCH = -1
+# Candidate pairs compared per vectorized pass
+MAX_PAIRS = 1_000_000
+
+
+class TargetCatalog:
+    """In-memory snapshot of targets for matching whole tables of names and positions.
+
+    Targets are loaded with one query. Unit vectors are kept sorted by ``z``, so
+    the candidates for a position are the targets in a narrow ``z`` band, found by
+    binary search. Every query position is matched in one vectorized pass,
+    O((N + M) log N) for N targets and M positions, with no per-row database access.
+    """
+
+    def __init__(self, queryset=None):
+        rows = list((queryset if queryset is not None else Target.objects)
+                    .order_by('pk').values_list('pk', 'name', 'ra', 'dec'))
+        pks = np.array([row[0] for row in rows], dtype=np.int64)
+        ra = np.array([row[2] for row in rows], dtype=float)
+        dec = np.array([row[3] for row in rows], dtype=float)
+
+        vectors = np.column_stack(unit_vector(ra, dec)) if rows else np.empty((0, 3))
+        order = np.argsort(vectors[:, 2], kind='stable')
+        self.pks = pks[order]
+        self.vectors = vectors[order]
+        self.by_name = {}
+        for pk, name, _, _ in rows:
+            self.by_name.setdefault(name, pk)  # duplicate names across users: the oldest target wins
+
+    def __len__(self):
+        return len(self.pks)
+
+    def match_names(self, names) -> np.ndarray:
+        return np.array([self.by_name.get(name, NO_MATCH) for name in names], dtype=np.int64)
+
+    def match_positions(self, ra, dec, radius: float = ARCSEC) -> tuple[np.ndarray, np.ndarray]:
+        """Closest target within ``radius`` degrees of each position: ``(pks, separations)``.
+
+        Positions without a target in range get ``NO_MATCH`` and a NaN separation.
+        """
+        queries = np.column_stack(unit_vector(np.asarray(ra, dtype=float), np.asarray(dec, dtype=float)))
+        count = len(queries)
+        pks, separations = np.full(count, NO_MATCH, dtype=np.int64), np.full(count, np.nan)
+        if count == 0 or len(self) == 0:
+            return pks, separations
+
+        chord = chord_length(radius)
+        z = self.vectors[:, 2]
+        low = np.searchsorted(z, queries[:, 2] - chord, side='left')
+        high = np.searchsorted(z, queries[:, 2] + chord, side='right')
+
+        # Queries are taken in slices so the (query, candidate) pairs held at once stay bounded,
+        # even when many targets share a declination
+        ends = np.cumsum(high - low)
+        start = 0
+        while start < count:
+            done = ends[start - 1] if start else 0
+            stop = max(int(np.searchsorted(ends, done + MAX_PAIRS, side='right')), start + 1)
+            self._match_slice(queries, low, high, start, stop, radius, pks, separations)
+            start = stop
+        return pks, separations
+
+    def _match_slice(self, queries, low, high, start, stop, radius, pks, separations):
+        sizes = high[start:stop] - low[start:stop]
+        if not sizes.any():
+            return
+
+        # Flatten every (query, candidate) pair in the z bands and test them together
+        query_index = np.repeat(np.arange(start, stop), sizes)
+        offsets = np.repeat(low[start:stop] - np.cumsum(sizes) + sizes, sizes)
+        candidate = offsets + np.arange(sizes.sum())
+        cos_separation = np.einsum('ij,ij->i', queries[query_index], self.vectors[candidate])
+        inside = cos_separation >= np.cos(np.radians(radius))
+        query_index, candidate, cos_separation = query_index[inside], candidate[inside], cos_separation[inside]
+
+        # Keep the nearest candidate per query: sort by query, then by decreasing cos(separation)
+        order = np.lexsort((-cos_separation, query_index))
+        query_index, candidate = query_index[order], candidate[order]
+        first = np.ones(len(query_index), dtype=bool)
+        first[1:] = query_index[1:] != query_index[:-1]
+        query_index, candidate = query_index[first], candidate[first]
+        pks[query_index] = self.pks[candidate]
+        # Angle from the chord rather than arccos, which loses precision at arcsecond scales
+        chords = np.linalg.norm(queries[query_index] - self.vectors[candidate], axis=1)
+        separations[query_index] = np.degrees(2 * np.arcsin(np.minimum(chords / 2, 1.0)))
+
+    def match(self, names, ra, dec, radius: float = ARCSEC) -> np.ndarray:
+        """Target pk per row: an exact name match, else the closest target within ``radius``."""
+        pks = self.match_names(names)
+        unnamed = pks == NO_MATCH
+        if unnamed.any():
+            pks[unnamed], _ = self.match_positions(np.asarray(ra, dtype=float)[unnamed],
+                                                   np.asarray(dec, dtype=float)[unnamed], radius)
+        return pks
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List
+
+from django.conf import settings
+
+from helpers.circuit import CircuitOpenError
+
+from .models import Target
+from .simbad import cache_simbad_many
+from .vizier import VizierService
+
+
+def enrich_targets(targets: List[Target], refresh: bool = False, workers: int = None,
+                   on_progress: Callable[[float], None] = None) -> dict:
+    """Fetch SIMBAD records and Vizier SEDs for ``targets`` and store them in bulk.
+
+    Vizier SEDs are downloaded on a thread pool of ``workers`` (``ENRICHMENT_WORKERS``)
+    threads, one request per target retried with exponential backoff, while
+    :func:`cache_simbad_many` fetches the SIMBAD records in batches on the calling
+    thread. Targets whose stored data is still current are skipped unless
+    ``refresh`` is set. All writes happen on the calling thread, in bulk.
+    """
+    vizier = VizierService()
+    sed_stale = [t for t in targets if refresh or not vizier.is_fresh(t)]
+    # The SIMBAD batches count as one step, each SED download as another
+    steps = len(sed_stale) + 1
+
+    sed_updated, failed = [], set()
+    with ThreadPoolExecutor(max_workers=workers or settings.ENRICHMENT_WORKERS) as executor:
+        futures = {executor.submit(vizier.fetch_sed, target): target for target in sed_stale}
+        simbad_updated, simbad_failed = cache_simbad_many(targets, refresh=refresh)
+        failed.update(t.pk for t in simbad_failed)
+        if on_progress is not None:
+            on_progress(1 / steps)
+
+        for done, future in enumerate(as_completed(futures), start=2):
+            target = futures[future]
+            try:
+                sed = future.result()  # None when the download failed
+            except CircuitOpenError:
+                sed = None
+            if sed is None:
+                failed.add(target.pk)
+            else:
+                vizier.store(target, sed)
+                sed_updated.append(target)
+            if on_progress is not None:
+                on_progress(done / steps)
+
+    Target.objects.bulk_update(sed_updated, ['sed', 'hashed_sed'], batch_size=500)
+    return {'simbad': len(simbad_updated), 'sed': len(sed_updated), 'failed': sorted(failed)}
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from threading import Lock
+
+import astropy.units as u
+import erfa
+import numpy as np
+from astropy.coordinates import AltAz, EarthLocation, angular_separation
+from astropy.coordinates.erfa_astrom import erfa_astrom
+from astropy.time import Time, TimeDelta
+
+from observations.observatory_config import ObservatoryConfig
+from targets.moon import MoonTrack, compute_moon_track, moon_store
+
+# Grid start times are snapped to this step so that requests for the same night share an entry
+GRID_QUANTUM = 1 * u.minute
+
+
+def quantize_time_grid(start_time: Time, end_time: Time, time_resolution, include_end: bool = True):
+    """Return a hashable (start_jd, step_jd, count) description of an observation time grid."""
+    step = TimeDelta(time_resolution).to(u.day).value
+    quantum = TimeDelta(GRID_QUANTUM).to(u.day).value
+    start_jd = round(start_time.jd / quantum) * quantum
+    stop_jd = end_time.jd + step if include_end else end_time.jd
+    count = len(np.arange(start_jd, stop_jd, step))
+    return start_jd, step, count
+
+
+class ObservatoryEphemeris:
+    """Frame-dependent quantities for one observatory location and time grid.
+
+    Holds the ``Time`` array, the ``AltAz`` frame and the ERFA astrometry context
+    (precession/nutation, Earth orientation, aberration terms) so that ICRS
+    positions can be taken to alt/az without rebuilding any of them.
+    """
+
+    def __init__(self, location: EarthLocation, start_jd: float, step: float, count: int,
+                 observatory: ObservatoryConfig = None):
+        self.location = location
+        self.observatory = observatory
+        self.start_jd = start_jd
+        self.step = step
+        self.times = Time(start_jd + step * np.arange(count), format='jd', scale='utc')
+        self.frame = AltAz(obstime=self.times, location=location)
+        self.astrom = erfa_astrom.get().apco(self.frame)
+        self._isot = None
+        self._moon = None
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def isot(self) -> list[str]:
+        if self._isot is None:
+            self._isot = self.times.isot.tolist()
+        return self._isot
+
+    @property
+    def moon(self) -> MoonTrack:
+        """Topocentric moon track on this grid, read from the shared per-night store."""
+        if self._moon is None:
+            if self.observatory is not None:
+                self._moon = moon_store.get_track(self.observatory, self.times)
+            else:
+                self._moon = compute_moon_track(self.location, self.times)
+        return self._moon
+
+    def moon_separation(self, alt, az):
+        """Angular distance (deg) from the moon for alt/az arrays whose last axis is time.
+
+        Both directions are observed from the same site, so the separation can be taken
+        in the alt/az frame without transforming targets into the moon's frame.
+        """
+        moon = self.moon
+        return np.degrees(angular_separation(np.radians(az), np.radians(alt),
+                                             np.radians(moon.az), np.radians(moon.alt)))
+
+    def altaz(self, ra, dec):
+        """Alt, az (deg) and secz for ICRS ``ra``/``dec`` (deg).
+
+        Scalar inputs give arrays of shape ``(times,)``; 1-D inputs give ``(targets, times)``.
+        """
+        ra = np.asarray(ra, dtype=float)
+        dec = np.asarray(dec, dtype=float)
+        if ra.ndim:
+            ra, dec = ra[:, np.newaxis], dec[:, np.newaxis]
+        return self._observe(ra, dec, self.astrom)
+
+    def altaz_at(self, ra, dec, index):
+        """Alt, az (deg) and secz at grid samples ``index``; all three arguments broadcast together."""
+        return self._observe(np.asarray(ra, dtype=float), np.asarray(dec, dtype=float),
+                             self.astrom[np.asarray(index)])
+
+    @staticmethod
+    def _observe(ra, dec, astrom):
+        cirs_ra, cirs_dec = erfa.atciq(np.radians(ra), np.radians(dec), 0.0, 0.0, 0.0, 0.0, astrom)
+        az, zen, _, _, _ = erfa.atioq(cirs_ra, cirs_dec, astrom)
+        alt = np.pi / 2 - zen
+        return np.degrees(alt), np.degrees(az), 1 / np.sin(alt)
+
+
+class EphemerisCache:
+    """Thread-safe LRU cache of :class:`ObservatoryEphemeris` keyed by (observatory, time grid)."""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def observatory_key(observatory: ObservatoryConfig):
+        return observatory.id, observatory.latitude, observatory.longitude, observatory.height
+
+    def get(self, observatory: ObservatoryConfig, start_time: Time, end_time: Time, time_resolution,
+            include_end: bool = True) -> ObservatoryEphemeris:
+        grid = quantize_time_grid(start_time, end_time, time_resolution, include_end)
+        key = (self.observatory_key(observatory), grid)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        location = EarthLocation(lat=observatory.latitude * u.deg, lon=observatory.longitude * u.deg,
+                                 height=observatory.height * u.m)
+        ephemeris = ObservatoryEphemeris(location, *grid, observatory=observatory)
+
+        with self._lock:
+            self._entries[key] = ephemeris
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return ephemeris
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+ephemeris_cache = EphemerisCache()
@@ -0,0 +1,36 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from helpers.export import ExportColumn, batched
+
+from .bulk_import import TAG_SEPARATOR
+from .models import Target
+
+TARGET_EXPORT_COLUMNS = [
+    ExportColumn('id', 'long'),
+    ExportColumn('name', 'char'),
+    ExportColumn('ra', 'double', 'deg', 'Right ascension (ICRS)'),
+    ExportColumn('dec', 'double', 'deg', 'Declination (ICRS)'),
+    ExportColumn('redshift', 'double'),
+    ExportColumn('tags', 'char', description=f"Tag names separated by '{TAG_SEPARATOR}'"),
+    ExportColumn('notes', 'char'),
+    ExportColumn('user', 'char'),
+    ExportColumn('created_at', 'char'),
+]
+
+
+def target_rows(queryset):
+    """Export rows for ``queryset``, read through a server-side cursor with one tag query per chunk.
+
+    The layout matches the bulk upload, so an export can be imported again.
+    """
+    rows = queryset.values_list('id', 'name', 'ra', 'dec', 'redshift', 'notes', 'user__username', 'created_at')
+    for batch in batched(rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), settings.EXPORT_CHUNK_SIZE):
+        tags = defaultdict(list)
+        links = (Target.tags.through.objects.filter(target_id__in=[row[0] for row in batch])
+                 .order_by('tags__name').values_list('target_id', 'tags__name'))
+        for target_id, tag in links:
+            tags[target_id].append(tag)
+        for row in batch:
+            yield (*row[:5], TAG_SEPARATOR.join(tags[row[0]]), *row[5:])
@@ -1,16 +1,45 @@
+from django import forms
 from django_filters import rest_framework as filters
 
 from .models import Target
 
+CONE_PARAMS = ('cone_ra', 'cone_dec', 'radius')
+
+
+class TargetFilterForm(forms.Form):
+    def clean(self):
+        cleaned_data = super().clean()
+        given = [param for param in CONE_PARAMS if cleaned_data.get(param) is not None]
+        if given and len(given) < len(CONE_PARAMS):
+            raise forms.ValidationError(f"A cone search needs all of {', '.join(CONE_PARAMS)}")
+        return cleaned_data
+
 
 class TargetFilter(filters.FilterSet):
+    ids = filters.BaseInFilter(field_name='id', lookup_expr='in')
     name = filters.CharFilter(lookup_expr='icontains')
     ra_min = filters.NumberFilter(field_name='ra', lookup_expr='gte')
     ra_max = filters.NumberFilter(field_name='ra', lookup_expr='lte')
     dec_min = filters.NumberFilter(field_name='dec', lookup_expr='gte')
     dec_max = filters.NumberFilter(field_name='dec', lookup_expr='lte')
     tags = filters.BaseInFilter(field_name='tags', lookup_expr='in')
+    # Cone search: targets within radius degrees of (cone_ra, cone_dec), nearest first
+    cone_ra = filters.NumberFilter(method='filter_cone', min_value=0, max_value=360)
+    cone_dec = filters.NumberFilter(method='filter_cone', min_value=-90, max_value=90)
+    radius = filters.NumberFilter(method='filter_cone', min_value=0, max_value=180)
 
     class Meta:
         model = Target
-        fields = ['name', 'ra_min', 'ra_max', 'dec_min', 'dec_max', 'tags']
+        form = TargetFilterForm
+        fields = ['ids', 'name', 'ra_min', 'ra_max', 'dec_min', 'dec_max', 'tags', *CONE_PARAMS]
+
+    def filter_cone(self, queryset, name, value):
+        # The three parameters are applied together in filter_queryset
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        cone = [self.form.cleaned_data.get(param) for param in CONE_PARAMS]
+        if all(value is not None for value in cone):
+            queryset = queryset.cone_search(*(float(value) for value in cone))
+        return queryset
@@ -0,0 +1,57 @@
+import os
+
+from helpers.circuit import CircuitOpenError
+from helpers.jobs import JobError, enqueue, register_job, set_progress
+
+from .bulk_import import ImportFileError, import_target_file
+from .enrichment import enrich_targets
+from .models import Target
+from .serializers import TargetSEDSerializer, TargetSimbadDataSerializer
+from .simbad import get_cached_simbad
+from .vizier import VizierService
+
+
+@register_job('targets.simbad')
+def simbad_job(job, target_id, refresh=False):
+    try:
+        data = get_cached_simbad(Target.objects.get(id=target_id), refresh=refresh)
+    except CircuitOpenError as e:
+        raise JobError(str(e))
+    if data is None:
+        raise JobError("Target not found")
+    serializer = TargetSimbadDataSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+@register_job('targets.sed')
+def sed_job(job, target_id, refresh=False):
+    target = Target.objects.get(id=target_id)
+    try:
+        sed = VizierService().get_sed(target, refresh=refresh)
+    except CircuitOpenError as e:
+        raise JobError(str(e))
+    serializer = TargetSEDSerializer(data=sed, many=True)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+@register_job('targets.enrich')
+def enrich_job(job, target_ids, refresh=False):
+    targets = list(Target.objects.filter(id__in=target_ids))
+    return enrich_targets(targets, refresh=refresh, on_progress=lambda fraction: set_progress(job, fraction))
+
+
+@register_job('targets.import')
+def import_job(job, path, column_map=None):
+    def on_chunk(created, fraction):
+        if created:
+            enqueue('targets.enrich', job.user, target_ids=[target.id for target in created])
+        set_progress(job, fraction)
+
+    try:
+        return import_target_file(path, job.user, column_map=column_map, on_chunk=on_chunk)
+    except ImportFileError as e:
+        raise JobError(str(e))
+    finally:
+        os.remove(path)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('targets', '0002_alter_target_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='target',
+            name='simbad_fetched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
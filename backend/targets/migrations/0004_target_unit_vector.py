@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:52
+
+import numpy as np
+from django.db import migrations, models
+
+
+def fill_unit_vectors(apps, schema_editor):
+    Target = apps.get_model('targets', 'Target')
+    targets = list(Target.objects.only('pk', 'ra', 'dec'))
+    if not targets:
+        return
+    ra = np.radians([t.ra for t in targets])
+    dec = np.radians([t.dec for t in targets])
+    for target, x, y, z in zip(targets, np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)):
+        target.cx, target.cy, target.cz = float(x), float(y), float(z)
+    Target.objects.bulk_update(targets, ['cx', 'cy', 'cz'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('targets', '0003_target_simbad_fetched_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='target',
+            name='cx',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='target',
+            name='cy',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='target',
+            name='cz',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='target',
+            index=models.Index(fields=['cz', 'cx', 'cy'], name='target_unit_vector'),
+        ),
+        migrations.RunPython(fill_unit_vectors, migrations.RunPython.noop),
+    ]
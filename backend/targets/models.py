@@ -1,16 +1,91 @@
+import math
+
 from astropy import units as u
 from astropy.coordinates import SkyCoord
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import ACos, Degrees, Least
+
+from helpers.managers import SoftDeleteManager, SoftDeleteModel, SoftDeleteQuerySet
+
+from .spatial import chord_length, unit_vector
+
+UNIT_VECTOR_FIELDS = ('cx', 'cy', 'cz')
+
+
+def _set_unit_vectors(targets):
+    for target in targets:
+        if target.ra is None or target.dec is None:
+            continue
+        target.cx, target.cy, target.cz = (float(v) for v in unit_vector(float(target.ra), float(target.dec)))
+
+
+class UnitVectorQuerySetMixin:
+    """Keeps the unit-vector columns in step with ra/dec on bulk writes and adds cone searches."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        _set_unit_vectors(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if {'ra', 'dec'} & set(fields):
+            _set_unit_vectors(objs)
+            fields = [*fields, *UNIT_VECTOR_FIELDS]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        # bulk_update() passes the vectors along with ra/dec; plain updates get them recomputed
+        if not {'ra', 'dec'} & set(kwargs) or set(UNIT_VECTOR_FIELDS) <= set(kwargs):
+            return super().update(**kwargs)
+        pks = list(self.values_list('pk', flat=True))
+        updated = super().update(**kwargs)
+        moved = list(self.model.all_objects.filter(pk__in=pks).only('pk', 'ra', 'dec'))
+        _set_unit_vectors(moved)
+        self.model.all_objects.bulk_update(moved, UNIT_VECTOR_FIELDS)
+        return updated
 
-from helpers.managers import SoftDeleteModel
+    def cone_search(self, ra: float, dec: float, radius: float):
+        """Targets within ``radius`` degrees of (``ra``, ``dec``), nearest first.
+
+        The indexed unit-vector columns are first limited to the box enclosing the
+        cone, which the ``target_unit_vector`` index answers with a range scan; the
+        exact test is then a dot product on the few rows left. Rows are annotated
+        with ``separation`` in degrees.
+        """
+        x, y, z = (float(v) for v in unit_vector(ra, dec))
+        chord = float(chord_length(radius))
+        cos_separation = F('cx') * x + F('cy') * y + F('cz') * z
+        return self.filter(
+            cz__range=(z - chord, z + chord), cx__range=(x - chord, x + chord), cy__range=(y - chord, y + chord),
+        ).annotate(
+            cos_separation=cos_separation,
+            separation=Degrees(ACos(Least(cos_separation, Value(1.0)))),
+        ).filter(cos_separation__gte=math.cos(math.radians(radius))).order_by('-cos_separation')
+
+
+class TargetQuerySet(UnitVectorQuerySetMixin, SoftDeleteQuerySet):
+    pass
+
+
+class AllTargetsQuerySet(UnitVectorQuerySetMixin, models.QuerySet):
+    """Backs ``all_objects``: deleting through it removes rows, as for other soft-delete models."""
+
+
+class TargetManager(SoftDeleteManager.from_queryset(TargetQuerySet)):
+    pass
 
 
 class Target(SoftDeleteModel):
 
     class Meta:
         db_table = 'Target'
-        indexes = [models.Index(fields=['ra', 'dec'], name='target_coords'), ]
+        indexes = [
+            models.Index(fields=['ra', 'dec'], name='target_coords'),
+            models.Index(fields=['cz', 'cx', 'cy'], name='target_unit_vector'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'name'],
@@ -32,12 +107,27 @@ class Target(SoftDeleteModel):
     hashed_sed = models.CharField(max_length=64, null=True, blank=True)
     simbad = models.JSONField(null=True, blank=True)
     hashed_simbad = models.CharField(max_length=64, null=True, blank=True)
+    simbad_fetched_at = models.DateTimeField(null=True, blank=True)
     tags = models.ManyToManyField('helpers.Tags', related_name='targets')
     notes = models.TextField(max_length=100, null=True, blank=True)
+    # Unit vector of (ra, dec), maintained on save and bulk writes; see UnitVectorQuerySetMixin.cone_search
+    cx = models.FloatField(null=True, editable=False)
+    cy = models.FloatField(null=True, editable=False)
+    cz = models.FloatField(null=True, editable=False)
+
+    objects = TargetManager()
+    all_objects = models.Manager.from_queryset(AllTargetsQuerySet)()
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        _set_unit_vectors([self])
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'ra', 'dec'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, *UNIT_VECTOR_FIELDS}
+        super().save(*args, **kwargs)
+
     def formatted_created_at(self):
         return self.created_at.strftime("%Y-%m-%d %H:%M:%S")
 
@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from datetime import date
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import AltAz, EarthLocation, get_body
+from astropy.time import Time
+from django.core.cache import cache
+
+from observations.observatory_config import ObservatoryConfig
+
+
+@dataclass
+class MoonTrack:
+    """Moon quantities sampled on a time grid, all angles in degrees."""
+    ra: np.ndarray
+    dec: np.ndarray
+    alt: np.ndarray
+    az: np.ndarray
+    illumination: np.ndarray
+
+
+@dataclass
+class MoonNight:
+    """Moon ephemeris for one observatory over one UTC day (00:00 to 24:00 inclusive)."""
+    night: date
+    mjd: np.ndarray
+    track: MoonTrack
+    rise: list[str]
+    set: list[str]
+
+
+def compute_moon_track(location: EarthLocation, times: Time) -> MoonTrack:
+    moon = get_body('moon', times, location=location)
+    altaz = moon.transform_to(AltAz(obstime=times, location=location))
+
+    # Illumination from the sun-moon phase angle, both geocentric
+    sun = get_body('sun', times)
+    geocentric_moon = get_body('moon', times)
+    elongation = sun.separation(geocentric_moon)
+    phase_angle = np.arctan2(sun.distance * np.sin(elongation),
+                             geocentric_moon.distance - sun.distance * np.cos(elongation))
+    illumination = (1 + np.cos(phase_angle)) / 2
+
+    return MoonTrack(
+        ra=moon.ra.deg,
+        dec=moon.dec.deg,
+        alt=altaz.alt.deg,
+        az=altaz.az.deg,
+        illumination=np.asarray(illumination.value, dtype=float),
+    )
+
+
+def _horizon_crossings(mjd: np.ndarray, alt: np.ndarray, rising: bool) -> list[str]:
+    if rising:
+        idx = np.flatnonzero((alt[:-1] < 0) & (alt[1:] >= 0))
+    else:
+        idx = np.flatnonzero((alt[:-1] >= 0) & (alt[1:] < 0))
+    fraction = alt[idx] / (alt[idx] - alt[idx + 1])
+    crossings = mjd[idx] + fraction * (mjd[idx + 1] - mjd[idx])
+    if not len(crossings):
+        return []
+    return Time(crossings, format='mjd', scale='utc').isot.tolist()
+
+
+def _to_unit_vectors(lon, lat):
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)
+
+
+def _interp_direction(x, xp, lon, lat):
+    # Interpolate on the unit sphere so azimuth/RA wrap-around is handled
+    vx, vy, vz = (np.interp(x, xp, v) for v in _to_unit_vectors(lon, lat))
+    return (np.degrees(np.arctan2(vy, vx)) % 360,
+            np.degrees(np.arctan2(vz, np.hypot(vx, vy))))
+
+
+class MoonEphemerisStore:
+    """Per-night moon ephemeris shared through the Django cache.
+
+    Each UTC day is computed once per observatory at ``resolution`` and stored in the
+    configured cache backend, so every gunicorn worker reads the same entry. Tracks on
+    arbitrary grids are interpolated from the stored samples, which is exact whenever
+    the grid is aligned with the resolution.
+    """
+    TIMEOUT = 60 * 60 * 24 * 30
+
+    def __init__(self, resolution=5 * u.minute):
+        self.resolution = resolution
+        self.samples_per_day = int(round((1 * u.day / resolution).decompose().value))
+
+    def cache_key(self, observatory: ObservatoryConfig, night: date) -> str:
+        return f"moon:{observatory.code}:{night.isoformat()}:{self.samples_per_day}"
+
+    def compute_night(self, observatory: ObservatoryConfig, night: date) -> MoonNight:
+        location = EarthLocation(lat=observatory.latitude * u.deg, lon=observatory.longitude * u.deg,
+                                 height=observatory.height * u.m)
+        start_mjd = Time(night.isoformat(), scale='utc').mjd
+        mjd = start_mjd + np.arange(self.samples_per_day + 1) / self.samples_per_day
+        track = compute_moon_track(location, Time(mjd, format='mjd', scale='utc'))
+        return MoonNight(
+            night=night,
+            mjd=mjd,
+            track=track,
+            rise=_horizon_crossings(mjd, track.alt, rising=True),
+            set=_horizon_crossings(mjd, track.alt, rising=False),
+        )
+
+    def get_night(self, observatory: ObservatoryConfig, night: date) -> MoonNight:
+        key = self.cache_key(observatory, night)
+        moon_night = cache.get(key)
+        if moon_night is None:
+            moon_night = self.compute_night(observatory, night)
+            cache.set(key, moon_night, self.TIMEOUT)
+        return moon_night
+
+    def get_track(self, observatory: ObservatoryConfig, times: Time) -> MoonTrack:
+        mjd = np.atleast_1d(times.utc.mjd)
+        days = np.floor(mjd)
+        ra, dec, alt, az, illumination = (np.empty_like(mjd) for _ in range(5))
+
+        for day in np.unique(days):
+            mask = days == day
+            night = self.get_night(observatory, Time(day, format='mjd', scale='utc').datetime.date())
+            ra[mask], dec[mask] = _interp_direction(mjd[mask], night.mjd, night.track.ra, night.track.dec)
+            az[mask], alt[mask] = _interp_direction(mjd[mask], night.mjd, night.track.az, night.track.alt)
+            illumination[mask] = np.interp(mjd[mask], night.mjd, night.track.illumination)
+
+        return MoonTrack(ra=ra, dec=dec, alt=alt, az=az, illumination=illumination)
+
+
+moon_store = MoonEphemerisStore()
@@ -4,7 +4,7 @@ from urllib.parse import parse_qs, urlparse
 
 from astropy.coordinates import SkyCoord
 
-from .simbad import SimbadService
+from .simbad import simbad_pool
 
 
 @dataclass
@@ -48,8 +48,12 @@ class SimbadResolver(BaseResolver):
         return ident[0]
 
     def resolve(self, identifier: str) -> ResolvedTarget | None:
-        service = SimbadService()
-        obj = service.get_target(identifier)
+        with simbad_pool().acquire() as service:
+            obj = service.get_target(identifier)
+        return self._to_resolved(identifier, obj)
+
+    @staticmethod
+    def _to_resolved(identifier: str, obj) -> ResolvedTarget | None:
         if obj is None:
             return None
 
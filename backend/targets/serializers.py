@@ -1,12 +1,15 @@
 import math
 
 from astropy.constants import c
+from astropy.time import Time
 from django.db import transaction
 from helpers.models import Tags
 from helpers.serializers import TagsGetSerializer, TagsSerializer, UserSerializer
 from observations.models import Observation
+from observations.sidereal import TWILIGHTS
 from rest_framework import serializers
 
+from .bulk_import import TARGET_COLUMNS
 from .models import Target
 
 
@@ -89,6 +92,21 @@ class QueryURLSerializer(serializers.Serializer):
     url = serializers.URLField()
 
 
+class TargetUploadSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    column_map = serializers.JSONField(binary=True, required=False, default=dict,
+                                       help_text='File column to target field, e.g. {"RAJ2000": "ra"}')
+
+    def validate_column_map(self, value):
+        if not isinstance(value, dict) or not all(isinstance(v, str) for v in value.values()):
+            raise serializers.ValidationError("Expected an object mapping file columns to target fields.")
+        unknown = sorted(set(value.values()) - set(TARGET_COLUMNS))
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown target field(s): {', '.join(unknown)}. Choose from: {', '.join(TARGET_COLUMNS)}.")
+        return value
+
+
 class ResolvedTargetSerializer(serializers.Serializer):
     name = serializers.CharField()
     ra = serializers.FloatField()
@@ -103,6 +121,56 @@ class DeleteTargetSerializer(serializers.Serializer):
     )
 
 
+class ObservableWindowQuerySerializer(serializers.Serializer):
+    MAX_NIGHTS = 366
+
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    observatory = serializers.IntegerField(required=False, default=None)
+    sun_altitude = serializers.FloatField(required=False, default=-12.0, min_value=-18.0, max_value=0.0)
+
+    def validate(self, data):
+        nights = (data['end_date'] - data['start_date']).days + 1
+        if nights < 1:
+            raise serializers.ValidationError("end_date must not be before start_date")
+        if nights > self.MAX_NIGHTS:
+            raise serializers.ValidationError(f"At most {self.MAX_NIGHTS} nights can be requested")
+        return data
+
+
+class MoonAltAzQuerySerializer(serializers.Serializer):
+    MAX_DAYS = 366
+
+    start_time = serializers.CharField()
+    end_time = serializers.CharField()
+
+    @staticmethod
+    def _time(value) -> Time:
+        try:
+            return Time(value, scale='utc')
+        except ValueError:
+            raise serializers.ValidationError("Enter a valid ISO 8601 time.")
+
+    def validate_start_time(self, value):
+        return self._time(value)
+
+    def validate_end_time(self, value):
+        return self._time(value)
+
+    def validate(self, data):
+        days = (data['end_time'] - data['start_time']).jd
+        if days < 0:
+            raise serializers.ValidationError("end_time must not be before start_time")
+        if days > self.MAX_DAYS:
+            raise serializers.ValidationError(f"At most {self.MAX_DAYS} days can be requested")
+        return data
+
+
+class ObservabilityQuerySerializer(ObservableWindowQuerySerializer):
+    sun_altitude = None
+    twilight = serializers.ChoiceField(choices=list(TWILIGHTS), default='nautical')
+
+
 class NestedAltAzDataSerializer(serializers.Serializer):
     time = serializers.DateTimeField()
     alt = serializers.FloatField()
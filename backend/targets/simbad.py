@@ -1,7 +1,29 @@
+import hashlib
+import json
+import logging
+import queue
+from contextlib import contextmanager
+from datetime import timedelta
+from threading import Lock
 from typing import Any, Dict, List
 
 import numpy as np
 from astroquery.simbad import Simbad
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from helpers.circuit import CircuitBreaker
+from helpers.retry import retry_with_backoff
+
+from .models import Target
+
+logger = logging.getLogger(__name__)
+
+# Attempts per batched SIMBAD request, and the delay before the first retry (doubled on each retry)
+SIMBAD_RETRIES = 3
+SIMBAD_BACKOFF = 1.0
 
 
 class AstronomicalObject:
@@ -17,6 +39,8 @@ class AstronomicalObject:
                 return value.data.item()
         elif isinstance(value, float) and np.isnan(value):
             return None
+        elif isinstance(value, np.generic):
+            return value.item()
         return value
 
     def __str__(self):
@@ -26,7 +50,41 @@ class AstronomicalObject:
         return self.data
 
 
+def _identifier_key(name) -> str:
+    """SIMBAD identifiers are case- and whitespace-insensitive."""
+    return ' '.join(str(name).split()).lower()
+
+
+simbad_circuit = CircuitBreaker('simbad')
+
+
+def _not_found_key(key: str) -> str:
+    return 'simbad:not-found:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def known_missing(names) -> set:
+    """Normalized identifiers SIMBAD recently answered with "not found".
+
+    Kept in the default cache, which the web and job workers share, so a miss
+    seen by one process is not queried again by the others.
+    """
+    keys = {_not_found_key(_identifier_key(name)): _identifier_key(name) for name in names}
+    return {keys[found] for found in cache.get_many(list(keys))}
+
+
+def remember_missing(names):
+    cache.set_many({_not_found_key(_identifier_key(name)): True for name in names},
+                   timeout=settings.SIMBAD_NOT_FOUND_TTL)
+
+
+def forget_missing(names):
+    cache.delete_many([_not_found_key(_identifier_key(name)) for name in names])
+
+
 class SimbadService:
+    # Identifiers per query_objects script; keeps each request well under the server limits
+    BATCH_SIZE = 200
+
     def __init__(self, fields: List[str] = ["distance",
                                             "flux(U)",
                                             "flux(B)",
@@ -66,6 +124,8 @@ class SimbadService:
         self.service.TIMEOUT = 60
         self.service.remove_votable_fields()
         self.service.add_votable_fields(*fields)
+        if 'typed_id' not in fields:
+            self.service.add_votable_fields('typed_id')
 
     def show_votable_fields(self):
         return self.service.get_votable_fields()
@@ -76,11 +136,164 @@ class SimbadService:
     def list_votable_fields(self):
         return self.service.list_votable_fields()
 
-    def get_target(self, target_name: str) -> AstronomicalObject:
-        result_table = self.service.query_object(target_name)
+    def get_target(self, target_name: str, refresh: bool = False) -> AstronomicalObject:
+        """Query one identifier; with ``refresh`` a remembered "not found" is dropped and SIMBAD asked again."""
+        if refresh:
+            forget_missing([target_name])
+        elif known_missing([target_name]):
+            return None
+        result_table = simbad_circuit.call(lambda: self.service.query_object(target_name))
         if result_table is None or len(result_table) == 0:
+            remember_missing([target_name])
             return None
         data_row = result_table[0]
         data = {col: data_row[col] for col in result_table.colnames}
 
         return AstronomicalObject(data)
+
+    def get_targets(self, target_names: List[str], refresh: bool = False) -> List[AstronomicalObject | None]:
+        """Resolve many names with one ``query_objects`` request per ``BATCH_SIZE`` identifiers.
+
+        Rows are matched back to the inputs through SIMBAD's TYPED_ID column, so the
+        result is aligned with ``target_names`` and unknown identifiers are None.
+        Identifiers SIMBAD recently did not know are not sent again, unless ``refresh``.
+        """
+        keys = [_identifier_key(name) for name in target_names]
+        queried = {}
+        for key, name in zip(keys, target_names):
+            queried.setdefault(key, name)
+        if refresh:
+            forget_missing(queried.values())
+            missing = set()
+        else:
+            missing = known_missing(queried.values())
+        pending = [name for key, name in queried.items() if key not in missing]
+
+        found = {}
+        for start in range(0, len(pending), self.BATCH_SIZE):
+            batch = pending[start:start + self.BATCH_SIZE]
+            result_table = simbad_circuit.call(lambda: self.service.query_objects(batch))
+            if result_table is not None:
+                for row in result_table:
+                    data = {col: row[col] for col in result_table.colnames}
+                    found.setdefault(_identifier_key(row['TYPED_ID']), AstronomicalObject(data))
+            remember_missing([name for name in batch if _identifier_key(name) not in found])
+        return [found.get(key) for key in keys]
+
+
+class SimbadServicePool:
+    """Fixed set of configured :class:`SimbadService` objects sharing one HTTP session.
+
+    Building a service resets and re-adds every votable field, and each astroquery
+    client opens its own ``requests`` session, so every lookup used to pay for a new
+    connection. The pool builds ``size`` services once and points them at a single
+    session whose keep-alive connections are reused. A service is lent to one
+    thread at a time because astroquery keeps per-query state on the client.
+    """
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        services = [SimbadService() for _ in range(size)]
+        self.session = services[0].service._session
+        adapter = HTTPAdapter(pool_maxsize=size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        for service in services:
+            service.service._session = self.session
+            self._idle.put(service)
+
+    @contextmanager
+    def acquire(self, timeout: float = None):
+        service = self._idle.get(timeout=timeout)
+        try:
+            yield service
+        finally:
+            self._idle.put(service)
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def simbad_pool() -> SimbadServicePool:
+    """The process-wide pool, built on first use.
+
+    Processes that never query SIMBAD (migrations, imports, ETL workers) never build it.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SimbadServicePool(settings.SIMBAD_POOL_SIZE)
+    return _pool
+
+
+def simbad_digest(name: str, data: dict) -> str:
+    """Content hash of a stored SIMBAD record, bound to the name it was queried with."""
+    canonical = json.dumps({'name': name, 'data': data}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def is_simbad_fresh(target: Target) -> bool:
+    if target.simbad is None or target.simbad_fetched_at is None:
+        return False
+    if target.hashed_simbad != simbad_digest(target.name, target.simbad):
+        return False  # renamed since the lookup, or the row was edited by hand
+    max_age = settings.SIMBAD_CACHE_MAX_AGE
+    return max_age <= 0 or timezone.now() - target.simbad_fetched_at < timedelta(seconds=max_age)
+
+
+def get_cached_simbad(target: Target, refresh: bool = False) -> Dict[str, Any] | None:
+    """Read-through cache of the SIMBAD record in ``Target.simbad``.
+
+    A fresh stored record is returned without contacting SIMBAD. Otherwise, or with
+    ``refresh``, the object is queried by name and the normalized record is saved
+    with its digest and fetch time. Returns None when SIMBAD has no match.
+    """
+    if not refresh and is_simbad_fresh(target):
+        return target.simbad
+
+    with simbad_pool().acquire() as service:
+        astronomical_object = service.get_target(target.name, refresh=refresh)
+    if astronomical_object is None:
+        return None
+    store_simbad(target, astronomical_object)
+    # update() keeps updated_at untouched: refreshing the cache is not a user edit
+    Target.objects.filter(pk=target.pk).update(
+        simbad=target.simbad, hashed_simbad=target.hashed_simbad, simbad_fetched_at=target.simbad_fetched_at)
+    return target.simbad
+
+
+def cache_simbad_many(targets: List[Target], refresh: bool = False) -> tuple[List[Target], List[Target]]:
+    """Batch counterpart of :func:`get_cached_simbad`.
+
+    Stale targets are looked up ``SimbadService.BATCH_SIZE`` names per request, each
+    request retried with exponential backoff, and the records found are written with
+    one ``bulk_update``. Returns the updated targets and those whose lookup failed.
+    """
+    stale = [target for target in targets if refresh or not is_simbad_fresh(target)]
+    updated, failed = [], []
+    for start in range(0, len(stale), SimbadService.BATCH_SIZE):
+        batch = stale[start:start + SimbadService.BATCH_SIZE]
+        names = [target.name for target in batch]
+        try:
+            with simbad_pool().acquire() as service:
+                objects = retry_with_backoff(lambda: service.get_targets(names, refresh=refresh),
+                                             attempts=SIMBAD_RETRIES, base_delay=SIMBAD_BACKOFF)
+        except Exception as e:
+            logger.error(f"SIMBAD lookup of {len(batch)} targets failed: {e}")
+            failed += batch
+        else:
+            for target, astronomical_object in zip(batch, objects):
+                if astronomical_object is not None:
+                    store_simbad(target, astronomical_object)
+                    updated.append(target)
+    Target.objects.bulk_update(updated, ['simbad', 'hashed_simbad', 'simbad_fetched_at'], batch_size=500)
+    return updated, failed
+
+
+def store_simbad(target: Target, astronomical_object: AstronomicalObject):
+    target.simbad = json.loads(json.dumps(astronomical_object.to_dict(), default=str))
+    target.hashed_simbad = simbad_digest(target.name, target.simbad)
+    target.simbad_fetched_at = timezone.now()
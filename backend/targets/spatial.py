@@ -0,0 +1,15 @@
+import numpy as np
+
+ARCSEC = 1 / 3600
+
+
+def unit_vector(ra, dec):
+    """Cartesian ``(x, y, z)`` on the unit sphere for ``ra``/``dec`` in degrees; scalars or arrays."""
+    ra, dec = np.radians(ra), np.radians(dec)
+    cos_dec = np.cos(dec)
+    return cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)
+
+
+def chord_length(radius):
+    """Straight-line distance between two unit vectors ``radius`` degrees apart."""
+    return 2 * np.sin(np.radians(radius) / 2)
@@ -1,9 +1,8 @@
 from typing import List
 
-import pandas as pd
+import numpy as np
 from astropy.time import Time
 from django.db import IntegrityError
-from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
 from rest_framework.decorators import action, api_view, permission_classes
@@ -11,28 +10,46 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from helpers.cache import cached_json_response, make_cache_key, wants_refresh
+from helpers.circuit import CircuitOpenError
+from helpers.export import streaming_export
+from helpers.jobs import enqueue, wants_async
 from helpers.paginator import Pagination
-from helpers.serializers import ErrorResponseMixin, StandardErrorSerializer
+from helpers.serializers import ErrorResponseMixin, ExportQuerySerializer, JobSerializer, StandardErrorSerializer
 from observations.observatory_config import get_default_observatory, get_observatory_config
 from system.models import User
 from system.permissions import IsActivated
 from targets.filters import TargetFilter
 
+from .bulk_import import (
+    ImportFileError,
+    first_row_number,
+    import_targets,
+    read_target_table,
+    save_upload,
+    upload_format,
+)
+from .export import TARGET_EXPORT_COLUMNS, target_rows
 from .models import Target
 from .query_service import resolve_url
 from .serializers import (
     DeleteTargetSerializer,
+    MoonAltAzQuerySerializer,
+    ObservabilityQuerySerializer,
+    ObservableWindowQuerySerializer,
     QueryURLSerializer,
     ResolvedTargetSerializer,
     TargetGetSerializer,
     TargetPostSerializer,
     TargetSEDSerializer,
     TargetSimbadDataSerializer,
+    TargetUploadSerializer,
     TargetVisibilitySerializer,
 )
-from .simbad import SimbadService
+from .simbad import get_cached_simbad
 from .visibility import TargetAltAz, Visibility
 from .vizier import VizierService
+from .windows import WindowCalculator
 
 
 class TargetViewSet(ModelViewSet, ErrorResponseMixin):
@@ -57,6 +74,7 @@ class TargetViewSet(ModelViewSet, ErrorResponseMixin):
         if serializer.is_valid():
             try:
                 instance = serializer.save()
+                enqueue('targets.enrich', request.user, target_ids=[instance.id])
                 response_serializer = TargetGetSerializer(instance)
                 return Response(response_serializer.data, status=201)
             except IntegrityError as e:
@@ -110,14 +128,20 @@ class TargetViewSet(ModelViewSet, ErrorResponseMixin):
     @action(detail=True, methods=['get'], url_path='simbad')
     def simbad(self, request, pk=None):
         target = get_object_or_404(Target, id=pk)
-        service = SimbadService()
-        astronomical_object = service.get_target(target.name)
-        if astronomical_object is None:
+        refresh = wants_refresh(request)
+        if wants_async(request):
+            job = enqueue('targets.simbad', request.user, target_id=target.id, refresh=refresh)
+            return Response(JobSerializer(job).data, status=202)
+        try:
+            data = get_cached_simbad(target, refresh=refresh)
+        except CircuitOpenError as e:
+            return self.service_unavailable_response(e)
+        if data is None:
             return Response(
                 StandardErrorSerializer.format_not_found_error("Target"),
                 status=404
             )
-        serializer = TargetSimbadDataSerializer(data=astronomical_object.to_dict())
+        serializer = TargetSimbadDataSerializer(data=data)
         if serializer.is_valid():
             return Response(serializer.data)
         return Response(
@@ -129,8 +153,15 @@ class TargetViewSet(ModelViewSet, ErrorResponseMixin):
     @action(detail=True, methods=['get'], url_path='sed')
     def sed(self, request, pk=None):
         target = get_object_or_404(Target, id=pk)
+        refresh = wants_refresh(request)
+        if wants_async(request):
+            job = enqueue('targets.sed', request.user, target_id=target.id, refresh=refresh)
+            return Response(JobSerializer(job).data, status=202)
         service = VizierService()
-        sed = service.get_sed(target)
+        try:
+            sed = service.get_sed(target, refresh=refresh)
+        except CircuitOpenError as e:
+            return self.service_unavailable_response(e)
         serializer = TargetSEDSerializer(data=sed, many=True)
         if serializer.is_valid():
             return Response(serializer.data, status=200)
@@ -139,6 +170,76 @@ class TargetViewSet(ModelViewSet, ErrorResponseMixin):
             status=400
         )
 
+    @extend_schema(request=None, parameters=[ObservableWindowQuerySerializer])
+    @action(detail=False, methods=['get'], url_path='windows')
+    def windows(self, request):
+        query = ObservableWindowQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return self.validation_error_response(query)
+        params = query.validated_data
+        try:
+            if params['observatory'] is not None:
+                obs = get_observatory_config(params['observatory'])
+            else:
+                obs = get_default_observatory()
+        except ValueError as e:
+            return self.error_response(str(e))
+
+        targets = list(self.filter_queryset(self.get_queryset()).order_by('id'))
+
+        def compute():
+            if not targets:
+                return []
+            calculator = WindowCalculator(obs, sun_altitude=params['sun_altitude'])
+            result = calculator.compute([t.ra for t in targets], [t.dec for t in targets],
+                                        params['start_date'], params['end_date'])
+            return result.to_dicts(targets)
+
+        key = make_cache_key('visibility:windows', {
+            'observatory': obs.id,
+            'start_date': params['start_date'],
+            'end_date': params['end_date'],
+            'sun_altitude': params['sun_altitude'],
+            'targets': [[t.id, t.name, t.ra, t.dec] for t in targets],
+        })
+        return cached_json_response(request, key, compute)
+
+    @extend_schema(request=None, parameters=[ObservabilityQuerySerializer])
+    @action(detail=False, methods=['get'], url_path='observability')
+    def observability(self, request):
+        query = ObservabilityQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return self.validation_error_response(query)
+        params = query.validated_data
+        try:
+            if params['observatory'] is not None:
+                obs = get_observatory_config(params['observatory'])
+            else:
+                obs = get_default_observatory()
+        except ValueError as e:
+            return self.error_response(str(e))
+
+        targets = list(self.filter_queryset(self.get_queryset()).order_by('id'))
+
+        def compute():
+            table = obs.sidereal_table(params['start_date'], params['end_date'])
+            hours = table.observable_hours([t.ra for t in targets], [t.dec for t in targets],
+                                           obs.min_altitude, params['twilight'])
+            return {
+                'nights': [night.isoformat() for night in table.nights],
+                'targets': [{'id': t.id, 'name': t.name} for t in targets],
+                'hours': np.round(hours, 2).tolist(),
+            }
+
+        key = make_cache_key('visibility:observability', {
+            'observatory': obs.id,
+            'start_date': params['start_date'],
+            'end_date': params['end_date'],
+            'twilight': params['twilight'],
+            'targets': [[t.id, t.name, t.ra, t.dec] for t in targets],
+        })
+        return cached_json_response(request, key, compute)
+
     @extend_schema(request=QueryURLSerializer, responses=ResolvedTargetSerializer)
     @action(detail=False, methods=['post'], url_path='query')
     def resolve_url_action(self, request):
@@ -150,6 +251,8 @@ class TargetViewSet(ModelViewSet, ErrorResponseMixin):
             )
         try:
             result = resolve_url(serializer.validated_data['url'])
+        except CircuitOpenError as e:
+            return self.service_unavailable_response(e)
         except ValueError as e:
             return Response(
                 StandardErrorSerializer.format_custom_error(str(e)),
@@ -163,67 +266,107 @@ class TargetViewSet(ModelViewSet, ErrorResponseMixin):
         response_serializer = ResolvedTargetSerializer(result)
         return Response(response_serializer.data)
 
+    @extend_schema(request=None, parameters=[ExportQuerySerializer])
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        query = ExportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return self.validation_error_response(query)
+        targets = self.filter_queryset(self.get_queryset()).order_by('id').distinct()
+        return streaming_export(TARGET_EXPORT_COLUMNS, target_rows(targets), query.validated_data['type'], 'targets')
+
+    @extend_schema(request=TargetUploadSerializer)
     @action(detail=False, methods=['post'], url_path='bulk')
     def bulk_create(self, request):
-        def handle_uploads(file):
-            file_extension = file.name.split('.')[-1]
-            if file_extension == 'csv':
-                return pd.read_csv(file)
-            return None
-
+        serializer = TargetUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return self.validation_error_response(serializer)
+        uploaded_file = serializer.validated_data['file']
+        column_map = serializer.validated_data['column_map']
+        if wants_async(request):
+            try:
+                path = save_upload(uploaded_file)
+            except ImportFileError as e:
+                return self.error_response(str(e), status_code=400)
+            job = enqueue('targets.import', request.user, path=path, column_map=column_map)
+            return Response(JobSerializer(job).data, status=202)
         try:
-            uploaded_file = request.FILES['file']
-            df = handle_uploads(uploaded_file)
-            if df is None:
-                return HttpResponse("Invalid file type", status=400)
-            targets = []
-            for _, row in df.iterrows():
-                try:
-                    targets.append(
-                        Target(
-                            user=request.user,
-                            name=row['name'],
-                            ra=row['ra'],
-                            dec=row['dec'],
-                        )
-                    )
-                except Exception as e:
-                    return HttpResponse(f"Error creating target: {e}", status=400)
-            Target.objects.bulk_create(targets)
-            return HttpResponse("Targets uploaded successfully")
-        except Exception as e:
-            return HttpResponse(f"An error occurred: {e}", status=400)
+            df = read_target_table(uploaded_file, column_map)
+            report, created = import_targets(df, request.user,
+                                             first_row=first_row_number(upload_format(uploaded_file)))
+        except ImportFileError as e:
+            return self.error_response(str(e), status_code=400)
+        except IntegrityError:
+            return self.error_response(
+                "A target with the same name was created during the import; please retry.", status_code=409)
+        if created:
+            enqueue('targets.enrich', request.user, target_ids=[target.id for target in created])
+        return Response(report.to_dict(), status=201 if created else 400)
+
+
+COLUMNAR_LAYOUT = 'columnar'
+
 
+def wants_columnar(request) -> bool:
+    """Columnar alt/az is opted into with ``?layout=columnar`` or ``Accept: application/json; layout=columnar``."""
+    if request.query_params.get('layout') == COLUMNAR_LAYOUT:
+        return True
+    accept = request.headers.get('Accept', '').replace(' ', '')
+    return f'layout={COLUMNAR_LAYOUT}' in accept
 
-@api_view(['POST'])
+
+@extend_schema(request=MoonAltAzQuerySerializer, parameters=[MoonAltAzQuerySerializer])
+@api_view(['GET', 'POST'])
 @permission_classes((IsAuthenticated,))
 def get_moon_altaz(request):
+    query = MoonAltAzQuerySerializer(data=request.data if request.method == 'POST' else request.query_params)
+    if not query.is_valid():
+        return Response(StandardErrorSerializer.format_validation_errors(query.errors), status=400)
     obs = get_default_observatory()
-    service = Visibility(lat=obs.latitude, lon=obs.longitude, height=obs.height)
-    moon_altaz: TargetAltAz = service.get_moon_altaz(
-        Time(request.data['start_time']),
-        Time(request.data['end_time'])
-    )
-    serializer = TargetVisibilitySerializer(data=moon_altaz.to_dict())
-    if serializer.is_valid():
-        return Response(serializer.validated_data)
-    return Response(
-        StandardErrorSerializer.format_validation_errors(serializer.errors),
-        status=400
-    )
+    start_time = query.validated_data['start_time']
+    end_time = query.validated_data['end_time']
+    columnar = wants_columnar(request)
+
+    def compute():
+        service = Visibility.from_observatory(obs)
+        moon_altaz: TargetAltAz = service.get_moon_altaz(start_time, end_time)
+        if columnar:
+            return moon_altaz.to_columns()
+        serializer = TargetVisibilitySerializer(data=moon_altaz.to_dict())
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    key = visibility_cache_key('moon', obs.id, start_time, end_time, columnar=columnar)
+    return cached_json_response(request, key, compute)
+
+
+def visibility_cache_key(kind: str, observatory_id: int, start_time, end_time, targets=(),
+                         columnar: bool = False, max_points: int = None) -> str:
+    return make_cache_key(f'visibility:{kind}', {
+        'observatory': observatory_id,
+        'start_time': Time(start_time).isot,
+        'end_time': Time(end_time).isot,
+        'targets': [[target.name, target.ra, target.dec] for target in targets],
+        'layout': COLUMNAR_LAYOUT if columnar else 'rows',
+        'max_points': max_points,
+    })
 
 
-def get_targets_altaz(targets: list[Target], start_time: str, end_time: str, observatory_id: int = None):
+def get_targets_altaz(targets: list[Target], start_time: str, end_time: str, observatory_id: int = None,
+                      columnar: bool = False, max_points: int = None):
     if observatory_id is not None:
         obs = get_observatory_config(observatory_id)
     else:
         obs = get_default_observatory()
-    service = Visibility(lat=obs.latitude, lon=obs.longitude, height=obs.height)
+    service = Visibility.from_observatory(obs)
     targets_altaz: List[TargetAltAz] = service.get_targets_altaz(
         targets=targets,
         start_time=Time(start_time),
-        end_time=Time(end_time)
+        end_time=Time(end_time),
+        max_points=max_points,
     )
+    if columnar:
+        return [x.to_columns() for x in targets_altaz]
     data = [x.to_dict() for x in targets_altaz]
     serializer = TargetVisibilitySerializer(data=data, many=True)
     if serializer.is_valid():
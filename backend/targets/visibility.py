@@ -2,9 +2,14 @@ from typing import List
 
 import astropy.units as u
 import numpy as np
-from astropy.coordinates import AltAz, EarthLocation, SkyCoord, get_body
-from astropy.time import Time, TimeDelta
+from astropy.coordinates import EarthLocation, SkyCoord, get_body
+from astropy.time import Time
+
+from observations.observatory_config import ObservatoryConfig
+from targets.adaptive import LatticeEphemeris, plan_lattice, sample_adaptively
+from targets.ephemeris import ObservatoryEphemeris, ephemeris_cache, quantize_time_grid
 from targets.models import Target
+from targets.moon import moon_store
 
 
 class AltAzData:
@@ -41,14 +46,40 @@ class TargetAltAz:
             'data': data
         }
 
+    def to_columns(self, decimals: int = 4):
+        """Columnar representation built straight from the arrays.
+
+        Values are rounded to ``decimals`` and non-finite samples become ``None`` so
+        the result is valid JSON without going through per-row serializer validation.
+        """
+        return {
+            'name': self.name,
+            'time': [t[:19] + 'Z' for t in self.altaz.time],
+            'alt': _json_floats(self.altaz.alt, decimals),
+            'az': _json_floats(self.altaz.az, decimals),
+            'airmass': _json_floats(self.airmass.airmass, decimals),
+        }
+
+
+def _json_floats(values, decimals: int) -> list:
+    values = np.round(np.asarray(values, dtype=float), decimals)
+    return np.where(np.isfinite(values), values, None).tolist()
+
 
 class Visibility:
-    def __init__(self, lat, lon, height, time_offset=8 * u.hour, avoidance_angle=30 * u.deg, time_resolution=15 * u.minute):
+    def __init__(self, lat, lon, height, time_offset=8 * u.hour, avoidance_angle=30 * u.deg,
+                 time_resolution=15 * u.minute, observatory: ObservatoryConfig = None):
         self.observatory_location = EarthLocation(
             lat=lat * u.deg, lon=lon * u.deg, height=height * u.m)
         self.avoidance_angle = avoidance_angle
         self.time_resolution = time_resolution
         self.time_offset = time_offset
+        self.observatory = observatory
+
+    @classmethod
+    def from_observatory(cls, observatory: ObservatoryConfig, **kwargs):
+        return cls(lat=observatory.latitude, lon=observatory.longitude, height=observatory.height,
+                   observatory=observatory, **kwargs)
 
     def _get_time_resolution(self, start_time: Time, end_time: Time):
         time_diff = end_time - start_time
@@ -62,83 +93,159 @@ class Visibility:
             return 45 * u.minute
 
     def is_moon_interfering(self, target, observation_time) -> bool:
-        moon = get_body('moon', observation_time,
-                        location=self.observatory_location)
         target = SkyCoord(ra=target.ra, dec=target.dec, frame='icrs')
+        if self.observatory is not None:
+            moon = moon_store.get_track(self.observatory, observation_time)
+            moon = SkyCoord(ra=moon.ra[0] * u.deg, dec=moon.dec[0] * u.deg, frame='icrs')
+        else:
+            moon = get_body('moon', observation_time,
+                            location=self.observatory_location)
 
         separation = moon.separation(target)
         return separation < self.avoidance_angle
 
-    def get_moon_altaz(self, start_time: Time, end_time: Time) -> TargetAltAz:
-        time_resolution = TimeDelta(self.time_resolution).to(u.day).value
-        jd_range = np.arange(start_time.jd, end_time.jd +
-                             time_resolution, time_resolution)
+    def _get_ephemeris(self, start_time: Time, end_time: Time, time_resolution,
+                       include_end: bool = True) -> ObservatoryEphemeris:
+        # Frames are only shared between requests when the observatory is known
+        if self.observatory is not None:
+            return ephemeris_cache.get(self.observatory, start_time, end_time, time_resolution, include_end)
+        return ObservatoryEphemeris(self.observatory_location,
+                                    *quantize_time_grid(start_time, end_time, time_resolution, include_end))
 
-        observation_times = Time(jd_range, format='jd', scale='utc')
+    def get_moon_altaz(self, start_time: Time, end_time: Time) -> TargetAltAz:
+        ephemeris = self._get_ephemeris(start_time, end_time, self.time_resolution)
         # * Given UTC inputs
-        moon_altaz = get_body('moon', observation_times, location=self.observatory_location).transform_to(
-            AltAz(obstime=observation_times, location=self.observatory_location))
+        moon = ephemeris.moon
 
         altaz_data = AltAzData()
         airmass_data = AirmassData()
 
-        altaz_data.time = observation_times.isot.tolist()
-        altaz_data.alt = moon_altaz.alt.deg.tolist()
-        altaz_data.az = moon_altaz.az.deg.tolist()
-        airmass_data.time = observation_times.isot.tolist()
-        airmass_data.airmass = moon_altaz.secz
+        altaz_data.time = ephemeris.isot
+        altaz_data.alt = moon.alt.tolist()
+        altaz_data.az = moon.az.tolist()
+        airmass_data.time = ephemeris.isot
+        airmass_data.airmass = 1 / np.sin(np.radians(moon.alt))
         return TargetAltAz(name='Moon', altAz=altaz_data, airmass=airmass_data)
 
     def get_target_altaz(self, name, ra, dec, start_time: Time, end_time: Time) -> TargetAltAz:
-        target = SkyCoord(ra=ra*u.deg, dec=dec*u.deg, frame='icrs')
-        time_resolution = TimeDelta(self._get_time_resolution(
-            start_time, end_time)).to(u.day).value
-        jd_range = np.arange(start_time.jd, end_time.jd +
-                             time_resolution, time_resolution)
-        observation_times = Time(jd_range, format='jd', scale='utc')
+        ephemeris = self._get_ephemeris(
+            start_time, end_time, self._get_time_resolution(start_time, end_time))
         # * Given UTC inputs
-        altaz = target.transform_to(
-            AltAz(obstime=observation_times, location=self.observatory_location))
+        alt, az, secz = ephemeris.altaz(ra, dec)
 
         altaz_data = AltAzData()
         airmass_data = AirmassData()
-        altaz_data.time = observation_times.isot.tolist()
-        altaz_data.alt = altaz.alt.deg.tolist()
-        altaz_data.az = altaz.az.deg.tolist()
-        airmass_data.time = observation_times.isot.tolist()
-        airmass_data.airmass = altaz.secz
+        altaz_data.time = ephemeris.isot
+        altaz_data.alt = alt.tolist()
+        altaz_data.az = az.tolist()
+        airmass_data.time = ephemeris.isot
+        airmass_data.airmass = secz
         return TargetAltAz(name, altaz_data, airmass_data)
 
-    def get_targets_altaz(self, targets: List[Target], start_time: Time, end_time: Time) -> List[TargetAltAz]:
+    def get_targets_altaz(self, targets: List[Target], start_time: Time, end_time: Time,
+                          batched: bool = True, max_points: int = None) -> List[TargetAltAz]:
+        """Compute alt/az curves for many targets.
+
+        In batched mode all targets share one time grid and one ``AltAz`` frame, and a
+        single (targets x times) broadcast transform replaces the per-target loop.
+        Passing ``max_points`` switches to :meth:`get_targets_altaz_adaptive`.
+        """
+        if max_points is not None:
+            return self.get_targets_altaz_adaptive(targets, start_time, end_time, max_points)
+        if not batched:
+            targets_altaz = []
+            for target in targets:
+                target_altaz = self.get_target_altaz(target.name,
+                                                     target.ra, target.dec, start_time, end_time)
+                targets_altaz.append(target_altaz)
+
+            return targets_altaz
+
+        if not targets:
+            return []
+
+        ephemeris = self._get_ephemeris(
+            start_time, end_time, self._get_time_resolution(start_time, end_time))
+        # * Given UTC inputs, shape (targets, times)
+        alt, az, secz = ephemeris.altaz([target.ra for target in targets],
+                                        [target.dec for target in targets])
+        times = ephemeris.isot
+
         targets_altaz = []
-        for target in targets:
-            target_altaz = self.get_target_altaz(target.name,
-                                                 target.ra, target.dec, start_time, end_time)
-            targets_altaz.append(target_altaz)
+        for i, target in enumerate(targets):
+            altaz_data = AltAzData()
+            airmass_data = AirmassData()
+            altaz_data.time = times
+            altaz_data.alt = alt[i].tolist()
+            altaz_data.az = az[i].tolist()
+            airmass_data.time = times
+            airmass_data.airmass = secz[i]
+            targets_altaz.append(TargetAltAz(target.name, altaz_data, airmass_data))
 
         return targets_altaz
 
-    def get_airmass(self, ra, dec, start_time, end_time):
-        target = SkyCoord(ra=ra*u.deg, dec=dec*u.deg, frame='icrs')
-        observation_times = Time(np.arange(
-            start_time.jd, end_time.jd, self.time_resolution.to(u.day).value), format='jd')
+    def get_targets_altaz_adaptive(self, targets: List[Target], start_time: Time, end_time: Time,
+                                   max_points: int, alt_threshold: float = None) -> List[TargetAltAz]:
+        """Alt/az curves with at most ``max_points`` samples per target.
+
+        Samples are dense around rise/set, transit and ``alt_threshold`` crossings
+        (the observatory's threshold by default) and coarse elsewhere, so each target
+        gets its own time axis. An empty or reversed window has nothing to refine and
+        gets the fixed-grid result.
+        """
+        if alt_threshold is None:
+            alt_threshold = self.observatory.alt_threshold if self.observatory is not None else 0.0
+        span = (end_time - start_time).to(u.day).value
+        if span <= 0:
+            return self.get_targets_altaz(targets, start_time, end_time)
+        n_coarse, levels = plan_lattice(span, max_points)
+        if not targets:
+            return []
+
+        coarse = self._get_ephemeris(start_time, end_time, span / (n_coarse - 1) * u.day)
+        lattice = LatticeEphemeris(coarse, stride=2 ** levels)
+        indices, alts, azs = sample_adaptively(
+            lattice, [target.ra for target in targets], [target.dec for target in targets],
+            stride=2 ** levels, max_points=max_points, thresholds=(0.0, alt_threshold))
+
+        # Times are formatted once per distinct sample taken; the coarse grid is shared by all targets
+        unique, inverse = np.unique(np.concatenate(indices), return_inverse=True)
+        isot = np.array(lattice.isot(unique), dtype=object)[inverse].tolist()
+        bounds = np.cumsum([0] + [len(index) for index in indices])
+        targets_altaz = []
+        for target, start, stop, alt, az in zip(targets, bounds[:-1], bounds[1:], alts, azs):
+            times = isot[start:stop]
+            altaz_data = AltAzData()
+            airmass_data = AirmassData()
+            altaz_data.time = times
+            altaz_data.alt = alt.tolist()
+            altaz_data.az = az.tolist()
+            airmass_data.time = times
+            airmass_data.airmass = 1 / np.sin(np.radians(alt))
+            targets_altaz.append(TargetAltAz(target.name, altaz_data, airmass_data))
+
+        return targets_altaz
 
-        airmasses = []
-        for time in observation_times:
-            if not self.is_moon_interfering(target, time):
-                altaz = target.transform_to(
-                    AltAz(obstime=time, location=self.observatory_location))
-                airmasses.append(altaz.secz)
-            else:
-                airmasses.append(np.inf)
+    def get_airmass_matrix(self, ra, dec, start_time: Time, end_time: Time) -> np.ndarray:
+        """Airmass for many targets as a ``(targets, times)`` array.
 
-        return airmasses
+        The moon track is computed once for the grid; samples closer to the moon than
+        ``avoidance_angle`` are set to ``inf``.
+        """
+        ephemeris = self._get_ephemeris(start_time, end_time, self.time_resolution, include_end=False)
+        ra = np.atleast_1d(np.asarray(ra, dtype=float))
+        dec = np.atleast_1d(np.asarray(dec, dtype=float))
+        if not ra.size or not len(ephemeris):
+            return np.empty((ra.size, len(ephemeris)))
 
-    def get_targets_airmass(self, targets: List[Target], start_time: Time, end_time: Time) -> List[List[float]]:
-        targets_airmass = []
-        for target in targets:
-            target_airmass = self.get_airmass(
-                target.ra, target.dec, start_time, end_time)
-            targets_airmass.append(target_airmass)
+        alt, az, secz = ephemeris.altaz(ra, dec)
+        separation = ephemeris.moon_separation(alt, az)
+        return np.where(separation < self.avoidance_angle.to_value(u.deg), np.inf, secz)
 
-        return targets_airmass
+    def get_airmass(self, ra, dec, start_time, end_time):
+        return self.get_airmass_matrix([ra], [dec], start_time, end_time)[0].tolist()
+
+    def get_targets_airmass(self, targets: List[Target], start_time: Time, end_time: Time) -> List[List[float]]:
+        return self.get_airmass_matrix([target.ra for target in targets],
+                                       [target.dec for target in targets],
+                                       start_time, end_time).tolist()
@@ -1,56 +1,115 @@
+import hashlib
+import json
+import logging
 from urllib.parse import quote
 
+import numpy as np
 from astropy.table import Table
+from helpers.circuit import CircuitBreaker, CircuitOpenError
+from helpers.retry import retry_with_backoff
 from targets.models import Target
 
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the columnar SED stored on Target.sed changes
+SED_FORMAT_VERSION = 1
+
+vizier_circuit = CircuitBreaker('vizier')
+
+
+def _json_column(values) -> list:
+    """Float column as a JSON-safe list; masked and NaN entries become None."""
+    values = np.ma.filled(np.ma.asarray(values, dtype=float), np.nan)
+    column = values.astype(object)
+    column[np.isnan(values)] = None
+    return column.tolist()
+
+
+def aggregate_sed(sed: Table) -> dict:
+    """Compact columnar form of a Vizier SED table.
+
+    Filters are listed once, in order of first appearance, and each photometric
+    point refers to its filter by index.
+    """
+    filters = np.asarray(sed['sed_filter']).astype(str)
+    names, first, inverse = np.unique(filters, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return {
+        'version': SED_FORMAT_VERSION,
+        'filters': names[order].tolist(),
+        'filter': rank[inverse].tolist(),
+        'freq': _json_column(sed['sed_freq']),  # GHz
+        'flux': _json_column(sed['sed_flux']),  # Jy
+        'eflux': _json_column(sed['sed_eflux']),
+    }
+
+
+def sed_rows(columns: dict) -> list[dict]:
+    """Per-filter records, as served by the SED endpoint, from the columnar form."""
+    index = np.asarray(columns['filter'], dtype=int)
+    freq, flux, eflux = (np.asarray(columns[key], dtype=float) for key in ('freq', 'flux', 'eflux'))
+    fluxv = freq * flux * 1e-26
+
+    order = np.argsort(index, kind='stable')
+    bounds = np.searchsorted(index[order], np.arange(len(columns['filters']) + 1))
+    rows = []
+    for i, name in enumerate(columns['filters']):
+        points = order[bounds[i]:bounds[i + 1]]
+        rows.append({
+            'filter': name,
+            'flux': flux[points].tolist(),
+            'fluxe': eflux[points].tolist(),
+            'fluxv': fluxv[points].tolist(),
+            'frequency': float(freq[points[0]]),
+        })
+    return rows
+
 
 class VizierService:
     RETRIES = 3
+    BACKOFF = 1.0  # seconds before the first retry; doubles on each further attempt
 
     def __init__(self):
         self.radius = 2  # arcsecond
 
-    def get_sed(self, target: Target):
+    def cache_key(self, target: Target) -> str:
+        """Identifies the cone a stored SED was fetched for; any change of ra/dec or radius invalidates it."""
+        canonical = json.dumps({'version': SED_FORMAT_VERSION, 'ra': target.ra, 'dec': target.dec,
+                                'radius': self.radius}, sort_keys=True)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def is_fresh(self, target: Target) -> bool:
+        return target.sed is not None and target.hashed_sed == self.cache_key(target)
+
+    def store(self, target: Target, sed: Table):
+        """Set the columnar SED and its key on ``target``; the caller saves it."""
+        target.sed, target.hashed_sed = aggregate_sed(sed), self.cache_key(target)
+
+    def fetch_sed(self, target: Target) -> Table | None:
+        """Download the SED, or None when every attempt failed; raises CircuitOpenError while Vizier is down."""
         coord = target.coordinates
         coord = coord.replace(":", " ")
         url = f"https://vizier.cds.unistra.fr/viz-bin/sed?-c={quote(coord)}&-c.rs={self.radius}"
 
-        for _ in range(self.RETRIES):
-            try:
-                sed = Table.read(url)
-                break
-            except Exception as e:
-                print(f"Exception: {e}")
-        else:
+        try:
+            return retry_with_backoff(lambda: vizier_circuit.call(lambda: Table.read(url)),
+                                      attempts=self.RETRIES, base_delay=self.BACKOFF)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Vizier SED download for {target.name} failed: {e}")
             return None
 
-        sed_freq = list(sed['sed_freq'])  # GHz
-        sed_flux = list(sed['sed_flux'])
-        sed_fluxe = list(sed['sed_eflux'])
-        sed_filter = list(sed['sed_filter'])
-
-        aggregated_data = {}
-
-        for f, flux, fluxe, freq in zip(sed_filter, sed_flux, sed_fluxe, sed_freq):
-            if f not in aggregated_data:
-                aggregated_data[f] = []
-            flux_to_w_m2_hz = flux * 1e-26
-            fluxv = freq * flux_to_w_m2_hz
-            aggregated_data[f].append({
-                'flux': flux,
-                'fluxe': fluxe,
-                'fluxv': fluxv,
-                'frequency': freq
-            })
-
-        result = []
-        for filter_name, data_list in aggregated_data.items():
-            result.append({
-                'filter': filter_name,
-                'flux': [item['flux'] for item in data_list],
-                'fluxe': [item['fluxe'] for item in data_list],
-                'fluxv': [item['fluxv'] for item in data_list],
-                'frequency': [item['frequency'] for item in data_list][0],
-            })
-
-        return result
+    def get_sed(self, target: Target, refresh: bool = False) -> list[dict] | None:
+        """SED grouped by filter, read from ``Target.sed`` when it matches the current cone."""
+        if not refresh and self.is_fresh(target):
+            return sed_rows(target.sed)
+
+        sed = self.fetch_sed(target)
+        if sed is None:
+            return None
+        self.store(target, sed)
+        Target.objects.filter(pk=target.pk).update(sed=target.sed, hashed_sed=target.hashed_sed)
+        return sed_rows(target.sed)
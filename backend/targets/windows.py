@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import astropy.units as u
+import erfa
+import numpy as np
+from astropy.coordinates import AltAz, EarthLocation
+from astropy.coordinates.erfa_astrom import erfa_astrom
+from astropy.time import Time
+
+from observations.observatory_config import ObservatoryConfig
+from observations.sidereal import SIDEREAL_DAY, SIDEREAL_RATE, hour_angle_at, twilight_offsets, wrap_angle
+
+
+@dataclass
+class NightWindows:
+    """Rise/set/transit and observable intervals for ``(targets, nights)``; times are UTC JD, NaN if none."""
+    nights: list[date]
+    rise: np.ndarray
+    set: np.ndarray
+    transit: np.ndarray
+    transit_alt: np.ndarray
+    windows: list[list[list[tuple[float, float]]]]
+
+    def to_dicts(self, targets) -> list[dict]:
+        """Compact per-target records; all times are converted to ISO strings in one pass."""
+        flat = [self.rise.ravel(), self.set.ravel(), self.transit.ravel()]
+        flat.extend(np.ravel(row) for per_target in self.windows for row in per_target if row)
+        jd = np.concatenate(flat)
+        iso = np.full(len(jd), None, dtype=object)
+        finite = np.isfinite(jd)
+        if finite.any():
+            iso[finite] = [t[:19] + 'Z' for t in Time(jd[finite], format='jd', scale='utc').isot]
+
+        size = self.rise.size
+        rise, set_, transit = (iso[i * size:(i + 1) * size].reshape(self.rise.shape) for i in range(3))
+        position = 3 * size
+        records = []
+        for i, target in enumerate(targets):
+            nights = []
+            for j, night in enumerate(self.nights):
+                windows = []
+                for _ in self.windows[i][j]:
+                    windows.append([iso[position], iso[position + 1]])
+                    position += 2
+                nights.append({
+                    'night': night.isoformat(),
+                    'rise': rise[i, j],
+                    'set': set_[i, j],
+                    'transit': transit[i, j],
+                    'transit_alt': round(float(self.transit_alt[i, j]), 2),
+                    'windows': windows,
+                })
+            records.append({'id': target.id, 'name': target.name, 'nights': nights})
+        return records
+
+
+class WindowCalculator:
+    """Analytic visibility planner for one observatory.
+
+    For each local night the ERFA astrometry context is built once at local midnight.
+    Targets are moved to CIRS in one broadcast call, and rise/set/transit times then
+    follow from hour-angle geometry on the Earth rotation angle. Rise and set are
+    polished with Newton steps on the exact observed altitude.
+    """
+    NEWTON_STEPS = 2
+
+    def __init__(self, observatory: ObservatoryConfig, sun_altitude: float = -12.0):
+        self.observatory = observatory
+        self.location = EarthLocation(lat=observatory.latitude * u.deg, lon=observatory.longitude * u.deg,
+                                      height=observatory.height * u.m)
+        self.sun_altitude = sun_altitude
+        self.altitude_limit = np.radians(observatory.min_altitude)
+
+    def local_midnights(self, nights: list[date]) -> Time:
+        midnights = [(night + timedelta(days=1)).isoformat() for night in nights]
+        return Time(midnights, scale='utc') - self.observatory.utc_offset_hours * u.hour
+
+    def _altitude(self, ra, dec, astrom, offset):
+        shifted = np.broadcast_to(astrom, np.shape(offset)).copy()
+        shifted['eral'] = shifted['eral'] + SIDEREAL_RATE * offset
+        _, zenith, _, _, _ = erfa.atioq(ra, dec, shifted)
+        return np.pi / 2 - zenith
+
+    def _refine(self, ra, dec, astrom, offset, cos_phi):
+        # offset is in days from local midnight; NaN entries stay NaN
+        for _ in range(self.NEWTON_STEPS):
+            altitude = self._altitude(ra, dec, astrom, np.nan_to_num(offset))
+            hour_angle = astrom['eral'] + SIDEREAL_RATE * offset - ra
+            rate = -SIDEREAL_RATE * cos_phi * np.cos(dec) * np.sin(hour_angle) / np.cos(altitude)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                offset = offset - (altitude - self.altitude_limit) / rate
+        return offset
+
+    def compute(self, ra, dec, first_night: date, last_night: date) -> NightWindows:
+        nights = [first_night + timedelta(days=i) for i in range((last_night - first_night).days + 1)]
+        midnights = self.local_midnights(nights)
+        astrom = erfa_astrom.get().apco(AltAz(obstime=midnights, location=self.location))
+        sin_phi, cos_phi = astrom['sphi'], astrom['cphi']
+
+        ra = np.radians(np.asarray(ra, dtype=float))[:, np.newaxis]
+        dec = np.radians(np.asarray(dec, dtype=float))[:, np.newaxis]
+        ra_c, dec_c = erfa.atciq(ra, dec, 0.0, 0.0, 0.0, 0.0, astrom[np.newaxis, :])
+
+        # Transit nearest to local midnight, offsets in days
+        transit = -wrap_angle(astrom['eral'] - ra_c) / SIDEREAL_RATE
+        half_arc, always_up, never_up = hour_angle_at(self.altitude_limit, sin_phi, cos_phi, dec_c)
+        crosses = ~(always_up | never_up)
+        rise = np.where(crosses, transit - half_arc / SIDEREAL_RATE, np.nan)
+        set_ = np.where(crosses, transit + half_arc / SIDEREAL_RATE, np.nan)
+        rise = self._refine(ra_c, dec_c, astrom, rise, cos_phi)
+        set_ = self._refine(ra_c, dec_c, astrom, set_, cos_phi)
+        transit_alt = np.degrees(np.arcsin(sin_phi * np.sin(dec_c) + cos_phi * np.cos(dec_c)))
+
+        dusk, dawn = twilight_offsets(self.location, midnights, astrom, self.sun_altitude)
+        starts, ends = [], []
+        for cycle in (-1, 0, 1):
+            shift = cycle * SIDEREAL_DAY
+            up_start = np.where(always_up, dusk, rise + shift)
+            up_end = np.where(always_up, dawn, set_ + shift)
+            starts.append(np.maximum(up_start, dusk))
+            ends.append(np.minimum(up_end, dawn))
+        starts, ends = np.stack(starts, axis=-1), np.stack(ends, axis=-1)
+        valid = (ends > starts) & ~never_up[..., np.newaxis]
+        # Circumpolar targets get the dark interval once, from the middle cycle only
+        valid[..., [0, 2]] &= ~always_up[..., np.newaxis]
+
+        midnight_jd = midnights.jd
+        windows = [[[] for _ in nights] for _ in range(len(ra))]
+        for i, j, k in zip(*np.nonzero(valid)):
+            windows[i][j].append((midnight_jd[j] + starts[i, j, k], midnight_jd[j] + ends[i, j, k]))
+
+        return NightWindows(
+            nights=nights,
+            rise=midnight_jd + rise,
+            set=midnight_jd + set_,
+            transit=midnight_jd + transit,
+            transit_alt=transit_alt,
+            windows=windows,
+        )
@@ -26,6 +26,17 @@ def _jwt_test_settings(settings):
     }
 
 
+@pytest.fixture(autouse=True)
+def _locmem_cache(settings):
+    """Keep cached ephemerides in memory and isolated per test."""
+    from django.core.cache import cache
+
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    cache.clear()
+
+
 # ============================================================================
 # User Fixtures
 # ============================================================================
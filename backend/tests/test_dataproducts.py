@@ -103,3 +103,182 @@ class TestDataProductsAPI:
     def test_lulin_target_data_pk_zero_public(self, api_client):
         response = api_client.get("/api/data-products/lulin/target/0/")
         assert response.status_code == status.HTTP_200_OK
+
+
+# ============================================================================
+# Photometry ETL Tests
+# ============================================================================
+
+
+PSF_HEADER = ("object,complete_info_filename,obs_midMJD,mag,RA_fit,Dec_fit,intexptime,"
+              "optimized_zeropoint_mag,filter,telescope,estimated_FWHM\n")
+
+
+@pytest.mark.django_db
+class TestPhotometryImport:
+    def test_rows_are_paired_by_name_then_position(self, sample_target, user, tmp_path, mocker):
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from dataproducts.models import ETLLogs, LulinDataProduct
+        from targets.models import Target
+
+        named = Target.objects.create(user=user, name="SN2024abc", ra=150.0, dec=2.0)
+        (tmp_path / "night1_psf.csv").write_text(
+            PSF_HEADER
+            + "SN2024abc,a.fits,60000.1,15.1,150.5,2.5,60,25,rp_Astrodon_2019,LOT,2.1\n"
+            + "field_star,b.fits,60000.2,16.2,10.68470,41.26872,60,25,gp_Astrodon_2019,SLT,2.2\n"
+            + "nowhere,c.fits,60000.3,17.3,300.0,-20.0,60,25,gp_Astrodon_2019,LOT,2.3\n"
+            + "SN2024abc,d.fits,60000.4,15.4,150.0,2.0,60,25,bad_filter,LOT,2.4\n")
+        mocker.patch("helpers.management.commands.import_csv_data.FILE_PATH", str(tmp_path))
+
+        # Target matching is a single query for the whole run, not one per row
+        with CaptureQueriesContext(connection) as queries:
+            call_command("import_csv_data", stdout=mocker.MagicMock())
+        assert sum('FROM "Target"' in query["sql"] for query in queries) == 1
+
+        products = {p.file_name: p.target_id for p in LulinDataProduct.objects.all()}
+        assert products == {"a.fits": named.pk, "b.fits": sample_target.pk, "c.fits": None}
+        file_log = ETLLogs.objects.get(name="night1_psf.csv")
+        run_log = ETLLogs.objects.exclude(pk=file_log.pk).get()
+        assert run_log.success is True and file_log.success is True
+        assert "bad_filter" in run_log.error_message and "bad_filter" in file_log.error_message
+
+    def test_reimport_updates_rows_in_place(self, sample_target, tmp_path, mocker):
+        from django.core.management import call_command
+
+        from dataproducts.models import LulinDataProduct
+
+        csv = tmp_path / "night1_psf.csv"
+        row = "M31,a.fits,60000.1,{mag},10.6847,41.2687,60,25,rp_Astrodon_2019,LOT,2.1\n"
+        csv.write_text(PSF_HEADER + row.format(mag=15.0) + row.format(mag=15.2))
+        mocker.patch("helpers.management.commands.import_csv_data.FILE_PATH", str(tmp_path))
+
+        call_command("import_csv_data", stdout=mocker.MagicMock())
+        assert list(LulinDataProduct.objects.values_list("mag", flat=True)) == [15.2]
+
+        csv.write_text(PSF_HEADER + row.format(mag=14.9))
+        call_command("import_csv_data", stdout=mocker.MagicMock())
+        product = LulinDataProduct.objects.get()
+        assert (product.mag, product.target_id) == (14.9, sample_target.pk)
+
+    def test_rows_are_written_in_batches(self, db, mocker, django_assert_num_queries):
+        import pandas as pd
+
+        from dataproducts import photometry
+        from dataproducts.models import LulinDataProduct
+        from targets.crossmatch import TargetCatalog
+
+        df = pd.DataFrame({
+            "object": [f"S{i}" for i in range(25)], "complete_info_filename": "a.fits",
+            "obs_midMJD": 60000.5, "mag": 15.0, "RA_fit": ["10.0"] * 3 + ["not a number"] + ["10.0"] * 21,
+            "Dec_fit": 20.0, "intexptime": 60, "optimized_zeropoint_mag": 25.0, "filter": "gp_Astrodon_2019",
+            "telescope": "LOT", "estimated_FWHM": 2.0,
+        })
+        rows, warnings = photometry.prepare_rows(df, TargetCatalog())
+        assert len(rows) == 24 and warnings == [
+            "Validation error for target 'S3': invalid number or coordinates. Skipping row."]
+
+        mocker.patch.object(photometry, "BATCH_SIZE", 10)
+        with django_assert_num_queries(3):
+            assert photometry.upsert_rows(rows) == 24
+        assert LulinDataProduct.objects.count() == 24
+
+
+@pytest.mark.django_db
+class TestIncrementalImport:
+    ROW = "S{i},a.fits,{mjd},15.0,10.0,20.0,60,25,gp_Astrodon_2019,LOT,2.0\n"
+
+    def rows(self, start, stop):
+        return "".join(self.ROW.format(i=i, mjd=60000 + i) for i in range(start, stop))
+
+    def test_only_appended_rows_are_read(self, tmp_path):
+        from dataproducts.models import PhotometryFile
+        from dataproducts.photometry import read_increment
+
+        path = tmp_path / "night_psf.csv"
+        path.write_text(PSF_HEADER + self.rows(0, 3))
+        first = read_increment(str(path))
+        first.checkpoint(str(path))
+        assert (len(first.df), first.rows, first.offset) == (3, 3, path.stat().st_size)
+
+        assert read_increment(str(path), PhotometryFile.objects.get()) is None
+
+        # The last line is still being written: it is left for the next run
+        with path.open("a") as file:
+            file.write(self.rows(3, 5) + "S5,a.fits,600")
+        second = read_increment(str(path), PhotometryFile.objects.get())
+        second.checkpoint(str(path))
+        assert list(second.df["object"]) == ["S3", "S4"]
+        assert second.rows == 5
+
+        with path.open("a") as file:
+            file.write("0")
+        assert read_increment(str(path), PhotometryFile.objects.get()).df.empty
+
+        with path.open("a") as file:
+            file.write("5,15.0,10.0,20.0,60,25,gp_Astrodon_2019,LOT,2.0\n")
+        third = read_increment(str(path), PhotometryFile.objects.get())
+        assert list(third.df["object"]) == ["S5"] and third.df["obs_midMJD"][0] == 60005
+        assert third.rows == 6
+
+    def test_rewritten_file_is_read_again(self, tmp_path):
+        from dataproducts.models import PhotometryFile
+        from dataproducts.photometry import read_increment
+
+        path = tmp_path / "night_psf.csv"
+        path.write_text(PSF_HEADER + self.rows(0, 3))
+        read_increment(str(path)).checkpoint(str(path))
+        path.write_text(PSF_HEADER + self.rows(10, 14))
+        increment = read_increment(str(path), PhotometryFile.objects.get())
+        assert list(increment.df["object"]) == ["S10", "S11", "S12", "S13"]
+
+    def test_rerun_only_imports_new_data(self, tmp_path, mocker):
+        from django.core.management import call_command
+
+        from dataproducts import photometry
+        from dataproducts.models import LulinDataProduct
+
+        mocker.patch("helpers.management.commands.import_csv_data.FILE_PATH", str(tmp_path))
+        (tmp_path / "a_psf.csv").write_text(PSF_HEADER + self.rows(0, 2))
+        (tmp_path / "b_psf.csv").write_text(PSF_HEADER + self.rows(2, 4))
+        call_command("import_csv_data", stdout=mocker.MagicMock())
+        assert LulinDataProduct.objects.count() == 4
+
+        with (tmp_path / "b_psf.csv").open("a") as file:
+            file.write(self.rows(4, 6))
+        prepare = mocker.patch.object(photometry, "prepare_rows", wraps=photometry.prepare_rows)
+        call_command("import_csv_data", stdout=mocker.MagicMock())
+        assert [len(call.args[0]) for call in prepare.call_args_list] == [2]
+        assert LulinDataProduct.objects.count() == 6
+
+        call_command("import_csv_data", "--full", stdout=mocker.MagicMock())
+        assert prepare.call_count == 3
+        assert LulinDataProduct.objects.count() == 6
+
+
+@pytest.mark.django_db
+class TestParallelImport:
+    @pytest.mark.parametrize("workers", ["1", "2"])
+    def test_workers_parse_and_the_command_writes(self, workers, sample_target, tmp_path, mocker):
+        from django.core.management import call_command
+
+        from dataproducts.models import ETLLogs, LulinDataProduct, PhotometryFile
+
+        row = "{name},{file}.fits,60000.{i},15.0,10.6847,41.2687,60,25,gp_Astrodon_2019,LOT,2.0\n"
+        for n in range(4):
+            (tmp_path / f"night{n}_psf.csv").write_text(
+                PSF_HEADER + "".join(row.format(name=f"S{n}{i}", file=n, i=i) for i in range(5)))
+        (tmp_path / "broken_psf.csv").write_text("not,a,photometry,file\n1,2,3,4\n")
+        mocker.patch("helpers.management.commands.import_csv_data.FILE_PATH", str(tmp_path))
+
+        call_command("import_csv_data", "--workers", workers, stdout=mocker.MagicMock())
+
+        assert LulinDataProduct.objects.count() == 20
+        assert set(LulinDataProduct.objects.values_list("target", flat=True)) == {sample_target.pk}
+        assert PhotometryFile.objects.count() == 4
+        files = {log.name: log for log in ETLLogs.objects.filter(file_processed=1)}
+        assert {name for name, log in files.items() if log.success} == {f"night{n}_psf.csv" for n in range(4)}
+        assert not files["broken_psf.csv"].success
+        assert "Missing columns" in files["broken_psf.csv"].error_message
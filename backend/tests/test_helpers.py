@@ -1,4 +1,4 @@
-"""Tests for the helpers app: Tags, Comments, Announcements, and SoftDelete."""
+"""Tests for the helpers app: Tags, Comments, Announcements, SoftDelete and background jobs."""
 
 import pytest
 from rest_framework import status
@@ -154,3 +154,227 @@ class TestHelpersAPI:
             format="json",
         )
         assert response.status_code == status.HTTP_201_CREATED
+
+
+# ============================================================================
+# Background Jobs
+# ============================================================================
+
+
+_SED = [{"filter": "Johnson:V", "flux": [1.0], "fluxe": [0.1], "fluxv": [1.0], "frequency": 541.4}]
+
+
+@pytest.mark.django_db
+class TestJobs:
+    def test_enqueue_reuses_active_job(self, user, sample_target):
+        from helpers.jobs import enqueue
+
+        first = enqueue("targets.sed", user, target_id=sample_target.pk)
+        second = enqueue("targets.sed", user, target_id=sample_target.pk)
+        other = enqueue("targets.simbad", user, target_id=sample_target.pk)
+
+        assert first.pk == second.pk
+        assert other.pk != first.pk
+
+    def test_enqueue_rejects_unknown_kind(self, user):
+        from helpers.jobs import enqueue
+
+        with pytest.raises(ValueError):
+            enqueue("nope", user)
+
+    def test_worker_runs_jobs_in_order(self, user, sample_target, mocker):
+        from helpers.jobs import enqueue, run_worker
+        from helpers.models import Job
+
+        mocker.patch("targets.vizier.VizierService.get_sed", return_value=_SED)
+        mocker.patch("targets.simbad.SimbadService.get_target", return_value=None)
+        sed = enqueue("targets.sed", user, target_id=sample_target.pk)
+        simbad = enqueue("targets.simbad", user, target_id=sample_target.pk)
+
+        assert run_worker(once=True) == 2
+        sed.refresh_from_db()
+        simbad.refresh_from_db()
+        assert sed.status == Job.Status.SUCCEEDED and sed.progress == 1.0
+        assert sed.result[0]["filter"] == "Johnson:V"
+        assert simbad.status == Job.Status.FAILED and simbad.error == "Target not found"
+        assert sed.started_at <= simbad.started_at
+
+    def test_unexpected_error_fails_job(self, user, sample_target, mocker):
+        from helpers.jobs import enqueue, run_worker
+        from helpers.models import Job
+
+        mocker.patch("targets.vizier.VizierService.get_sed", side_effect=RuntimeError("vizier down"))
+        job = enqueue("targets.sed", user, target_id=sample_target.pk)
+        run_worker(once=True)
+        job.refresh_from_db()
+
+        assert job.status == Job.Status.FAILED
+        assert job.error == "RuntimeError: vizier down"
+
+    def test_stale_running_job_is_requeued(self, user, sample_target):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from helpers.jobs import claim_next, enqueue, requeue_stale
+        from helpers.models import Job
+
+        job = enqueue("targets.sed", user, target_id=sample_target.pk)
+        assert claim_next("w1").pk == job.pk
+        assert claim_next("w2") is None
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        assert requeue_stale(timedelta(minutes=30)) == 1
+        assert claim_next("w2").pk == job.pk
+
+    def test_long_job_with_heartbeat_is_not_requeued(self, user, sample_target):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from helpers.jobs import Heartbeat, claim_next, enqueue, requeue_stale, set_progress
+        from helpers.models import Job
+
+        enqueue("targets.sed", user, target_id=sample_target.pk)
+        job = claim_next("w1")
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(pk=job.pk).update(started_at=hour_ago, heartbeat_at=hour_ago)
+
+        Heartbeat(job).beat()
+        assert requeue_stale(timedelta(minutes=30)) == 0
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=hour_ago)
+        set_progress(job, 0.5)
+        assert requeue_stale(timedelta(minutes=30)) == 0
+        assert Job.objects.get(pk=job.pk).worker == "w1"
+
+
+@pytest.mark.django_db
+class TestJobsAPI:
+    def test_async_sed_returns_job(self, authenticated_client, sample_target, mocker):
+        from helpers.jobs import run_worker
+
+        mocker.patch("targets.vizier.VizierService.get_sed", return_value=_SED)
+        response = authenticated_client.get(f"/api/targets/{sample_target.pk}/sed/?async=true")
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job = response.json()
+        assert job["status"] == "Queued" and job["result"] is None
+
+        run_worker(once=True)
+        polled = authenticated_client.get(f"/api/jobs/{job['id']}/?wait=1").json()
+        assert polled["status"] == "Succeeded"
+        assert polled["result"][0]["filter"] == "Johnson:V"
+
+    def test_jobs_are_private(self, admin_client, user, sample_target):
+        from helpers.jobs import enqueue
+
+        job = enqueue("targets.sed", user, target_id=sample_target.pk)
+        assert admin_client.get(f"/api/jobs/{job.pk}/").status_code == status.HTTP_404_NOT_FOUND
+        assert admin_client.get("/api/jobs/").json() == []
+
+    def test_invalid_wait(self, authenticated_client, user, sample_target):
+        from helpers.jobs import enqueue
+
+        job = enqueue("targets.sed", user, target_id=sample_target.pk)
+        response = authenticated_client.get(f"/api/jobs/{job.pk}/?wait=soon")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestRetryWithBackoff:
+    def test_delays_double_until_success(self, mocker):
+        from helpers.retry import retry_with_backoff
+
+        sleep = mocker.patch("helpers.retry.time.sleep")
+        mocker.patch("helpers.retry.random.uniform", return_value=1.0)
+        func = mocker.Mock(side_effect=[OSError, OSError, OSError, "ok"])
+
+        assert retry_with_backoff(func, attempts=4, base_delay=1.0, max_delay=3.0) == "ok"
+        assert [c.args[0] for c in sleep.call_args_list] == [1.0, 2.0, 3.0]
+
+    def test_last_error_is_raised(self, mocker):
+        from helpers.retry import retry_with_backoff
+
+        mocker.patch("helpers.retry.time.sleep")
+        func = mocker.Mock(side_effect=ValueError("boom"))
+        with pytest.raises(ValueError, match="boom"):
+            retry_with_backoff(func, attempts=2)
+        assert func.call_count == 2
+
+
+@pytest.mark.django_db
+class TestCircuitBreaker:
+    @pytest.fixture
+    def breaker(self, settings):
+        from helpers.circuit import CircuitBreaker
+
+        settings.CIRCUIT_BREAKER_MIN_CALLS = 4
+        settings.CIRCUIT_BREAKER_FAILURE_RATE = 0.5
+        settings.CIRCUIT_BREAKER_WINDOW = 60
+        settings.CIRCUIT_BREAKER_COOLDOWN = 30
+        return CircuitBreaker("test")
+
+    @staticmethod
+    def _fail():
+        raise OSError("down")
+
+    def test_opens_on_failure_rate_and_fails_fast(self, breaker, mocker):
+        from helpers.circuit import CircuitOpenError
+
+        breaker.call(lambda: "ok")
+        breaker.call(lambda: "ok")
+        with pytest.raises(OSError):
+            breaker.call(self._fail)
+        assert not breaker.is_open
+        with pytest.raises(OSError):
+            breaker.call(self._fail)
+        assert breaker.is_open
+
+        func = mocker.Mock()
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.call(func)
+        func.assert_not_called()
+        assert 1 <= excinfo.value.retry_after <= 30
+
+    def test_half_open_probe(self, breaker, mocker):
+        from helpers.circuit import CircuitOpenError
+
+        clock = mocker.patch("helpers.circuit.time.time", return_value=1000.0)
+        for _ in range(4):
+            with pytest.raises(OSError):
+                breaker.call(self._fail)
+        assert breaker.is_open
+
+        clock.return_value = 1031.0
+        with pytest.raises(OSError):
+            breaker.call(self._fail)  # the probe fails: open for another cooldown
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "ok")
+
+        clock.return_value = 1062.0
+        assert breaker.call(lambda: "ok") == "ok"
+        assert not breaker.is_open
+
+    def test_only_one_probe_at_a_time(self, breaker, mocker):
+        from helpers.circuit import CircuitOpenError
+
+        clock = mocker.patch("helpers.circuit.time.time", return_value=1000.0)
+        for _ in range(4):
+            with pytest.raises(OSError):
+                breaker.call(self._fail)
+        clock.return_value = 1031.0
+        assert breaker._claim_probe()  # another worker is probing
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "ok")
+
+        breaker.reset()
+        assert breaker.call(lambda: "ok") == "ok"
+
+    def test_open_circuit_is_not_retried(self, breaker, mocker):
+        from helpers.circuit import CircuitOpenError
+        from helpers.retry import retry_with_backoff
+
+        sleep = mocker.patch("helpers.retry.time.sleep")
+        func = mocker.Mock(side_effect=CircuitOpenError("test", 30))
+        with pytest.raises(CircuitOpenError):
+            retry_with_backoff(func, attempts=3)
+        assert func.call_count == 1 and sleep.call_count == 0
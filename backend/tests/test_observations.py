@@ -121,3 +121,70 @@ class TestObservationsAPI:
     def test_observatories_endpoint_public(self, api_client):
         response = api_client.get("/api/observatories/")
         assert response.status_code == status.HTTP_200_OK
+
+    def test_altaz_etag_roundtrip(self, authenticated_client, sample_observation, sample_target):
+        from observations.models import LulinRun
+
+        LulinRun.objects.create(observation=sample_observation, target=sample_target)
+        url = f"/api/observations/{sample_observation.pk}/altaz/"
+        response = authenticated_client.post(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()[0]["name"] == sample_target.name
+
+        cached = authenticated_client.post(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached["ETag"] == response["ETag"]
+
+    def test_altaz_point_budget(self, authenticated_client, sample_observation, sample_target):
+        from observations.models import LulinRun
+
+        LulinRun.objects.create(observation=sample_observation, target=sample_target)
+        url = f"/api/observations/{sample_observation.pk}/altaz/"
+        response = authenticated_client.get(url, {"max_points": 20, "layout": "columnar"})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()[0]["time"]) <= 20
+
+        assert authenticated_client.get(url, {"max_points": "1"}).status_code == status.HTTP_400_BAD_REQUEST
+        assert authenticated_client.get(url, {"max_points": "200000"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================================================================
+# Export Tests
+# ============================================================================
+
+
+@pytest.mark.django_db
+class TestObservationExport:
+    def test_one_row_per_observation_target(self, authenticated_client, sample_observation, user):
+        import csv
+        import io
+
+        from targets.models import Target
+
+        extra = Target.objects.create(user=user, name="M33", ra=23.46, dec=30.66)
+        deleted = Target.objects.create(user=user, name="Gone", ra=1, dec=1)
+        sample_observation.targets.add(extra, deleted)
+        deleted.delete()
+
+        response = authenticated_client.get("/api/observations/export/")
+
+        assert response.status_code == status.HTTP_200_OK
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert [row["target"] for row in rows] == ["M31", "M33"]
+        assert rows[0]["observatory"] == "Lulin" and rows[0]["status"] == "Prep"
+        assert rows[0]["observation_id"] == str(sample_observation.id)
+
+    def test_observation_without_targets_and_filters(self, authenticated_client, sample_observation, user):
+        import csv
+        import io
+
+        from observations.models import Observation
+
+        empty = Observation.objects.create(user=user, name="Empty", start_date=timezone.now(),
+                                           end_date=timezone.now() + timedelta(hours=1),
+                                           status=Observation.statuses.DONE)
+        response = authenticated_client.get("/api/observations/export/", {"status": str(Observation.statuses.DONE)})
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert len(rows) == 1
+        assert rows[0]["observation_id"] == str(empty.id) and rows[0]["target_id"] == ""
@@ -122,3 +122,1292 @@ class TestTargetsAPI:
             format="json",
         )
         assert response.status_code == status.HTTP_200_OK
+
+    def test_moon_altaz_is_cached(self, authenticated_client, mocker):
+        from targets.visibility import Visibility
+
+        spy = mocker.spy(Visibility, "get_moon_altaz")
+        payload = {"start_time": "2025-01-13T10:00:00", "end_time": "2025-01-13T12:00:00"}
+        first = authenticated_client.post("/api/targets/moon/altaz/", payload, format="json")
+        second = authenticated_client.post("/api/targets/moon/altaz/", payload, format="json")
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert first.content == second.content
+        assert first.json()["name"] == "Moon"
+        assert spy.call_count == 1
+
+    def test_moon_altaz_columnar_layout(self, authenticated_client):
+        url = "/api/targets/moon/altaz/?start_time=2025-01-13T10:00:00&end_time=2025-01-13T12:00:00"
+        rows = authenticated_client.get(url).json()
+        columns = authenticated_client.get(url, HTTP_ACCEPT="application/json; layout=columnar").json()
+
+        assert set(columns) == {"name", "time", "alt", "az", "airmass"}
+        assert columns["time"] == [row["time"] for row in rows["data"]]
+        assert columns["alt"][0] == pytest.approx(rows["data"][0]["alt"], abs=1e-4)
+
+    def test_moon_altaz_rejects_bad_times(self, authenticated_client):
+        url = "/api/targets/moon/altaz/"
+        missing = authenticated_client.get(url, {"start_time": "2025-01-13T10:00:00"})
+        assert missing.status_code == status.HTTP_400_BAD_REQUEST
+        assert "end_time" in missing.json()
+
+        malformed = authenticated_client.get(url, {"start_time": "yesterday", "end_time": "2025-01-13T12:00:00"})
+        assert malformed.status_code == status.HTTP_400_BAD_REQUEST
+        assert "start_time" in malformed.json()
+
+        reversed_ = authenticated_client.get(url, {"start_time": "2025-01-13T12:00:00",
+                                                   "end_time": "2025-01-13T10:00:00"})
+        assert reversed_.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_moon_altaz_not_modified(self, authenticated_client):
+        url = "/api/targets/moon/altaz/?start_time=2025-01-13T10:00:00&end_time=2025-01-13T12:00:00"
+        etag = authenticated_client.get(url)["ETag"]
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+# ============================================================================
+# Visibility Tests
+# ============================================================================
+
+
+def _visibility():
+    from observations.observatory_config import get_default_observatory
+    from targets.visibility import Visibility
+
+    obs = get_default_observatory()
+    return Visibility.from_observatory(obs)
+
+
+def _fake_targets():
+    from types import SimpleNamespace
+
+    return [
+        SimpleNamespace(name="M31", ra=10.6847, dec=41.2687),
+        SimpleNamespace(name="M42", ra=83.8221, dec=-5.3911),
+        SimpleNamespace(name="Polaris", ra=37.9546, dec=89.2641),
+    ]
+
+
+@pytest.mark.astronomical
+class TestVisibility:
+    def test_batched_matches_per_target_loop(self):
+        import numpy as np
+        from astropy.time import Time
+
+        service = _visibility()
+        start, end = Time("2025-01-01T10:00:00"), Time("2025-01-01T22:00:00")
+        looped = service.get_targets_altaz(_fake_targets(), start, end, batched=False)
+        batched = service.get_targets_altaz(_fake_targets(), start, end)
+
+        assert [t.name for t in batched] == [t.name for t in looped]
+        for a, b in zip(looped, batched):
+            assert a.altaz.time == b.altaz.time
+            np.testing.assert_allclose(a.altaz.alt, b.altaz.alt, atol=1e-8)
+            np.testing.assert_allclose(a.altaz.az, b.altaz.az, atol=1e-8)
+            np.testing.assert_allclose(a.airmass.airmass, b.airmass.airmass, rtol=1e-8)
+
+    def test_to_columns_replaces_non_finite(self):
+        import numpy as np
+
+        from targets.visibility import AirmassData, AltAzData, TargetAltAz
+
+        altaz, airmass = AltAzData(), AirmassData()
+        altaz.time = ["2025-01-01T10:00:00.000", "2025-01-01T10:15:00.000"]
+        altaz.alt, altaz.az = [45.123456, float("nan")], [180.0, 181.0]
+        airmass.airmass = np.array([1.41, np.inf])
+
+        columns = TargetAltAz("M31", altaz, airmass).to_columns()
+        assert columns["time"] == ["2025-01-01T10:00:00Z", "2025-01-01T10:15:00Z"]
+        assert columns["alt"] == [45.1235, None]
+        assert columns["airmass"] == [1.41, None]
+
+    def test_adaptive_respects_budget_and_refines_crossings(self):
+        import astropy.units as u
+        import numpy as np
+        from astropy.time import Time
+
+        service = _visibility()
+        start, end = Time("2025-01-01T00:00:00"), Time("2025-01-02T00:00:00")
+        targets = _fake_targets()[:2]
+        adaptive = service.get_targets_altaz(targets, start, end, max_points=40)
+        assert all(len(t.altaz.time) <= 40 for t in adaptive)
+
+        dense = service._get_ephemeris(start, end, 1 * u.minute)
+        for target, curve in zip(targets, adaptive):
+            times = Time(curve.altaz.time).jd
+            alt = np.array(curve.altaz.alt)
+            assert np.all(np.diff(times) > 0)
+
+            # Adaptive curve interpolated at each true 20 deg crossing stays close to the threshold
+            dense_alt, _, _ = dense.altaz(target.ra, target.dec)
+            crossings = np.flatnonzero(np.diff(np.sign(dense_alt - 20)))
+            assert len(crossings)
+            for i in crossings:
+                assert abs(np.interp(dense.times.jd[i], times, alt) - 20) < 0.5
+
+    def test_adaptive_only_computes_the_coarse_grid(self, mocker):
+        import astropy.units as u
+        import numpy as np
+        from astropy.coordinates import AltAz
+        from astropy.coordinates.erfa_astrom import erfa_astrom
+        from astropy.time import Time
+
+        from targets.ephemeris import ObservatoryEphemeris
+
+        service = _visibility()
+        start, end = Time("2025-01-01T00:00:00"), Time("2025-01-31T00:00:00")
+        built = mocker.spy(ObservatoryEphemeris, "__init__")
+        [curve] = service.get_targets_altaz(_fake_targets()[:1], start, end, max_points=1000)
+        # One ephemeris, on the ~500-point coarse grid rather than the 32k-point lattice
+        assert [call.args[4] for call in built.call_args_list] in ([500], [501])
+
+        # Samples between coarse points match a full astrometry computation at the same times
+        times = Time(curve.altaz.time)
+        astrom = erfa_astrom.get().apco(AltAz(obstime=times, location=service.observatory_location))
+        target = _fake_targets()[0]
+        alt, _, _ = ObservatoryEphemeris._observe(target.ra, target.dec, astrom)
+        assert np.abs(alt - np.array(curve.altaz.alt)).max() < (1 * u.arcsec).to_value(u.deg)
+
+    def test_adaptive_rejects_tiny_budget(self):
+        from astropy.time import Time
+
+        with pytest.raises(ValueError):
+            _visibility().get_targets_altaz(_fake_targets(), Time("2025-01-01"), Time("2025-01-02"), max_points=2)
+
+    def test_adaptive_empty_or_reversed_window_matches_fixed_grid(self):
+        from astropy.time import Time
+
+        service, targets = _visibility(), _fake_targets()[:2]
+        instant, later = Time("2025-01-01T10:00:00"), Time("2025-01-01T12:00:00")
+        for start, end in ((instant, instant), (later, instant)):
+            adaptive = service.get_targets_altaz(targets, start, end, max_points=200)
+            fixed = service.get_targets_altaz(targets, start, end)
+            assert [curve.altaz.time for curve in adaptive] == [curve.altaz.time for curve in fixed]
+        assert len(adaptive[0].altaz.time) == 0
+        assert len(service.get_targets_altaz(targets, instant, instant, max_points=200)[0].altaz.time) == 1
+
+    def test_batched_empty_targets(self):
+        from astropy.time import Time
+
+        service = _visibility()
+        assert service.get_targets_altaz([], Time("2025-01-01"), Time("2025-01-02")) == []
+
+    def test_airmass_matrix_masks_moon(self):
+        import numpy as np
+        from astropy.coordinates import get_body
+        from astropy.time import Time
+
+        service = _visibility()
+        start, end = Time("2025-01-13T10:00:00"), Time("2025-01-13T22:00:00")
+        moon = get_body("moon", start, location=service.observatory_location)
+        ra, dec = [moon.ra.deg, (moon.ra.deg + 180) % 360], [moon.dec.deg, -moon.dec.deg]
+
+        matrix = service.get_airmass_matrix(ra, dec, start, end)
+        assert matrix.shape == (2, 48)
+        assert np.isinf(matrix[0, 0])
+        assert np.isfinite(matrix[1]).all()
+
+    def test_airmass_list_matches_matrix(self):
+        import numpy as np
+        from astropy.time import Time
+
+        service = _visibility()
+        start, end = Time("2025-01-01T10:00:00"), Time("2025-01-01T14:00:00")
+        targets = _fake_targets()
+        rows = service.get_targets_airmass(targets, start, end)
+        single = service.get_airmass(targets[0].ra, targets[0].dec, start, end)
+
+        assert isinstance(rows, list) and len(rows) == len(targets)
+        np.testing.assert_array_equal(rows[0], single)
+
+
+@pytest.mark.astronomical
+class TestEphemerisCache:
+    def test_matches_astropy_transform(self):
+        import astropy.units as u
+        import numpy as np
+        from astropy.coordinates import SkyCoord
+        from astropy.time import Time
+
+        from observations.observatory_config import get_default_observatory
+        from targets.ephemeris import EphemerisCache
+
+        cache = EphemerisCache()
+        ephemeris = cache.get(get_default_observatory(), Time("2025-01-01T10:00:00"),
+                              Time("2025-01-01T22:00:00"), 15 * u.minute)
+        ra, dec = np.array([10.6847, 83.8221]), np.array([41.2687, -5.3911])
+        alt, az, _ = ephemeris.altaz(ra, dec)
+        expected = SkyCoord(ra=ra * u.deg, dec=dec * u.deg)[:, np.newaxis].transform_to(
+            ephemeris.frame[np.newaxis, :])
+
+        np.testing.assert_allclose(alt, expected.alt.deg, atol=1e-8)
+        np.testing.assert_allclose(az, expected.az.deg, atol=1e-8)
+
+    def test_reuses_entry_for_same_grid(self):
+        import astropy.units as u
+        from astropy.time import Time
+
+        from observations.observatory_config import get_default_observatory
+        from targets.ephemeris import EphemerisCache
+
+        cache = EphemerisCache()
+        obs = get_default_observatory()
+        first = cache.get(obs, Time("2025-01-01T10:00:00"), Time("2025-01-01T12:00:00"), 15 * u.minute)
+        second = cache.get(obs, Time("2025-01-01T10:00:00.2"), Time("2025-01-01T12:00:00"), 15 * u.minute)
+        assert first is second
+        assert len(cache) == 1
+
+    def test_lru_eviction(self):
+        import astropy.units as u
+        from astropy.time import Time
+
+        from observations.observatory_config import get_default_observatory
+        from targets.ephemeris import EphemerisCache
+
+        cache = EphemerisCache(maxsize=2)
+        obs = get_default_observatory()
+        start, end = Time("2025-01-01T10:00:00"), Time("2025-01-01T12:00:00")
+        first = cache.get(obs, start, end, 15 * u.minute)
+        cache.get(obs, start, end, 30 * u.minute)
+        cache.get(obs, start, end, 15 * u.minute)
+        cache.get(obs, start, end, 45 * u.minute)
+
+        assert len(cache) == 2
+        assert cache.get(obs, start, end, 15 * u.minute) is first
+
+
+@pytest.mark.astronomical
+class TestMoonEphemerisStore:
+    def test_night_is_computed_once(self, mocker):
+        from datetime import date
+
+        from observations.observatory_config import get_default_observatory
+        from targets.moon import MoonEphemerisStore
+
+        store = MoonEphemerisStore()
+        compute = mocker.spy(store, "compute_night")
+        obs = get_default_observatory()
+        first = store.get_night(obs, date(2025, 1, 13))
+        store.get_night(obs, date(2025, 1, 13))
+
+        assert compute.call_count == 1
+        assert len(first.mjd) == store.samples_per_day + 1
+        assert len(first.rise) == 1 and len(first.set) == 1
+        assert 0.95 < first.track.illumination[0] <= 1.0  # full moon on 2025-01-13
+
+    def test_track_matches_direct_computation(self):
+        import astropy.units as u
+        import numpy as np
+        from astropy.time import Time
+
+        from observations.observatory_config import get_default_observatory
+        from targets.moon import compute_moon_track, moon_store
+
+        service = _visibility()
+        times = Time("2025-01-13T23:00:00") + np.arange(12) * 10 * u.minute  # crosses a UTC day
+        track = moon_store.get_track(get_default_observatory(), times)
+        expected = compute_moon_track(service.observatory_location, times)
+
+        np.testing.assert_allclose(track.alt, expected.alt, atol=1e-6)
+        np.testing.assert_allclose(track.dec, expected.dec, atol=1e-6)
+
+
+def _window_targets():
+    from types import SimpleNamespace
+
+    # A far-southern target that never rises at Lulin follows the shared fixtures
+    targets = _fake_targets() + [SimpleNamespace(name="South", ra=200.0, dec=-80.0)]
+    for pk, target in enumerate(targets, start=1):
+        target.id = pk
+    return targets
+
+
+@pytest.mark.astronomical
+class TestWindowCalculator:
+    def _compute(self, sun_altitude=-12.0):
+        from datetime import date
+
+        from observations.observatory_config import get_default_observatory
+        from targets.windows import WindowCalculator
+
+        targets = _window_targets()
+        calculator = WindowCalculator(get_default_observatory(), sun_altitude=sun_altitude)
+        result = calculator.compute([t.ra for t in targets], [t.dec for t in targets],
+                                    date(2025, 1, 1), date(2025, 1, 3))
+        return calculator, result
+
+    def test_rise_and_set_hit_altitude_limit(self):
+        import astropy.units as u
+        import numpy as np
+        from astropy.coordinates import AltAz, SkyCoord
+        from astropy.time import Time
+
+        calculator, result = self._compute()
+        m31 = _fake_targets()[0]
+        times = Time(np.concatenate([result.rise[0], result.set[0]]), format='jd')
+        alt = SkyCoord(m31.ra * u.deg, m31.dec * u.deg).transform_to(
+            AltAz(obstime=times, location=calculator.location)).alt.deg
+
+        np.testing.assert_allclose(alt, 20.0, atol=1e-3)
+        assert np.all(result.rise[0] < result.transit[0]) and np.all(result.transit[0] < result.set[0])
+
+    def test_windows_respect_twilight(self):
+        import numpy as np
+        from astropy.coordinates import AltAz, get_body
+        from astropy.time import Time
+
+        calculator, result = self._compute()
+        polaris_start, polaris_end = result.windows[2][0][0]
+        times = Time([polaris_start, polaris_end], format='jd')
+        sun = get_body('sun', times, location=calculator.location).transform_to(
+            AltAz(obstime=times, location=calculator.location))
+
+        # Polaris never sets at Lulin, so its window is the whole dark night
+        assert np.isnan(result.rise[2]).all()
+        assert all(len(night) == 1 for night in result.windows[2])
+        np.testing.assert_allclose(sun.alt.deg, -12.0, atol=0.1)
+        (m31_start, m31_end), = result.windows[0][0]
+        assert polaris_start <= m31_start < m31_end <= polaris_end
+
+    def test_never_rising_target_has_no_windows(self):
+        _, result = self._compute()
+        assert result.windows[3] == [[], [], []]
+        assert (result.transit_alt[3] < 0).all()
+
+    def test_to_dicts_shape(self):
+        calculator, result = self._compute()
+        records = result.to_dicts(_window_targets())
+
+        assert [r["name"] for r in records] == ["M31", "M42", "Polaris", "South"]
+        night = records[0]["nights"][0]
+        assert set(night) == {"night", "rise", "set", "transit", "transit_alt", "windows"}
+        assert night["night"] == "2025-01-01"
+        assert night["rise"].endswith("Z") and len(night["windows"][0]) == 2
+        assert records[2]["nights"][0]["rise"] is None
+
+
+@pytest.mark.django_db
+@pytest.mark.astronomical
+class TestTargetWindowsAPI:
+    def test_windows_for_user_targets(self, authenticated_client, sample_target):
+        response = authenticated_client.get(
+            "/api/targets/windows/", {"start_date": "2025-01-01", "end_date": "2025-01-02"})
+
+        assert response.status_code == status.HTTP_200_OK
+        records = response.json()
+        assert [r["id"] for r in records] == [sample_target.pk]
+        assert [n["night"] for n in records[0]["nights"]] == ["2025-01-01", "2025-01-02"]
+
+    def test_windows_rejects_reversed_range(self, authenticated_client):
+        response = authenticated_client.get(
+            "/api/targets/windows/", {"start_date": "2025-01-02", "end_date": "2025-01-01"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.astronomical
+class TestSiderealTable:
+    @pytest.fixture
+    def table_dir(self, settings, tmp_path):
+        from observations import sidereal
+
+        settings.SIDEREAL_TABLE_DIR = str(tmp_path)
+        sidereal._loaded_tables.clear()
+        yield tmp_path
+        sidereal._loaded_tables.clear()
+
+    def test_table_is_saved_and_reloaded(self, table_dir, mocker):
+        from datetime import date
+
+        import numpy as np
+
+        from observations import sidereal
+        from observations.observatory_config import get_default_observatory
+
+        obs = get_default_observatory()
+        table = obs.sidereal_table(date(2024, 12, 30), date(2025, 1, 2))  # spans two yearly files
+        assert [n.isoformat() for n in table.nights] == ["2024-12-30", "2024-12-31", "2025-01-01", "2025-01-02"]
+        assert len(list(table_dir.glob("*.npz"))) == 2
+
+        sidereal._loaded_tables.clear()
+        build = mocker.spy(sidereal, "build_sidereal_table")
+        reloaded = obs.sidereal_table(date(2024, 12, 30), date(2025, 1, 2))
+        assert build.call_count == 0
+        np.testing.assert_array_equal(reloaded.era, table.era)
+        assert reloaded.nights == table.nights
+
+    def test_hours_match_window_calculator(self, table_dir):
+        from datetime import date
+
+        import numpy as np
+
+        from observations.observatory_config import get_default_observatory
+        from targets.windows import WindowCalculator
+
+        obs = get_default_observatory()
+        targets = _window_targets()
+        ra, dec = [t.ra for t in targets], [t.dec for t in targets]
+        first, last = date(2025, 1, 1), date(2025, 1, 10)
+
+        hours = obs.sidereal_table(first, last).observable_hours(ra, dec, obs.min_altitude)
+        windows = WindowCalculator(obs).compute(ra, dec, first, last).windows
+        expected = [[sum(end - start for start, end in night) * 24 for night in target] for target in windows]
+
+        np.testing.assert_allclose(hours, expected, atol=0.02)
+        assert (hours[3] == 0).all()
+
+
+@pytest.mark.django_db
+@pytest.mark.astronomical
+class TestTargetObservabilityAPI:
+    def test_observability_matrix(self, authenticated_client, sample_target, settings, tmp_path):
+        settings.SIDEREAL_TABLE_DIR = str(tmp_path)
+        response = authenticated_client.get(
+            "/api/targets/observability/",
+            {"start_date": "2025-01-01", "end_date": "2025-01-05", "twilight": "astronomical"})
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert body["targets"] == [{"id": sample_target.pk, "name": sample_target.name}]
+        assert len(body["nights"]) == 5 and len(body["hours"][0]) == 5
+
+    def test_observability_rejects_unknown_twilight(self, authenticated_client):
+        response = authenticated_client.get(
+            "/api/targets/observability/",
+            {"start_date": "2025-01-01", "end_date": "2025-01-05", "twilight": "dusk"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================================================================
+# Catalog Cache Tests
+# ============================================================================
+
+
+def _simbad_object():
+    import numpy as np
+
+    from targets.simbad import AstronomicalObject
+
+    return AstronomicalObject({
+        "RA": "00 42 44.330", "DEC": "+41 16 07.50",
+        "OTYPE": np.str_("AGN"), "FLUX_V": np.float32(3.44), "PLX_VALUE": np.ma.masked_array([1.0], mask=[True])[0],
+    })
+
+
+@pytest.mark.django_db
+class TestSimbadCache:
+    def test_repeat_loads_read_from_db(self, authenticated_client, sample_target, mocker):
+        remote = mocker.patch("targets.simbad.SimbadService.get_target", return_value=_simbad_object())
+        url = f"/api/targets/{sample_target.pk}/simbad/"
+        first = authenticated_client.get(url)
+        second = authenticated_client.get(url)
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert first.json() == second.json()
+        assert first.json()["otype"] == "AGN"
+        assert first.json()["flux_V"] == pytest.approx(3.44, rel=1e-6)
+        assert remote.call_count == 1
+
+        sample_target.refresh_from_db()
+        assert sample_target.simbad["PLX_VALUE"] is None
+        assert sample_target.hashed_simbad and sample_target.simbad_fetched_at
+
+    def test_refresh_bypasses_cache(self, authenticated_client, sample_target, mocker):
+        remote = mocker.patch("targets.simbad.SimbadService.get_target", return_value=_simbad_object())
+        url = f"/api/targets/{sample_target.pk}/simbad/"
+        authenticated_client.get(url)
+        authenticated_client.get(url + "?refresh=true")
+        assert remote.call_count == 2
+
+    def test_stale_or_renamed_record_is_refetched(self, sample_target, settings, mocker):
+        from datetime import timedelta
+
+        from targets.models import Target
+        from targets.simbad import get_cached_simbad, is_simbad_fresh
+
+        remote = mocker.patch("targets.simbad.SimbadService.get_target", return_value=_simbad_object())
+        settings.SIMBAD_CACHE_MAX_AGE = 3600
+        get_cached_simbad(sample_target)
+        assert is_simbad_fresh(sample_target)
+
+        Target.objects.filter(pk=sample_target.pk).update(
+            simbad_fetched_at=sample_target.simbad_fetched_at - timedelta(hours=2))
+        sample_target.refresh_from_db()
+        assert not is_simbad_fresh(sample_target)
+
+        get_cached_simbad(sample_target)
+        sample_target.name = "Andromeda"
+        assert not is_simbad_fresh(sample_target)
+        assert remote.call_count == 2
+
+    def test_not_found_is_not_stored(self, authenticated_client, sample_target, mocker):
+        mocker.patch("targets.simbad.SimbadService.get_target", return_value=None)
+        response = authenticated_client.get(f"/api/targets/{sample_target.pk}/simbad/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        sample_target.refresh_from_db()
+        assert sample_target.simbad is None
+
+
+def _vizier_table():
+    import numpy as np
+    from astropy.table import MaskedColumn, Table
+
+    return Table({
+        "sed_filter": ["Johnson:V", "2MASS:Ks", "Johnson:V", "2MASS:J"],
+        "sed_freq": [541.43, 138.38, 541.43, 239.83],
+        "sed_flux": [3.1, 4.2, 3.3, 5.0],
+        "sed_eflux": MaskedColumn([0.1, np.nan, 0.2, 0.3], mask=[False, False, False, True]),
+    })
+
+
+@pytest.mark.django_db
+class TestSEDCache:
+    def test_aggregation_matches_per_filter_layout(self):
+        import numpy as np
+
+        from targets.vizier import aggregate_sed, sed_rows
+
+        columns = aggregate_sed(_vizier_table())
+        rows = sed_rows(columns)
+
+        assert columns["filters"] == ["Johnson:V", "2MASS:Ks", "2MASS:J"]
+        assert columns["filter"] == [0, 1, 0, 2]
+        assert columns["eflux"][1] is None and columns["eflux"][3] is None
+        assert [r["filter"] for r in rows] == columns["filters"]
+        assert rows[0]["flux"] == [3.1, 3.3]
+        assert rows[0]["fluxv"] == pytest.approx([541.43 * 3.1e-26, 541.43 * 3.3e-26])
+        assert rows[0]["frequency"] == 541.43
+        assert np.isnan(rows[2]["fluxe"][0])
+
+    def test_sed_is_served_from_db_until_coordinates_change(self, authenticated_client, sample_target, mocker):
+        read = mocker.patch("targets.vizier.Table.read", return_value=_vizier_table())
+        url = f"/api/targets/{sample_target.pk}/sed/"
+        first = authenticated_client.get(url)
+        second = authenticated_client.get(url)
+
+        assert first.status_code == status.HTTP_200_OK
+        assert first.json() == second.json()
+        assert read.call_count == 1
+        assert first.json()[1]["fluxe"] == [None]
+
+        authenticated_client.put(f"/api/targets/{sample_target.pk}/", {"ra": 10.7}, format="json")
+        authenticated_client.get(url)
+        assert read.call_count == 2
+
+        authenticated_client.get(url + "?refresh=true")
+        assert read.call_count == 3
+
+    def test_failed_download_is_not_stored(self, sample_target, mocker):
+        from targets.vizier import VizierService
+
+        mocker.patch("targets.vizier.Table.read", side_effect=OSError("timeout"))
+        mocker.patch("helpers.retry.time.sleep")
+        assert VizierService().get_sed(sample_target) is None
+        sample_target.refresh_from_db()
+        assert sample_target.sed is None and sample_target.hashed_sed is None
+
+
+def _recorded_simbad_response(*args, **kwargs):
+    from pathlib import Path
+    from types import SimpleNamespace
+
+    return SimpleNamespace(content=(Path(__file__).parent / "data" / "simbad_query_objects.data").read_bytes())
+
+
+class TestSimbadBatch:
+    def test_results_are_aligned_with_inputs(self, mocker):
+        from astroquery.simbad.core import SimbadClass
+
+        from targets.simbad import SimbadService
+
+        request = mocker.patch.object(SimbadClass, "_request", side_effect=_recorded_simbad_response)
+        objects = SimbadService().get_targets(["Polaris", "NoSuchObject123", "M31", "m31"])
+
+        assert request.call_count == 1
+        polaris, missing, m31, m31_again = (obj and obj.to_dict() for obj in objects)
+        assert missing is None
+        assert polaris["MAIN_ID"] == "* alf UMi" and polaris["Z_VALUE"] is None
+        assert m31["OTYPE"] == "AGN" and m31["FLUX_V"] == pytest.approx(3.44)
+        assert m31_again == m31
+
+    def test_large_lists_are_chunked(self, mocker):
+        from astroquery.simbad.core import SimbadClass
+
+        from targets.simbad import SimbadService
+
+        request = mocker.patch.object(SimbadClass, "_request", side_effect=_recorded_simbad_response)
+        service = SimbadService()
+        service.BATCH_SIZE = 2
+        objects = service.get_targets(["M31", "NoSuchObject123", "Polaris"])
+
+        assert request.call_count == 2
+        assert [obj is not None for obj in objects] == [True, False, True]
+        assert "query id  Polaris" in request.call_args_list[1].kwargs["data"]["script"]
+
+    @pytest.mark.django_db
+    def test_cache_simbad_many_updates_in_bulk(self, user, mocker):
+        from astroquery.simbad.core import SimbadClass
+
+        from targets.models import Target
+        from targets.simbad import cache_simbad_many
+
+        request = mocker.patch.object(SimbadClass, "_request", side_effect=_recorded_simbad_response)
+        targets = [Target.objects.create(user=user, name=name, ra=0, dec=0)
+                   for name in ("M31", "Polaris", "NoSuchObject123")]
+
+        updated, failed = cache_simbad_many(targets)
+        assert [t.name for t in updated] == ["M31", "Polaris"] and failed == []
+        assert cache_simbad_many(list(Target.objects.filter(name__in=["M31", "Polaris"]))) == ([], [])
+        assert request.call_count == 1
+        assert Target.objects.get(name="Polaris").simbad["OTYPE"] == "cC*"
+        assert Target.objects.get(name="NoSuchObject123").simbad is None
+
+
+class TestSimbadServicePool:
+    def test_pool_is_built_on_first_use(self, monkeypatch):
+        from targets import simbad
+
+        monkeypatch.setattr(simbad, "_pool", None)
+        pool = simbad.simbad_pool()
+        assert simbad._pool is pool
+        assert simbad.simbad_pool() is pool
+
+    def test_services_share_one_session(self):
+        from targets.simbad import SimbadServicePool
+
+        pool = SimbadServicePool(size=2)
+        with pool.acquire() as first, pool.acquire() as second:
+            assert first is not second
+            assert first.service._session is second.service._session is pool.session
+            assert "typed_id" in first.show_votable_fields()
+
+    def test_concurrent_borrowers_never_share_a_service(self):
+        import threading
+        import time
+
+        from targets.simbad import SimbadServicePool
+
+        pool = SimbadServicePool(size=2)
+        in_use, overlaps = set(), []
+        lock = threading.Lock()
+
+        def borrow():
+            with pool.acquire(timeout=5) as service:
+                with lock:
+                    overlaps.append(id(service) in in_use)
+                    in_use.add(id(service))
+                time.sleep(0.01)
+                with lock:
+                    in_use.discard(id(service))
+
+        threads = [threading.Thread(target=borrow) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert overlaps == [False] * 8
+        assert pool._idle.qsize() == 2
+
+
+@pytest.mark.django_db
+class TestEnrichment:
+    def test_create_queues_enrichment(self, authenticated_client):
+        from helpers.models import Job
+
+        response = authenticated_client.post("/api/targets/", {"name": "NGC 224", "ra": 10.68, "dec": 41.27},
+                                             format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+        job = Job.objects.get(kind="targets.enrich")
+        assert job.params == {"target_ids": [response.json()["id"]]}
+
+    def test_bulk_upload_queues_one_job(self, authenticated_client):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from helpers.models import Job
+        from targets.models import Target
+
+        upload = SimpleUploadedFile("targets.csv", b"name,ra,dec\nM31,10.68,41.27\nPolaris,37.95,89.26\n")
+        response = authenticated_client.post("/api/targets/bulk/", {"file": upload}, format="multipart")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        job = Job.objects.get(kind="targets.enrich")
+        assert sorted(job.params["target_ids"]) == sorted(Target.objects.values_list("id", flat=True))
+
+    def test_enrich_targets_writes_in_bulk_and_skips_current(self, user, mocker):
+        from astroquery.simbad.core import SimbadClass
+
+        from targets.enrichment import enrich_targets
+        from targets.models import Target
+
+        simbad = mocker.patch.object(SimbadClass, "_request", side_effect=_recorded_simbad_response)
+        vizier = mocker.patch("targets.vizier.Table.read", return_value=_vizier_table())
+        targets = [Target.objects.create(user=user, name=name, ra=ra, dec=dec)
+                   for name, ra, dec in (("M31", 10.68, 41.27), ("Polaris", 37.95, 89.26), ("NoSuchObject123", 1, 1))]
+        progress = []
+
+        result = enrich_targets(targets, workers=3, on_progress=progress.append)
+
+        assert result == {"simbad": 2, "sed": 3, "failed": []}
+        assert simbad.call_count == 1 and vizier.call_count == 3
+        assert progress[-1] == 1.0 and len(progress) == 4
+        assert Target.objects.get(name="Polaris").simbad["OTYPE"] == "cC*"
+        assert Target.objects.get(name="M31").sed["filters"][0] == "Johnson:V"
+
+        fresh = list(Target.objects.filter(name__in=["M31", "Polaris"]))
+        assert enrich_targets(fresh) == {"simbad": 0, "sed": 0, "failed": []}
+        assert simbad.call_count == 1 and vizier.call_count == 3
+
+    def test_failed_downloads_are_retried_with_backoff(self, sample_target, mocker):
+        from targets.enrichment import enrich_targets
+
+        mocker.patch("targets.simbad.SimbadService.get_targets", side_effect=OSError("SIMBAD down"))
+        mocker.patch("targets.vizier.Table.read", side_effect=[OSError("timeout"), OSError("timeout"), _vizier_table()])
+        sleep = mocker.patch("helpers.retry.time.sleep")
+
+        result = enrich_targets([sample_target])
+
+        assert result == {"simbad": 0, "sed": 1, "failed": [sample_target.pk]}
+        assert sleep.call_count == 4  # two retries for each catalog
+        sample_target.refresh_from_db()
+        assert sample_target.sed is not None and sample_target.simbad is None
+
+    def test_job_reports_progress(self, user, sample_target, mocker):
+        from helpers.jobs import enqueue, run_job
+
+        mocker.patch("targets.simbad.SimbadService.get_targets", return_value=[_simbad_object()])
+        mocker.patch("targets.vizier.Table.read", return_value=_vizier_table())
+
+        job = run_job(enqueue("targets.enrich", user, target_ids=[sample_target.pk]))
+
+        assert job.status == job.Status.SUCCEEDED
+        assert job.result == {"simbad": 1, "sed": 1, "failed": []}
+        assert job.progress == 1.0
+
+
+@pytest.mark.django_db
+class TestCatalogOutages:
+    def test_unknown_identifiers_are_not_queried_again(self, mocker):
+        from astroquery.simbad.core import SimbadClass
+
+        from targets.simbad import SimbadService
+
+        request = mocker.patch.object(SimbadClass, "_request", side_effect=_recorded_simbad_response)
+        service = SimbadService()
+        service.get_targets(["M31", "NoSuchObject123"])
+        assert service.get_target("nosuchobject123") is None
+        service.get_targets(["NoSuchObject123"])
+
+        assert request.call_count == 1
+
+    def test_refresh_bypasses_remembered_misses(self, authenticated_client, sample_target, mocker):
+        from astropy.table import Table
+        from astroquery.simbad.core import SimbadClass
+
+        query = mocker.patch.object(SimbadClass, "query_object", return_value=None)
+        url = f"/api/targets/{sample_target.pk}/simbad/"
+        assert authenticated_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+        assert authenticated_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+        assert query.call_count == 1
+
+        query.return_value = Table({"MAIN_ID": ["M  31"], "RA": ["00 42 44.330"], "DEC": ["+41 16 07.50"]})
+        response = authenticated_client.get(url + "?refresh=true")
+        assert response.status_code == status.HTTP_200_OK
+        assert query.call_count == 2
+
+    def test_open_circuit_returns_503(self, authenticated_client, sample_target, settings, mocker):
+        from astroquery.simbad.core import SimbadClass
+
+        settings.CIRCUIT_BREAKER_MIN_CALLS = 2
+        request = mocker.patch.object(SimbadClass, "query_object", side_effect=ConnectionError("timeout"))
+        url = f"/api/targets/{sample_target.pk}/simbad/"
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                authenticated_client.get(url)
+
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert int(response["Retry-After"]) > 0
+        assert request.call_count == 2
+
+    def test_vizier_outage_stops_retries(self, authenticated_client, sample_target, settings, mocker):
+        settings.CIRCUIT_BREAKER_MIN_CALLS = 2
+        read = mocker.patch("targets.vizier.Table.read", side_effect=OSError("timeout"))
+        mocker.patch("helpers.retry.time.sleep")
+
+        response = authenticated_client.get(f"/api/targets/{sample_target.pk}/sed/")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert read.call_count == 2  # the third attempt hit the open circuit
+
+
+# ============================================================================
+# Bulk Import Tests
+# ============================================================================
+
+
+def _upload(content: str, name: str = "targets.csv"):
+    return _upload_bytes(content.encode("utf-8"), name)
+
+
+def _upload_bytes(content: bytes, name: str):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    return SimpleUploadedFile(name, content)
+
+
+@pytest.mark.django_db
+class TestBulkImport:
+    URL = "/api/targets/bulk/"
+
+    def test_valid_rows_are_imported_and_invalid_rows_reported(self, authenticated_client, sample_target):
+        from targets.models import Target
+
+        csv = (
+            "name,ra,dec,redshift,tags\n"
+            "NGC 1,1.5,-2.0,0.01,galaxy;nearby\n"
+            "NGC 2,400,10,,\n"
+            "NGC 3,abc,,,\n"
+            "NGC 1,3,3,,\n"
+            "M31,10,41,,\n"
+            ",5,5,,\n"
+            "NGC 4,359.9,90,,galaxy\n"
+        )
+        response = authenticated_client.post(self.URL, {"file": _upload(csv)}, format="multipart")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        body = response.json()
+        assert (body["created"], body["failed"]) == (2, 5)
+        rows = {row["row"]: row for row in body["rows"]}
+        assert rows[2]["status"] == "created" and rows[8]["status"] == "created"
+        assert rows[3]["errors"] == {"ra": ["Ensure this value is less than or equal to 360."]}
+        assert rows[4]["errors"] == {"ra": ["A valid number or sexagesimal coordinate is required."],
+                                     "dec": ["This field is required."]}
+        assert rows[5]["errors"] == {"name": ["Duplicate name in this file."]}
+        assert rows[6]["errors"] == {"name": ["A target with this name already exists for this user."]}
+        assert rows[7]["errors"] == {"name": ["This field is required."]}
+
+        ngc1 = Target.objects.get(pk=rows[2]["id"])
+        assert ngc1.redshift == pytest.approx(0.01)
+        assert sorted(ngc1.tags.values_list("name", flat=True)) == ["galaxy", "nearby"]
+        assert list(Target.objects.get(name="NGC 4").tags.values_list("name", flat=True)) == ["galaxy"]
+        assert Target.objects.count() == 3
+
+    def test_missing_columns_reject_the_file(self, authenticated_client):
+        response = authenticated_client.post(self.URL, {"file": _upload("name,ra\nM31,10\n")}, format="multipart")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "dec" in str(response.json())
+
+    def test_non_csv_is_rejected(self, authenticated_client):
+        response = authenticated_client.post(self.URL, {"file": _upload("x", name="targets.txt")}, format="multipart")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_large_file_uses_constant_queries(self, user, django_assert_max_num_queries):
+        import io
+        import time
+
+        import pandas as pd
+        from django.db import connection
+
+        from targets.bulk_import import BATCH_SIZE, import_targets
+        from targets.models import Target
+
+        n = 20000
+        csv = "name,ra,dec\n" + "".join(f"T{i},{i % 360},{i % 180 - 90}\n" for i in range(n))
+        df = pd.read_csv(io.StringIO(csv), dtype=str, keep_default_na=False)
+
+        fields = [f for f in Target._meta.concrete_fields if not f.primary_key]
+        batch = min(BATCH_SIZE, connection.ops.bulk_batch_size(fields, [Target()] * n) or BATCH_SIZE)
+        start = time.perf_counter()
+        with django_assert_max_num_queries(-(-n // batch) + 10):
+            report, created = import_targets(df, user)
+        assert time.perf_counter() - start < 10
+        assert report.created == len(created) == Target.objects.count() == n
+
+
+def _catalog_table():
+    import numpy as np
+    from astropy.table import MaskedColumn, Table
+
+    return Table({
+        "MAIN_ID": np.array([b"M31", b"M33", b"Bad"]),
+        "RAJ2000": ["00 42 44.3", "01:33:50.9", "25:00:00"],
+        "DEJ2000": ["+41 16 09", "+30:39:37", "+10:00:00"],
+        "Z": MaskedColumn([-0.001, 0.0, 0.1], mask=[False, True, False]),
+    })
+
+
+@pytest.mark.django_db
+class TestUploadFormats:
+    URL = "/api/targets/bulk/"
+
+    def _post(self, client, table, name, fmt, **data):
+        import io
+
+        buffer = io.BytesIO()
+        table.write(buffer, format=fmt)
+        return client.post(self.URL, {"file": _upload_bytes(buffer.getvalue(), name), **data}, format="multipart")
+
+    @pytest.mark.parametrize("name, fmt", [("cat.vot", "votable"), ("cat.fits", "fits")])
+    def test_astropy_tables_with_catalog_columns(self, authenticated_client, name, fmt):
+        from targets.models import Target
+
+        response = self._post(authenticated_client, _catalog_table(), name, fmt)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        rows = response.json()["rows"]
+        assert [row["status"] for row in rows] == ["created", "created", "error"]
+        assert rows[2]["row"] == 3 and set(rows[2]["errors"]) == {"ra", "dec"}
+        m31 = Target.objects.get(name="M31")
+        assert m31.ra == pytest.approx(10.684583, abs=1e-6)
+        assert m31.dec == pytest.approx(41.269167, abs=1e-6)
+        assert m31.redshift == pytest.approx(-0.001)
+        assert Target.objects.get(name="M33").redshift is None
+
+    def test_column_map_overrides(self, authenticated_client):
+        from astropy.table import Table
+
+        from targets.models import Target
+
+        table = Table({"designation": ["A", "B"], "alpha": [10.0, 20.0], "delta": [-5.0, 5.0]})
+        column_map = '{"designation": "name", "alpha": "ra", "delta": "dec"}'
+        response = self._post(authenticated_client, table, "cat.fits", "fits", column_map=column_map)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert sorted(Target.objects.values_list("name", "ra")) == [("A", 10.0), ("B", 20.0)]
+
+    def test_invalid_column_map(self, authenticated_client):
+        response = authenticated_client.post(
+            self.URL, {"file": _upload("name,ra,dec\n"), "column_map": '{"x": "magnitude"}'}, format="multipart")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "magnitude" in str(response.json()["column_map"])
+
+    def test_parquet(self, authenticated_client):
+        import io
+
+        import pandas as pd
+
+        from targets.models import Target
+
+        buffer = io.BytesIO()
+        pd.DataFrame({"name": ["A"], "ra": [1.0], "dec": [2.0]}).to_parquet(buffer)
+        response = authenticated_client.post(self.URL, {"file": _upload_bytes(buffer.getvalue(), "cat.parquet")},
+                                             format="multipart")
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Target.objects.get(name="A").dec == 2.0
+
+    def test_sexagesimal_csv(self, authenticated_client):
+        from targets.models import Target
+
+        csv = "name,ra,dec\nM31,00h42m44.3s,+41d16m09s\nMixed,10.5,+41:16:09\n"
+        response = authenticated_client.post(self.URL, {"file": _upload(csv)}, format="multipart")
+
+        assert response.json()["created"] == 1
+        assert Target.objects.get(name="M31").ra == pytest.approx(10.684583, abs=1e-6)
+        assert set(response.json()["rows"][1]["errors"]) == {"dec"}
+
+
+@pytest.mark.django_db
+class TestStreamingImport:
+    URL = "/api/targets/bulk/?async=true"
+
+    @pytest.fixture(autouse=True)
+    def _upload_dir(self, settings, tmp_path):
+        settings.IMPORT_UPLOAD_DIR = str(tmp_path)
+        settings.IMPORT_CHUNK_SIZE = 3
+
+    def test_upload_is_imported_by_a_job_in_chunks(self, authenticated_client, user, tmp_path, mocker):
+        from helpers.jobs import run_job, set_progress
+        from helpers.models import Job
+        from targets.models import Target
+
+        progress = mocker.patch("targets.jobs.set_progress", wraps=set_progress)
+        csv = "name,ra,dec\n" + "".join(f"T{i},{i},{i - 90 if i != 4 else 100}\n" for i in range(8))
+        response = authenticated_client.post(self.URL, {"file": _upload(csv)}, format="multipart")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert Target.objects.count() == 0
+        job = run_job(Job.objects.get(pk=response.json()["id"]))
+
+        assert job.status == Job.Status.SUCCEEDED
+        assert job.result["created"] == 7 and job.result["failed"] == 1
+        assert job.result["rows"][0]["row"] == 6
+        assert job.result["rows"][0]["errors"] == {"dec": ["Ensure this value is less than or equal to 90."]}
+        assert progress.call_count == 3
+        assert Job.objects.filter(kind="targets.enrich").count() == 3
+        assert list(tmp_path.iterdir()) == []
+
+    def test_columnar_upload_is_sliced_into_chunks(self, authenticated_client, settings, tmp_path):
+        import io
+
+        from helpers.jobs import run_job
+        from helpers.models import Job
+
+        settings.IMPORT_CHUNK_SIZE = 2
+        buffer = io.BytesIO()
+        _catalog_table().write(buffer, format="votable")
+        response = authenticated_client.post(self.URL, {"file": _upload_bytes(buffer.getvalue(), "cat.xml")},
+                                             format="multipart")
+        job = run_job(Job.objects.get(pk=response.json()["id"]))
+
+        assert job.result["created"] == 2
+        assert [row["row"] for row in job.result["rows"]] == [3]
+        assert Job.objects.filter(kind="targets.enrich").count() == 1
+
+    def test_failed_chunk_does_not_undo_earlier_chunks(self, user, tmp_path, mocker):
+        from targets.bulk_import import import_target_file, import_targets
+        from targets.models import Target
+
+        path = tmp_path / "t.csv"
+        path.write_text("name,ra,dec\n" + "".join(f"T{i},1,1\n" for i in range(6)))
+        calls = []
+
+        def flaky(df, user, first_row=2):
+            calls.append(first_row)
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return import_targets(df, user, first_row=first_row)
+
+        mocker.patch("targets.bulk_import.import_targets", side_effect=flaky)
+        with pytest.raises(RuntimeError):
+            import_target_file(str(path), user, chunksize=3)
+        assert calls == [2, 5]
+        assert Target.objects.count() == 3
+
+    def test_bad_header_fails_the_job(self, authenticated_client):
+        from helpers.jobs import run_job
+        from helpers.models import Job
+
+        response = authenticated_client.post(self.URL, {"file": _upload("name,ra\nM31,1\n")}, format="multipart")
+        job = run_job(Job.objects.get(pk=response.json()["id"]))
+        assert job.status == Job.Status.FAILED
+        assert "dec" in job.error
+
+
+# ============================================================================
+# Export Tests
+# ============================================================================
+
+
+@pytest.mark.django_db
+class TestTargetExport:
+    URL = "/api/targets/export/"
+
+    @pytest.fixture
+    def targets(self, user, sample_tag):
+        from targets.models import Target
+
+        created = Target.objects.bulk_create(
+            [Target(user=user, name=f"T{i}", ra=i * 10.0, dec=i - 5.0, redshift=0.1 if i % 2 else None)
+             for i in range(7)])
+        created[1].tags.add(sample_tag)
+        return created
+
+    def test_csv_streams_every_row_and_round_trips(self, authenticated_client, targets, settings):
+        import io
+
+        import pandas as pd
+
+        settings.EXPORT_CHUNK_SIZE = 3
+        response = authenticated_client.get(self.URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Disposition"] == 'attachment; filename="targets.csv"'
+        df = pd.read_csv(io.BytesIO(b"".join(response.streaming_content)))
+        assert df["name"].tolist() == [f"T{i}" for i in range(7)]
+        assert df.loc[1, "tags"] == "galaxy"
+        assert df.loc[1, "redshift"] == 0.1 and pd.isna(df.loc[0, "redshift"])
+
+    def test_filters_are_honoured(self, authenticated_client, targets):
+        ids = f"{targets[2].id},{targets[4].id}"
+        response = authenticated_client.get(self.URL, {"ids": ids})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert [line.split(",")[1] for line in lines[1:]] == ["T2", "T4"]
+
+    def test_other_users_targets_are_not_exported(self, authenticated_client, admin_user):
+        from targets.models import Target
+
+        Target.objects.create(user=admin_user, name="Hidden", ra=1, dec=1)
+        response = authenticated_client.get(self.URL)
+        assert b"Hidden" not in b"".join(response.streaming_content)
+
+    def test_votable(self, authenticated_client, targets, settings):
+        import io
+
+        from astropy.io.votable import parse_single_table
+
+        settings.EXPORT_CHUNK_SIZE = 4
+        response = authenticated_client.get(self.URL, {"type": "votable"})
+        table = parse_single_table(io.BytesIO(b"".join(response.streaming_content))).to_table()
+
+        assert len(table) == 7
+        assert table["ra"].unit == "deg"
+        assert table["dec"][6] == 1.0
+        assert table["tags"][1] == "galaxy"
+
+    def test_parquet(self, authenticated_client, targets):
+        import io
+
+        import pandas as pd
+
+        response = authenticated_client.get(self.URL, {"type": "parquet"})
+        df = pd.read_parquet(io.BytesIO(b"".join(response.streaming_content)))
+        assert df["name"].tolist() == [f"T{i}" for i in range(7)]
+
+    def test_unknown_type(self, authenticated_client):
+        response = authenticated_client.get(self.URL, {"type": "xlsx"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_tags_are_fetched_once_per_chunk(self, authenticated_client, targets, settings,
+                                             django_assert_num_queries):
+        from targets.export import target_rows
+        from targets.models import Target
+
+        settings.EXPORT_CHUNK_SIZE = 3
+        with django_assert_num_queries(1 + 3):
+            rows = list(target_rows(Target.objects.order_by("id")))
+        assert len(rows) == 7
+
+
+# ============================================================================
+# Spatial Index Tests
+# ============================================================================
+
+
+@pytest.mark.django_db
+class TestConeSearch:
+    def test_unit_vectors_follow_coordinates(self, user, sample_target):
+        import numpy as np
+
+        from targets.models import Target
+
+        def vector(target):
+            target.refresh_from_db()
+            return np.array([target.cx, target.cy, target.cz])
+
+        ra, dec = np.radians([10.6847, 41.2687])
+        assert vector(sample_target) == pytest.approx(
+            [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], abs=1e-12)
+        sample_target.dec = 90
+        sample_target.save(update_fields=["dec"])
+        assert vector(sample_target) == pytest.approx([0, 0, 1], abs=1e-12)
+
+        Target.objects.filter(pk=sample_target.pk).update(ra=0, dec=0)
+        assert vector(sample_target) == pytest.approx([1, 0, 0], abs=1e-12)
+
+        [bulk] = Target.objects.bulk_create([Target(user=user, name="B", ra=90, dec=0)])
+        assert vector(bulk) == pytest.approx([0, 1, 0], abs=1e-12)
+
+    def test_all_objects_keeps_hard_delete(self, user, sample_target):
+        from targets.models import Target
+
+        [moved] = Target.all_objects.bulk_create([Target(user=user, name="B", ra=90, dec=0)])
+        assert Target.all_objects.cone_search(90, 0, 1).get().pk == moved.pk
+
+        sample_target.delete()
+        assert Target.all_objects.filter(pk=sample_target.pk).exists()
+        Target.all_objects.filter(pk__in=[sample_target.pk, moved.pk]).delete()
+        assert not Target.all_objects.filter(pk__in=[sample_target.pk, moved.pk]).exists()
+
+    def test_matches_brute_force_separation(self, user):
+        import numpy as np
+        from astropy import units as u
+        from astropy.coordinates import SkyCoord
+
+        from targets.models import Target
+
+        rng = np.random.default_rng(7)
+        centres = [(0.2, 10.0), (359.9, -30.0), (123.0, 89.5), (200.0, -89.9)]
+        ra = np.concatenate([(c_ra + rng.normal(0, 1.5, 200)) % 360 for c_ra, _ in centres])
+        dec = np.concatenate([np.clip(c_dec + rng.normal(0, 1.0, 200), -90, 90) for _, c_dec in centres])
+        Target.objects.bulk_create([Target(user=user, name=f"S{i}", ra=r, dec=d)
+                                    for i, (r, d) in enumerate(zip(ra, dec))])
+        catalog = SkyCoord(ra * u.deg, dec * u.deg)
+
+        for c_ra, c_dec in centres:
+            expected = catalog.separation(SkyCoord(c_ra * u.deg, c_dec * u.deg)).deg
+            found = list(Target.objects.cone_search(c_ra, c_dec, 1.0))
+            assert {t.name for t in found} == {f"S{i}" for i in np.flatnonzero(expected <= 1.0)}
+            assert [t.separation for t in found] == sorted(t.separation for t in found)
+            assert found[0].separation == pytest.approx(expected[expected <= 1.0].min(), abs=1e-6)
+
+    def test_box_prefilter_uses_the_index(self, sample_target):
+        from django.db import connection
+
+        from targets.models import Target
+
+        sql, params = Target.objects.cone_search(10, 41, 1 / 3600).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        if connection.vendor == "sqlite":
+            assert "target_unit_vector" in plan
+
+    def test_api_filter(self, admin_user, admin_client):
+        from targets.models import Target
+
+        Target.objects.bulk_create([Target(user=admin_user, name=name, ra=ra, dec=dec)
+                                    for name, ra, dec in (("Far", 12.0, 41.0), ("Near", 10.01, 41.0),
+                                                          ("Nearest", 10.0, 41.0), ("Outside", 40.0, 41.0))])
+
+        response = admin_client.get("/api/targets/", {"cone_ra": 10, "cone_dec": 41, "radius": 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert [t["name"] for t in response.json()["results"]] == ["Nearest", "Near", "Far"]
+
+        incomplete = admin_client.get("/api/targets/", {"cone_ra": 10, "cone_dec": 41})
+        assert incomplete.status_code == status.HTTP_400_BAD_REQUEST
+        out_of_range = admin_client.get("/api/targets/", {"cone_ra": 10, "cone_dec": 95, "radius": 1})
+        assert out_of_range.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestCrossMatch:
+    def test_matches_brute_force_nearest(self, user):
+        import numpy as np
+        from astropy import units as u
+        from astropy.coordinates import SkyCoord
+
+        from targets.crossmatch import NO_MATCH, TargetCatalog
+        from targets.models import Target
+
+        rng = np.random.default_rng(11)
+        ra = np.concatenate([rng.uniform(0, 360, 300), [0.0001, 359.9999, 45.0, 45.0]])
+        dec = np.concatenate([np.degrees(np.arcsin(rng.uniform(-1, 1, 300))), [0.0, 0.0, 89.9999, 89.9999]])
+        targets = Target.objects.bulk_create([Target(user=user, name=f"S{i}", ra=r, dec=d)
+                                              for i, (r, d) in enumerate(zip(ra, dec))])
+        pks = np.array([t.pk for t in targets])
+
+        # Positions jittered by up to ~2" around every target, so some fall outside a 1" radius
+        query_ra = (ra + rng.normal(0, 0.5 / 3600, len(ra))) % 360
+        query_dec = np.clip(dec + rng.normal(0, 0.5 / 3600, len(dec)), -90, 90)
+        found, separation = TargetCatalog().match_positions(query_ra, query_dec, 1 / 3600)
+
+        catalog = SkyCoord(ra * u.deg, dec * u.deg)
+        for i, (q_ra, q_dec) in enumerate(zip(query_ra, query_dec)):
+            distances = catalog.separation(SkyCoord(q_ra * u.deg, q_dec * u.deg)).deg
+            if distances.min() <= 1 / 3600:
+                assert found[i] == pks[distances.argmin()]
+                assert separation[i] == pytest.approx(distances.min(), abs=1e-9)
+            else:
+                assert found[i] == NO_MATCH
+
+    def test_name_takes_precedence_over_position(self, user, sample_target):
+        from targets.crossmatch import NO_MATCH, TargetCatalog
+        from targets.models import Target
+
+        other = Target.objects.create(user=user, name="Other", ra=200, dec=-10)
+        gone = Target.objects.create(user=user, name="Gone", ra=100, dec=5)
+        gone.delete()
+
+        catalog = TargetCatalog()
+        pks = catalog.match(["Other", "unknown", "unknown", "Gone"],
+                            [10.6847, 10.6847, 50.0, 100.0], [41.2687, 41.2687, 50.0, 5.0])
+        assert list(pks) == [other.pk, sample_target.pk, NO_MATCH, NO_MATCH]
+
+    def test_empty_catalog(self, db):
+        from targets.crossmatch import NO_MATCH, TargetCatalog
+
+        pks, separation = TargetCatalog().match_positions([1.0], [2.0])
+        assert list(pks) == [NO_MATCH]
+        assert len(TargetCatalog()) == 0
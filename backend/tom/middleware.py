@@ -16,15 +16,16 @@ class RequestLogMiddleware:
 
     def __call__(self, request):
         start_time = time.time()
+        body = self._raw_body(request)
 
         request_data = {
             'path': request.path,
             'method': request.method,
             'query_params': request.GET.dict(),
-            'body': request.body.decode('utf-8') if request.body else None,
+            'body': body.decode('utf-8', errors='replace') if body else None,
             'headers': self._sanitize_headers(dict(request.headers)),
             'ip_address': self._get_client_ip(request),
-            'request_size': len(request.body) if request.body else 0,
+            'request_size': len(body) if body else int(request.META.get('CONTENT_LENGTH') or 0),
         }
 
         try:
@@ -84,13 +85,19 @@ class RequestLogMiddleware:
 
         return response
 
+    def _raw_body(self, request):
+        """Request body, except for file uploads: those may be binary and too large to hold in memory"""
+        if request.content_type == 'multipart/form-data':
+            return None
+        return request.body
+
     def _get_body(self, request):
-        if request.body:
+        body = self._raw_body(request)
+        if body:
             try:
-                body = json.loads(request.body.decode('utf-8'))
-                return self._sanitize_data(body)
-            except json.JSONDecodeError:
-                return request.body.decode('utf-8')
+                return self._sanitize_data(json.loads(body.decode('utf-8')))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                return body.decode('utf-8', errors='replace')
         return None
 
     def _sanitize_data(self, data):
@@ -132,6 +132,41 @@ elif os.getenv("ENGINE") == "django.db.backends.sqlite3":
         }
     }
 
+# Shared cache for computed ephemerides, circuit breaker state and SIMBAD not-found answers; file based
+# so every gunicorn worker sees the same entries, and its directory must also be mounted in the job worker
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "/tmp/ncu_tom_cache"),
+    }
+}
+# Seconds a computed visibility response is served from the cache
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 60 * 60))
+# Directory holding the per-observatory yearly sidereal/twilight tables
+SIDEREAL_TABLE_DIR = os.getenv("SIDEREAL_TABLE_DIR", "/tmp/ncu_tom_sidereal")
+# Seconds a stored SIMBAD record on a target stays fresh; 0 keeps it until ?refresh=true
+SIMBAD_CACHE_MAX_AGE = int(os.getenv("SIMBAD_CACHE_MAX_AGE", 60 * 60 * 24 * 30))
+# Configured SIMBAD clients kept per process; bounds concurrent SIMBAD requests per worker
+SIMBAD_POOL_SIZE = int(os.getenv("SIMBAD_POOL_SIZE", 4))
+# Concurrent Vizier downloads made while enriching newly created targets (SIMBAD is queried in batches)
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", 4))
+# Uploads imported by the job worker (?async=true on /api/targets/bulk/); must be shared with it
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR", "/tmp/ncu_tom_imports")
+# CSV rows read, validated and inserted per transaction by a streamed import
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 5000))
+# Rows fetched per server-side cursor round trip and written per chunk by the export endpoints
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+# Circuit breaker around SIMBAD/Vizier: open once FAILURE_RATE of the calls made in the
+# last WINDOW seconds failed (and at least MIN_CALLS were made), probe again after COOLDOWN
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", 0.5))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", 5))
+CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", 60))
+CIRCUIT_BREAKER_COOLDOWN = int(os.getenv("CIRCUIT_BREAKER_COOLDOWN", 30))
+# Seconds an identifier SIMBAD did not know is answered as "not found" without asking again
+SIMBAD_NOT_FOUND_TTL = int(os.getenv("SIMBAD_NOT_FOUND_TTL", 60 * 60))
+# Longest a client may block on GET /api/jobs/<id>/?wait=<seconds>
+JOB_LONG_POLL_MAX = int(os.getenv("JOB_LONG_POLL_MAX", 30))
+
 # Point the default user model to our custom user model
 AUTH_USER_MODEL = "system.User"
 